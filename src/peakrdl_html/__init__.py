@@ -1 +1,3 @@
 from .exporter import HTMLExporter
+from .export_stats import ExportStats
+from .output_sink import OutputSink, DirectorySink, ZipSink, TarSink, MemorySink
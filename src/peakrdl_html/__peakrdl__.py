@@ -1,15 +1,56 @@
+import sys
+import json
+import time
+import cProfile
 from typing import TYPE_CHECKING
 
 from peakrdl.plugins.exporter import ExporterSubcommandPlugin
 from peakrdl.config import schema
 
 from .exporter import HTMLExporter
+from .output_sink import ZipSink, TarSink
 
 if TYPE_CHECKING:
     import argparse
+    from typing import Optional, Union
+    from .output_sink import OutputSink
     from systemrdl.node import AddrmapNode
 
 
+class ProgressPrinter:
+    """
+    Export progress callback that prints a status line to stderr
+    """
+    # Minimum number of seconds between updates
+    INTERVAL = 0.2
+
+    def __init__(self) -> None:
+        self.last_update = 0.0
+        self.phase = None # type: Optional[str]
+
+    def __call__(self, phase: str, completed: int, total: 'Optional[int]') -> None:
+        now = time.monotonic()
+        is_done = (total is not None) and (completed >= total)
+        if phase == self.phase and not is_done and (now - self.last_update) < self.INTERVAL:
+            return
+        self.last_update = now
+
+        if phase != self.phase and self.phase is not None:
+            sys.stderr.write("\n")
+        self.phase = phase
+
+        if total is None:
+            sys.stderr.write("\r%-12s %d" % (phase, completed))
+        else:
+            sys.stderr.write("\r%-12s %d/%d" % (phase, completed, total))
+        sys.stderr.flush()
+
+    def close(self) -> None:
+        if self.phase is not None:
+            sys.stderr.write("\n")
+            sys.stderr.flush()
+
+
 class Exporter(ExporterSubcommandPlugin):
     short_desc = "Generate HTML documentation"
     long_desc = "Generate dynamic HTML documentation pages"
@@ -20,6 +61,8 @@ class Exporter(ExporterSubcommandPlugin):
         "extra_doc_properties": [schema.String()],
         "generate_source_links": schema.Boolean(),
         "reverse_fields": schema.Boolean(),
+        "desc_cache_dir": schema.DirectoryPath(shall_exist=False),
+        "template_cache_dir": schema.DirectoryPath(shall_exist=False),
     }
 
 
@@ -55,6 +98,177 @@ class Exporter(ExporterSubcommandPlugin):
             help="Show fields in reverse order (LSB to MSB)"
         )
 
+        arg_group.add_argument(
+            "--jobs",
+            dest="jobs",
+            metavar="N",
+            type=int,
+            default=1,
+            help="Number of parallel workers used to render pages. Use 0 to use all available CPUs"
+        )
+
+        arg_group.add_argument(
+            "--incremental",
+            dest="incremental",
+            default=False,
+            action="store_true",
+            help="Only re-write output files whose contents changed since the previous export"
+        )
+
+        arg_group.add_argument(
+            "--precompress",
+            dest="precompress",
+            default=False,
+            action="store_true",
+            help="Also write gzip (and brotli, if available) compressed copies of data, search and content files"
+        )
+
+        arg_group.add_argument(
+            "--archive",
+            dest="archive",
+            default=False,
+            action="store_true",
+            help="Write the output directly into an archive file rather than a directory. The format is chosen by the output's extension: .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz"
+        )
+
+        arg_group.add_argument(
+            "--ral-data-format",
+            dest="ral_data_format",
+            choices=["json", "binary"],
+            default="json",
+            help="Encoding of the register model data loaded by the viewer. (default: %(default)s)"
+        )
+
+        arg_group.add_argument(
+            "--lazy-ral-data",
+            dest="lazy_ral_data",
+            default=False,
+            action="store_true",
+            help="Group register model data by subtree and only load what the viewer needs on demand"
+        )
+
+        arg_group.add_argument(
+            "--streaming",
+            dest="streaming",
+            default=False,
+            action="store_true",
+            help="Write register model data as soon as it is complete, keeping memory use roughly constant for very large designs. Requires the json RAL data format"
+        )
+
+        arg_group.add_argument(
+            "--image-links",
+            dest="image_link_mode",
+            choices=["copy", "hardlink", "reflink"],
+            default="copy",
+            help="Copy images referenced by descriptions into the output, or link to them. Falls back to copying if linking is not possible. (default: %(default)s)"
+        )
+
+        arg_group.add_argument(
+            "--static-store",
+            dest="static_store_dir",
+            metavar="DIR",
+            default=None,
+            help="Store the viewer's static files in this directory, which is shared by multiple exports, rather than copying them into each one. Identical files are only stored once, and are hard-linked into the output unless --static-url is also used"
+        )
+
+        arg_group.add_argument(
+            "--static-url",
+            dest="static_url",
+            metavar="URL",
+            default=None,
+            help="Load the viewer's static files from this URL prefix, rather than placing them in the output. '{digest}' is replaced by a digest of the static files"
+        )
+
+        arg_group.add_argument(
+            "--content-filenames",
+            dest="content_filenames",
+            choices=["hash", "id"],
+            default="hash",
+            help="Name content pages after a hash of the node's path, or after the node's id. (default: %(default)s)"
+        )
+
+        arg_group.add_argument(
+            "--search-in-worker",
+            dest="search_in_worker",
+            default=False,
+            action="store_true",
+            help="Run searches in a Web Worker to keep the page responsive"
+        )
+
+        arg_group.add_argument(
+            "--virtual-sidebar",
+            dest="virtual_sidebar",
+            default=False,
+            action="store_true",
+            help="Only create sidebar tree elements for rows that are scrolled into view. Use for designs with nodes that have very many children"
+        )
+
+        arg_group.add_argument(
+            "--search-index-memory",
+            dest="search_index_memory",
+            metavar="MB",
+            type=int,
+            default=None,
+            help="Limit the memory used to build the search index. Once exceeded, the index is spilled to temporary files"
+        )
+
+        arg_group.add_argument(
+            "--search-index-format",
+            dest="search_index_format",
+            choices=["json", "compact"],
+            default="json",
+            help="Store the search index as plain JSON, or as compact delta-encoded files that are split by size. (default: %(default)s)"
+        )
+
+        arg_group.add_argument(
+            "--search-stop-word-ratio",
+            dest="search_stop_word_ratio",
+            metavar="RATIO",
+            type=float,
+            default=None,
+            help="Leave words that appear in more than this fraction of pages out of the search index"
+        )
+
+        arg_group.add_argument(
+            "--pack-content",
+            dest="pack_content",
+            default=False,
+            action="store_true",
+            help="Pack content pages into a few large files rather than one file per page. Requires a web server that supports Range requests for best performance"
+        )
+
+        arg_group.add_argument(
+            "--no-search-snippets",
+            dest="search_snippets",
+            default=True,
+            action="store_false",
+            help="Do not store preview text alongside the search index. Search result previews are taken from the content pages instead"
+        )
+
+        arg_group.add_argument(
+            "--progress",
+            dest="progress",
+            default=False,
+            action="store_true",
+            help="Print export progress to stderr"
+        )
+
+        arg_group.add_argument(
+            "--profile",
+            dest="profile",
+            default=False,
+            action="store_true",
+            help="Print a summary of export phase times and counters"
+        )
+
+        arg_group.add_argument(
+            "--profile-output",
+            dest="profile_output",
+            metavar="FILE",
+            default=None,
+            help="Write a profiling report to FILE. If FILE ends with '.json', the export summary is written as JSON. Otherwise the export is run under cProfile and its stats are written in pstats format"
+        )
+
     def do_export(self, top_node: 'AddrmapNode', options: 'argparse.Namespace') -> None:
         generate_source_links = self.cfg['generate_source_links']
         if generate_source_links is None:
@@ -62,6 +276,11 @@ class Exporter(ExporterSubcommandPlugin):
 
         reverse_fields = options.reverse_fields or self.cfg['reverse_fields']
 
+        if options.progress:
+            progress = ProgressPrinter() # type: Optional[ProgressPrinter]
+        else:
+            progress = None
+
         html = HTMLExporter(
             show_signals=options.show_signals,
             reverse_fields=reverse_fields,
@@ -69,10 +288,83 @@ class Exporter(ExporterSubcommandPlugin):
             user_static_dir=self.cfg['user_static_dir'],
             extra_doc_properties=self.cfg['extra_doc_properties'],
             generate_source_links=generate_source_links,
+            desc_cache_dir=self.cfg['desc_cache_dir'],
+            template_cache_dir=self.cfg['template_cache_dir'],
+            ral_data_format=options.ral_data_format,
+            lazy_ral_data=options.lazy_ral_data,
+            content_filenames=options.content_filenames,
+            streaming=options.streaming,
+            image_link_mode=options.image_link_mode,
+            static_store_dir=options.static_store_dir,
+            static_url=options.static_url,
+            search_in_worker=options.search_in_worker,
+            virtual_sidebar=options.virtual_sidebar,
+            search_index_memory_budget=(
+                None if options.search_index_memory is None
+                else options.search_index_memory * 1024 * 1024
+            ),
+            search_index_format=options.search_index_format,
+            search_stop_word_ratio=options.search_stop_word_ratio,
+            search_snippets=options.search_snippets,
+            pack_content=options.pack_content,
+            progress_callback=progress,
         )
-        html.export(
-            top_node,
-            options.output,
-            title=options.title,
-            home_url=options.home_url,
-        )
+
+        if options.archive:
+            output = get_archive_sink(options.output) # type: Union[str, OutputSink]
+        else:
+            output = options.output
+
+        profile_output = options.profile_output
+        if profile_output is not None and not profile_output.endswith(".json"):
+            profiler = cProfile.Profile() # type: Optional[cProfile.Profile]
+        else:
+            profiler = None
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            html.export(
+                top_node,
+                output,
+                title=options.title,
+                home_url=options.home_url,
+                jobs=options.jobs,
+                incremental=options.incremental,
+                precompress=options.precompress,
+            )
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if progress is not None:
+                progress.close()
+
+        if options.profile:
+            print(html.stats.format_summary())
+
+        if profiler is not None:
+            profiler.dump_stats(profile_output)
+        elif profile_output is not None:
+            with open(profile_output, "w", encoding="utf-8") as f:
+                json.dump(html.stats.to_dict(), f, indent=2)
+
+
+# Archive file extension: tarfile mode
+TAR_MODES = [
+    (".tar", "w"),
+    (".tar.gz", "w:gz"),
+    (".tgz", "w:gz"),
+    (".tar.bz2", "w:bz2"),
+    (".tar.xz", "w:xz"),
+]
+
+def get_archive_sink(path: str) -> 'OutputSink':
+    if path.endswith(".zip"):
+        return ZipSink(path)
+    for ext, mode in TAR_MODES:
+        if path.endswith(ext):
+            return TarSink(path, mode)
+    raise ValueError(
+        "Unrecognized archive extension of '%s'. Expected one of: .zip, %s"
+        % (path, ", ".join(ext for ext, _ in TAR_MODES))
+    )
@@ -0,0 +1,60 @@
+import os
+import stat
+import hashlib
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, Tuple, Optional
+    from .output import OutputDirectory
+
+class AssetRegistry:
+    """
+    Places files that are referenced by descriptions, such as images, into
+    the output.
+
+    Each file is named after a hash of its contents. Files are identified by
+    their resolved path, size and modification time, so a file that is
+    referenced by many descriptions, or by many instances of the same
+    description, is only hashed and placed once per export.
+    """
+    def __init__(self, output: 'OutputDirectory', subdir: str, link_mode: str="copy") -> None:
+        self.output = output
+        self.subdir = subdir
+        self.link_mode = link_mode
+
+        # (realpath, size, mtime_ns): relpath within the output
+        self._assets = {} # type: Dict[Tuple[str, int, int], str]
+        self._lock = threading.Lock()
+
+
+    def add(self, path: str) -> 'Optional[str]':
+        """
+        Place the file at path into the output, if it was not already.
+        Returns its path relative to the output, or None if the file does not
+        exist.
+        """
+        try:
+            realpath = os.path.realpath(path)
+            st = os.stat(realpath)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        key = (realpath, st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            relpath = self._assets.get(key, None)
+        if relpath is not None:
+            return relpath
+
+        md5 = hashlib.md5()
+        with open(realpath, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                md5.update(block)
+        relpath = "%s/%s_%s" % (self.subdir, md5.hexdigest()[0:8], os.path.basename(path))
+        self.output.link_file(realpath, relpath, self.link_mode)
+
+        with self._lock:
+            self._assets[key] = relpath
+        return relpath
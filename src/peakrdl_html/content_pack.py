@@ -0,0 +1,93 @@
+import sys
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import List
+    from .output import OutputDirectory
+
+class ContentPack:
+    """
+    Packs content pages into a small number of large segment files rather
+    than writing one file per page.
+
+    Pages can be added in any order. They are appended to the current segment
+    file (pack-#.bin), which is written out once it reaches the size
+    threshold.
+
+    The location of each page is stored in index files (pack-index-#.bin),
+    each of which covers PAGES_PER_INDEX_FILE consecutive page IDs.
+    Each page's entry is 3x little-endian u32:
+        [0] Segment file index
+        [1] Byte offset within the segment
+        [2] Length in bytes
+    """
+    # Rough limit of how many bytes each segment file should have
+    BYTES_PER_FILE_THRESHOLD = 4 * 1024 * 1024
+
+    # Number of page entries per index file
+    PAGES_PER_INDEX_FILE = 4096
+
+    def __init__(self, output: 'OutputDirectory', subdir: str) -> None:
+        self.output = output
+        self.subdir = subdir
+
+        # Location of each page, indexed by page_id
+        self.page_segments = array('I')
+        self.page_offsets = array('I')
+        self.page_lengths = array('I')
+
+        # Contents of the current segment file
+        self.segment_idx = 0
+        self.segment = [] # type: List[bytes]
+        self.segment_size = 0
+
+
+    def add(self, page_id: int, data: bytes) -> None:
+        if page_id >= len(self.page_segments):
+            n_new = page_id + 1 - len(self.page_segments)
+            self.page_segments.extend([0] * n_new)
+            self.page_offsets.extend([0] * n_new)
+            self.page_lengths.extend([0] * n_new)
+
+        self.page_segments[page_id] = self.segment_idx
+        self.page_offsets[page_id] = self.segment_size
+        self.page_lengths[page_id] = len(data)
+
+        self.segment.append(data)
+        self.segment_size += len(data)
+        if self.segment_size >= self.BYTES_PER_FILE_THRESHOLD:
+            self._write_segment()
+
+
+    def _write_segment(self) -> None:
+        self.output.write_file(
+            "%s/pack-%d.bin" % (self.subdir, self.segment_idx),
+            b"".join(self.segment)
+        )
+        self.segment_idx += 1
+        self.segment = []
+        self.segment_size = 0
+
+
+    def finalize(self) -> None:
+        """
+        Writes out the remaining segment file, and the index files
+        """
+        if self.segment:
+            self._write_segment()
+
+        n_pages = len(self.page_segments)
+        for start in range(0, n_pages, self.PAGES_PER_INDEX_FILE):
+            end = min(start + self.PAGES_PER_INDEX_FILE, n_pages)
+            entries = array('I')
+            for page_id in range(start, end):
+                entries.append(self.page_segments[page_id])
+                entries.append(self.page_offsets[page_id])
+                entries.append(self.page_lengths[page_id])
+            if sys.byteorder != "little":
+                entries.byteswap()
+            self.output.write_file(
+                "%s/pack-index-%d.bin" % (self.subdir, start // self.PAGES_PER_INDEX_FILE),
+                entries.tobytes()
+            )
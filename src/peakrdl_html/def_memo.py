@@ -0,0 +1,229 @@
+import itertools
+from typing import TYPE_CHECKING, Callable, TypeVar
+
+from systemrdl.node import Node, RootNode, AddressableNode, FieldNode, RegNode
+from systemrdl import rdltypes
+
+from .stringify import stringify_rdl_value
+
+if TYPE_CHECKING:
+    from typing import Optional, Hashable, Tuple, List, Dict, Any
+
+T = TypeVar('T')
+
+class DefinitionMemo:
+    """
+    Memoizes values derived from a node that only depend on the node's
+    component definition, and not on where it is instantiated.
+
+    Large designs typically instantiate the same register or regfile type
+    thousands of times. Values such as the list of assigned properties, field
+    layout or stringified property values are computed once per unique
+    definition rather than once per instance.
+    """
+    # Limit of how many component instances to remember the definition id of
+    INST_CACHE_SIZE = 4096
+
+    def __init__(self, extra_properties: 'List[str]') -> None:
+        self.extra_properties = extra_properties
+
+        # Interned definitions
+        #   (definition segment, parent def_id): def_id
+        self._def_ids = {} # type: Dict[Tuple[Hashable, int], int]
+        self._def_id_counter = itertools.count(1)
+
+        # Recently looked-up definition ids
+        #   component instance: def_id
+        self._inst_def_ids = {} # type: Dict[Any, Optional[int]]
+
+        # Memoized values
+        #   (def_id, kind): value
+        self._cache = {} # type: Dict[Tuple[int, str], Any]
+
+
+    def clear(self) -> None:
+        self._def_ids.clear()
+        self._inst_def_ids.clear()
+        self._cache.clear()
+
+
+    def get_def_id(self, node: Node) -> 'Optional[int]':
+        """
+        Returns an integer that identifies the node's elaborated component
+        definition, including the definitions of each of its ancestors.
+
+        Nodes with equal ids are instances of the same definition, in the same
+        context. Returns None if the definition cannot be safely identified.
+        """
+        if isinstance(node, RootNode):
+            return 0
+
+        inst = node.inst
+        try:
+            return self._inst_def_ids[inst]
+        except KeyError:
+            pass
+
+        def_id = None # type: Optional[int]
+        # Only the root node has no parent
+        assert node.parent is not None
+        parent_def_id = self.get_def_id(node.parent)
+        if parent_def_id is not None:
+            segment = get_def_segment(node)
+            if segment is not None:
+                key = (segment, parent_def_id)
+                def_id = self._def_ids.get(key, None)
+                if def_id is None:
+                    def_id = self._def_ids.setdefault(key, next(self._def_id_counter))
+
+        if len(self._inst_def_ids) >= self.INST_CACHE_SIZE:
+            self._inst_def_ids.clear()
+        self._inst_def_ids[inst] = def_id
+        return def_id
+
+
+    def memoize(self, node: Node, kind: str, fn: 'Callable[[], T]') -> T:
+        """
+        Return the memoized value of fn() for node's definition.
+        kind is used to distinguish different values of the same node.
+        """
+        def_id = self.get_def_id(node)
+        if def_id is None:
+            # Not safe to share
+            return fn()
+
+        key = (def_id, kind)
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = fn()
+            self._cache[key] = value
+            return value
+
+
+    def list_properties(self, node: Node) -> 'List[str]':
+        return self.memoize(node, "list_properties", node.list_properties)
+
+
+    def has_description(self, node: Node) -> bool:
+        """
+        Test if node has a description defined
+        """
+        return "desc" in self.list_properties(node)
+
+
+    def has_enum_encoding(self, field: FieldNode) -> bool:
+        """
+        Test if field is encoded with an enum
+        """
+        return "encode" in self.list_properties(field)
+
+
+    def has_extra_property_doc(self, node: Node) -> bool:
+        """
+        Returns True if node has a property set that is to be explicitly
+        documented.
+        """
+        def _has_extra_property_doc() -> bool:
+            props = set(node.list_properties())
+            for prop in self.extra_properties:
+                if prop in props:
+                    return True
+            return False
+        return self.memoize(node, "has_extra_property_doc", _has_extra_property_doc)
+
+
+    def reg_fields_are_low_to_high(self, node: RegNode) -> bool:
+        def _reg_fields_are_low_to_high() -> bool:
+            for field in node.fields():
+                if field.msb < field.lsb:
+                    return True
+            return False
+        return self.memoize(node, "reg_fields_are_low_to_high", _reg_fields_are_low_to_high)
+
+
+    def stringify_property(self, node: Node, prop: str) -> str:
+        """
+        Stringify the value of node's property
+        """
+        value = node.get_property(prop)
+        if not is_position_independent(value):
+            # Value refers to other nodes relative to this one
+            return stringify_rdl_value(value, node)
+        return self.memoize(
+            node, "stringify:" + prop,
+            lambda: stringify_rdl_value(value, node)
+        )
+
+
+def get_def_segment(node: Node) -> 'Optional[Hashable]':
+    """
+    Returns a hashable key that identifies the node's own elaborated component
+    definition, within the context of its parent's definition.
+    Returns None if the definition cannot be safely identified.
+    """
+    if not node.env.use_extended_type_name_gen:
+        # Type names do not account for dynamic property assignments
+        return None
+
+    inst = node.inst
+    if inst.original_def is None:
+        # Component originated from an external importer
+        return None
+
+    if inst.type_name is not None:
+        # Elaborated type name accounts for parameter overrides and dynamic
+        # property assignments
+        if isinstance(node, AddressableNode):
+            return (inst.original_def, inst.type_name)
+        # Fields and signals can have properties (such as the reset value)
+        # assigned as part of their instantiation
+        return (inst.original_def, inst.type_name, inst.inst_name)
+
+    # Anonymous definitions do not get an elaborated type name.
+    # Identify them by their assigned property values instead
+    props = freeze_value(sorted(inst.properties.items()))
+    if props is None:
+        return None
+    return (inst.original_def, inst.inst_name, props)
+
+
+def freeze_value(value: 'Any') -> 'Optional[Hashable]':
+    """
+    Convert a property value into a hashable equivalent.
+    Returns None if the value cannot be represented.
+    """
+    if value is None:
+        return ("none",)
+    if isinstance(value, (bool, int, str, rdltypes.BuiltinEnum, rdltypes.UserEnum)):
+        return (type(value), value)
+    if rdltypes.is_user_enum(value):
+        return ("enum_type", value)
+    if isinstance(value, (list, tuple)):
+        elements = []
+        for element in value:
+            frozen = freeze_value(element)
+            if frozen is None:
+                return None
+            elements.append(frozen)
+        return tuple(elements)
+    if isinstance(value, rdltypes.UserStruct):
+        members = freeze_value(sorted(value._values.items())) # pylint: disable=protected-access
+        if members is None:
+            return None
+        return (type(value), members)
+    return None
+
+
+def is_position_independent(value: 'Any') -> bool:
+    """
+    Test whether the stringified value is the same regardless of the owner
+    node's position in the hierarchy.
+    """
+    if isinstance(value, (Node, rdltypes.PropertyReference)):
+        return False
+    if isinstance(value, list):
+        return all(is_position_independent(element) for element in value)
+    if isinstance(value, rdltypes.UserStruct):
+        return all(is_position_independent(v) for v in value._values.values()) # pylint: disable=protected-access
+    return True
@@ -0,0 +1,153 @@
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+import markdown
+import systemrdl
+from systemrdl.node import Node, AddressableNode
+
+from .__about__ import __version__
+
+if TYPE_CHECKING:
+    from typing import Optional, Hashable, Tuple, Any, List
+
+class DescriptionCache:
+    """
+    Cache of rendered HTML descriptions.
+
+    Rendered descriptions are kept in a bounded in-memory LRU so that the
+    description text shared by every instance of a reused component type is
+    only run through the Markdown pipeline once.
+
+    If a cache directory is provided, the raw output of the Markdown processor
+    is also stored on disk so that it can be reused across exports.
+    """
+    def __init__(self, max_size: int=4096, cache_dir: 'Optional[str]'=None) -> None:
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+
+        self._lru = OrderedDict() # type: OrderedDict[Hashable, str]
+        self._lock = threading.Lock()
+
+        # Fingerprint of the Markdown processor's configuration.
+        # Included in persistent cache keys so that a change in configuration
+        # invalidates stale entries
+        self._md_fingerprint = None # type: Optional[str]
+
+
+    def clear(self) -> None:
+        """
+        Discard all in-memory entries
+        """
+        with self._lock:
+            self._lru.clear()
+
+
+    def lookup(self, key: 'Hashable') -> 'Optional[str]':
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            value = self._lru.get(key, None)
+            if value is None:
+                return None
+            self._lru.move_to_end(key)
+        return value
+
+
+    def store(self, key: 'Hashable', value: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+
+    def _get_persistent_path(self, md: 'markdown.Markdown', key: 'Tuple[Any, ...]') -> str:
+        assert self.cache_dir is not None
+        if self._md_fingerprint is None:
+            self._md_fingerprint = get_markdown_fingerprint(md)
+        h = hashlib.sha1(self._md_fingerprint.encode('utf-8'))
+        h.update(repr(key).encode('utf-8'))
+        digest = h.hexdigest()
+        return os.path.join(self.cache_dir, digest[0:2], digest[2:] + ".html")
+
+
+    def lookup_persistent(self, md: 'markdown.Markdown', key: 'Tuple[Any, ...]') -> 'Optional[str]':
+        if self.cache_dir is None:
+            return None
+        path = self._get_persistent_path(md, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+    def store_persistent(self, md: 'markdown.Markdown', key: 'Tuple[Any, ...]', value: str) -> None:
+        if self.cache_dir is None:
+            return
+        path = self._get_persistent_path(md, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so that concurrent exports never
+        # observe a partially written entry
+        tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+
+def get_markdown_fingerprint(md: 'markdown.Markdown') -> str:
+    """
+    Summarize the version and configuration of the Markdown processor, and of
+    the compiler that converts RDLFormatCode before it
+    """
+    segments = [
+        "peakrdl-html %s" % __version__,
+        "systemrdl %s" % systemrdl.__version__,
+        "markdown %s" % markdown.__version__,
+        md.output_format,
+    ]
+    for ext in md.registeredExtensions:
+        configs = sorted(ext.getConfigs().items())
+        segments.append("%s.%s%r" % (type(ext).__module__, type(ext).__qualname__, configs))
+
+    registries = [
+        md.preprocessors, md.parser.blockprocessors, md.inlinePatterns,
+        md.treeprocessors, md.postprocessors,
+    ] # type: List[markdown.util.Registry[Any]]
+    for registry in registries:
+        for item in registry:
+            segments.append("%s.%s" % (type(item).__module__, type(item).__qualname__))
+
+    return ",".join(segments)
+
+
+# RDLFormatCode tags that are substituted with node-specific content
+NODE_SPECIFIC_TAGS_RE = re.compile(r'\[(?:index|index_parent|name|instname)\]')
+
+def get_node_context(node: Node, desc: str) -> 'Optional[Tuple[Any, ...]]':
+    """
+    If the description contains RDLFormatCode tags whose rendering depends on
+    the node, returns a tuple of the node-specific values involved.
+    Otherwise returns None
+    """
+    if NODE_SPECIFIC_TAGS_RE.search(desc) is None:
+        return None
+
+    def _array_ctx(n: 'Optional[Node]') -> 'Any':
+        if isinstance(n, AddressableNode) and n.array_dimensions:
+            return (tuple(n.array_dimensions), n.current_idx and tuple(n.current_idx))
+        return None
+
+    return (
+        node.get_property('name'),
+        node.inst_name,
+        _array_ctx(node),
+        _array_ctx(node.parent),
+    )
@@ -0,0 +1,147 @@
+import time
+import heapq
+import contextlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Tuple, Iterator, Any
+
+class ExportStats:
+    """
+    Timing and counters collected during an export.
+
+    Phase times are wall-clock times of the export's top-level phases.
+    Page render and Markdown times are summed across all pages, so they can
+    exceed the wall-clock time when pages are rendered in parallel.
+    """
+    # Number of slowest pages to keep track of
+    N_SLOWEST_PAGES = 10
+
+    def __init__(self) -> None:
+        # phase name: seconds
+        self.phase_times = OrderedDict() # type: Dict[str, float]
+
+        self.nodes_visited = 0
+        self.pages_written = 0
+        self.files_written = 0
+        self.bytes_written = 0
+        self.page_render_time = 0.0
+
+        self.markdown_calls = 0
+        self.markdown_time = 0.0
+        self.desc_cache_hits = 0
+        self.desc_cache_misses = 0
+        self.persistent_cache_hits = 0
+
+        # Min-heap of (seconds, node path) of the slowest pages to render
+        self._slowest_pages = [] # type: List[Tuple[float, str]]
+
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> 'Iterator[None]':
+        """
+        Context manager that adds the time spent within it to the named phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + elapsed
+
+
+    def is_slow_page(self, elapsed: float) -> bool:
+        """
+        Check whether a page that took this long to render would be kept in
+        the list of slowest pages
+        """
+        return (
+            len(self._slowest_pages) < self.N_SLOWEST_PAGES
+            or elapsed > self._slowest_pages[0][0]
+        )
+
+
+    def add_page(self, path: str, elapsed: float) -> None:
+        self.pages_written += 1
+        self.page_render_time += elapsed
+        self._add_slow_page(path, elapsed)
+
+
+    def _add_slow_page(self, path: str, elapsed: float) -> None:
+        if len(self._slowest_pages) < self.N_SLOWEST_PAGES:
+            heapq.heappush(self._slowest_pages, (elapsed, path))
+        elif elapsed > self._slowest_pages[0][0]:
+            heapq.heapreplace(self._slowest_pages, (elapsed, path))
+
+
+    @property
+    def slowest_pages(self) -> 'List[Tuple[str, float]]':
+        """
+        List of (node path, seconds) of the slowest pages to render, slowest
+        first
+        """
+        return [(path, elapsed) for elapsed, path in sorted(self._slowest_pages, reverse=True)]
+
+
+    def merge(self, other: 'ExportStats') -> None:
+        """
+        Add the counters collected by a page rendering worker
+        """
+        for name, elapsed in other.phase_times.items():
+            self.phase_times[name] = self.phase_times.get(name, 0.0) + elapsed
+        self.nodes_visited += other.nodes_visited
+        self.pages_written += other.pages_written
+        self.files_written += other.files_written
+        self.bytes_written += other.bytes_written
+        self.page_render_time += other.page_render_time
+        self.markdown_calls += other.markdown_calls
+        self.markdown_time += other.markdown_time
+        self.desc_cache_hits += other.desc_cache_hits
+        self.desc_cache_misses += other.desc_cache_misses
+        self.persistent_cache_hits += other.persistent_cache_hits
+        for elapsed, path in other._slowest_pages: # pylint: disable=protected-access
+            self._add_slow_page(path, elapsed)
+
+
+    def to_dict(self) -> 'Dict[str, Any]':
+        return OrderedDict([
+            ("phases_s", OrderedDict(self.phase_times)),
+            ("total_s", sum(self.phase_times.values())),
+            ("nodes_visited", self.nodes_visited),
+            ("pages_written", self.pages_written),
+            ("files_written", self.files_written),
+            ("bytes_written", self.bytes_written),
+            ("page_render_s", self.page_render_time),
+            ("markdown_calls", self.markdown_calls),
+            ("markdown_s", self.markdown_time),
+            ("desc_cache_hits", self.desc_cache_hits),
+            ("desc_cache_misses", self.desc_cache_misses),
+            ("persistent_cache_hits", self.persistent_cache_hits),
+            ("slowest_pages", [
+                OrderedDict([("path", path), ("seconds", elapsed)])
+                for path, elapsed in self.slowest_pages
+            ]),
+        ])
+
+
+    def format_summary(self) -> str:
+        lines = ["Export summary:"]
+        for name, elapsed in self.phase_times.items():
+            lines.append("  %-22s %8.3fs" % (name, elapsed))
+        lines.append("  %-22s %8.3fs" % ("total", sum(self.phase_times.values())))
+        lines.append("")
+        lines.append("  %-22s %8d" % ("Nodes visited", self.nodes_visited))
+        lines.append("  %-22s %8d (%.3fs total)" % ("Pages written", self.pages_written, self.page_render_time))
+        lines.append("  %-22s %8d (%d bytes)" % ("Files written", self.files_written, self.bytes_written))
+        lines.append("  %-22s %8d (%.3fs total)" % ("Markdown calls", self.markdown_calls, self.markdown_time))
+        lines.append("  %-22s %8d (%d misses, %d on-disk hits)" % (
+            "Description cache hits", self.desc_cache_hits,
+            self.desc_cache_misses, self.persistent_cache_hits
+        ))
+        if self._slowest_pages:
+            lines.append("")
+            lines.append("  Slowest pages:")
+            for path, elapsed in self.slowest_pages:
+                lines.append("    %8.3fs  %s" % (elapsed, path))
+        return "\n".join(lines)
@@ -3,11 +3,14 @@ import re
 import time
 import json
 import math
-import shutil
+import copy
 import hashlib
+import threading
+import multiprocessing
 import xml.dom.minidom
 from collections import OrderedDict
-from typing import TYPE_CHECKING
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, cast
 
 import jinja2 as jj
 import markdown
@@ -20,13 +23,37 @@ from systemrdl.source_ref import FileSourceRef, DetailedFileSourceRef
 
 from .stringify import stringify_rdl_value
 from .search_indexer import SearchIndexer
+from .snippet_store import SnippetStore
+from .content_pack import ContentPack
+from .export_stats import ExportStats
+from .output import OutputDirectory, list_trees
+from .output_sink import OutputSink
+from .ral_stream import RALDataStream
+from .asset_registry import AssetRegistry
+from .static_store import StaticAssetStore, get_bundle_digest
+from .source_links import SourceLinkResolver
+from .desc_cache import DescriptionCache, get_node_context
+from .template_cache import TemplateBytecodeCache
+from .def_memo import DefinitionMemo
+from . import ral_binary
 from .__about__ import __version__
 
 if TYPE_CHECKING:
-    from typing import Any, Optional, Tuple, List, Dict, Union
+    from typing import Any, Optional, Tuple, List, Dict, Union, Callable, Iterator
     from systemrdl.source_ref import SourceRefBase
 
 class HTMLExporter:
+    # Number of nodes per JSON RAL data file
+    N_RAL_NODES_PER_FILE = 16384
+
+    # In streaming mode, number of pages that are deferred for parallel
+    # rendering before they are rendered
+    PENDING_PAGES_BATCH_SIZE = 8192
+
+    # Static files that make up the viewer, and can be shared between exports
+    # using static_store_dir or static_url
+    SHARED_STATIC_PREFIXES = ("css/", "js/", "fonts/", "favicon.png")
+
     def __init__(self, **kwargs: 'Any') -> None:
         """
         Constructor for the HTML exporter class
@@ -54,8 +81,108 @@ class HTMLExporter:
             table in the node's description.
             Use this to bring forward user-defined properties, or other built-in
             properties in your documentation.
+        desc_cache_size: int
+            Maximum number of rendered descriptions to keep in the in-memory
+            cache. Set to 0 to disable the cache. Default is 4096
+        desc_cache_dir: str
+            (optional) Path to a directory where rendered Markdown is stored so
+            that it can be reused by subsequent exports.
+        template_cache_dir: str
+            (optional) Path to a directory where compiled templates are stored
+            so that they can be reused by subsequent exports.
+        ral_data_format: str
+            Encoding of the register model data that is loaded by the viewer.
+            "json" or "binary". The binary format is a compact columnar encoding
+            that loads faster for large designs. Default is "json"
+        lazy_ral_data: bool
+            If True, register model data is grouped into chunks by subtree, and
+            the viewer only fetches the chunks it needs for the current page.
+            Remaining chunks are loaded in the background. Default is False
+        content_filenames: str
+            Naming scheme of the generated content pages.
+            "hash" names each page after a hash of the node's path, which keeps
+            filenames stable when unrelated parts of the design change.
+            "id" names each page after the node's numeric id, which avoids
+            hashing paths during export and in the viewer. Default is "hash"
+        search_in_worker: bool
+            If True, the viewer runs searches in a Web Worker so that the page
+            stays responsive while typing. Falls back to searching in the main
+            thread if workers are unavailable, such as when the page is opened
+            via a ``file://`` URL. Default is False
+        virtual_sidebar: bool
+            If True, the viewer's sidebar tree only creates elements for the
+            rows that are scrolled into view, rather than for every child of
+            each expanded node. Keeps the viewer responsive when expanding
+            nodes that have tens of thousands of children. Default is False
+        search_index_memory_budget: int
+            Approximate limit, in bytes, of how much memory the search index may
+            occupy while it is being built. Once exceeded, the index is spilled
+            to temporary files and merged when it is written out.
+            Default is None (unlimited)
+        search_index_format: str
+            Format of the search index files.
+            "json" stores word locations as plain JSON arrays.
+            "compact" stores them as delta-encoded varints, and splits the
+            index files by size rather than by word count, which keeps the
+            files for very common words small. Default is "json"
+        search_stop_word_ratio: float
+            If set, words that appear in more than this fraction of pages are
+            left out of the search index and ignored in search queries.
+            For example, 0.5 drops words that appear on more than half of
+            all pages. Default is None (disabled)
+        search_snippets: bool
+            If True, the plain text of each name and description is also
+            stored alongside the search index, so that search result previews
+            do not need to fetch and parse the entire content page.
+            Default is True
+        pack_content: bool
+            If True, content pages are packed into a small number of large
+            files rather than writing one file per page. The viewer retrieves
+            individual pages using HTTP Range requests, or loads entire packs
+            if the web server does not support them. Default is False
+        streaming: bool
+            If True, register model data is written out in chunks as soon as
+            they are complete, and pages deferred for parallel rendering are
+            rendered in batches, rather than holding them for the entire
+            export. Peak memory use then stays roughly constant as designs
+            grow. Requires the "json" ral_data_format, and is not compatible
+            with lazy_ral_data. Default is False
+        image_link_mode: str
+            How images referenced by descriptions are placed into the output.
+            "copy" copies each image. "hardlink" and "reflink" link to the
+            original file instead, which avoids duplicating large images on
+            disk. Falls back to copying if linking is not possible, such as
+            when exporting to an archive, or to a different filesystem.
+            Default is "copy"
+        static_store_dir: str
+            (optional) Directory of static asset bundles that is shared by
+            multiple exports. The viewer's static files (stylesheets, scripts,
+            fonts and icon) are stored in a subdirectory that is named after a
+            digest of their contents, unless an identical bundle is already
+            present. Unless static_url is also set, the files are then
+            hard-linked from the store into the output, falling back to
+            copying if linking is not possible.
+        static_url: str
+            (optional) URL prefix, absolute or relative to the output's
+            index.html, that the viewer's static files are loaded from rather
+            than being placed in the output. Any occurrence of ``{digest}`` is
+            replaced by the digest of the static files, so that the URL can
+            point at a bundle within static_store_dir. Each version of the
+            static files then gets a distinct URL, which lets browsers cache
+            them across sites.
+        progress_callback: Callable[[str, int, Optional[int]], None]
+            (optional) Function that is called as the export progresses, for
+            tools that embed the exporter and wish to report its progress.
+            It is called with the name of the current phase, the number of
+            items completed so far, and the total number of items if known.
+            Each phase is announced with 0 items completed before any work is
+            done. Phases are: "traverse" (nodes visited; pages are rendered
+            during traversal unless parallel jobs are used), "render" (pages
+            rendered by parallel jobs), "ral_data", "index_page",
+            "search_index" and "finalize".
         """
-        self.output_dir = "" # type: str
+        self.output_dir = "" # type: Union[str, OutputSink]
+        self.output = None # type: Optional[OutputDirectory]
         self.RALData = [] # type: List[Dict[str, Any]]
         self.RootNodeIds = [] # type: List[int]
         self.current_id = -1
@@ -65,6 +192,16 @@ class HTMLExporter:
         self.skip_not_present = True
         self.reverse_fields = False
         self.current_top_node = None # type: AddrmapNode
+        self.jobs = 1
+        self.pending_pages = [] # type: List[Tuple[int, Node, Dict[int, Node], AddrmapNode]]
+        self.page_templates = {} # type: Dict[type, jj.Template]
+        self.ral_stream = None # type: Optional[RALDataStream]
+        self.assets = None # type: Optional[AssetRegistry]
+        self.static_url_prefix = ""
+        self._thread_local = threading.local()
+
+        # Timing and counters of the most recent export
+        self.stats = ExportStats()
 
         self.user_static_dir = kwargs.pop("user_static_dir", None) # type: Optional[str]
         self.show_signals = kwargs.pop("show_signals", False)
@@ -75,11 +212,45 @@ class HTMLExporter:
         self.generate_source_links = kwargs.pop("generate_source_links", True)
         gmtu_translators = kwargs.pop("gitmetheurl_translators", None)
         user_template_dir = kwargs.pop("user_template_dir", None)
+        desc_cache_size = kwargs.pop("desc_cache_size", 4096) # type: int
+        desc_cache_dir = kwargs.pop("desc_cache_dir", None) # type: Optional[str]
+        template_cache_dir = kwargs.pop("template_cache_dir", None) # type: Optional[str]
+        self.ral_data_format = kwargs.pop("ral_data_format", "json") # type: str
+        self.lazy_ral_data = kwargs.pop("lazy_ral_data", False) # type: bool
+        self.content_filenames = kwargs.pop("content_filenames", "hash") # type: str
+        self.search_in_worker = kwargs.pop("search_in_worker", False) # type: bool
+        self.virtual_sidebar = kwargs.pop("virtual_sidebar", False) # type: bool
+        self.search_index_memory_budget = kwargs.pop("search_index_memory_budget", None) # type: Optional[int]
+        self.search_index_format = kwargs.pop("search_index_format", "json") # type: str
+        self.search_stop_word_ratio = kwargs.pop("search_stop_word_ratio", None) # type: Optional[float]
+        self.search_snippets = kwargs.pop("search_snippets", True) # type: bool
+        self.pack_content = kwargs.pop("pack_content", False) # type: bool
+        self.streaming = kwargs.pop("streaming", False) # type: bool
+        self.image_link_mode = kwargs.pop("image_link_mode", "copy") # type: str
+        static_store_dir = kwargs.pop("static_store_dir", None) # type: Optional[str]
+        self.static_url = kwargs.pop("static_url", None) # type: Optional[str]
+        self.progress_callback = kwargs.pop("progress_callback", None) # type: Optional[Callable[[str, int, Optional[int]], None]]
 
         # Check for stray kwargs
         if kwargs:
             raise TypeError("got an unexpected keyword argument '%s'" % list(kwargs.keys())[0])
 
+        if self.ral_data_format not in ("json", "binary"):
+            raise ValueError("Invalid ral_data_format '%s'" % self.ral_data_format)
+        if self.content_filenames not in ("hash", "id"):
+            raise ValueError("Invalid content_filenames '%s'" % self.content_filenames)
+        if self.search_index_format not in ("json", "compact"):
+            raise ValueError("Invalid search_index_format '%s'" % self.search_index_format)
+        if self.streaming and (self.ral_data_format != "json" or self.lazy_ral_data):
+            raise ValueError("streaming requires the 'json' ral_data_format, without lazy_ral_data")
+        if self.image_link_mode not in ("copy", "hardlink", "reflink"):
+            raise ValueError("Invalid image_link_mode '%s'" % self.image_link_mode)
+
+        if static_store_dir is None:
+            self.static_store = None # type: Optional[StaticAssetStore]
+        else:
+            self.static_store = StaticAssetStore(static_store_dir)
+
         if markdown_inst is None:
             self.markdown_inst = markdown.Markdown(
                 extensions = [
@@ -105,18 +276,30 @@ class HTMLExporter:
         else:
             loader = jj.FileSystemLoader(os.path.join(os.path.dirname(__file__), "templates"))
 
+        if template_cache_dir:
+            bytecode_cache = TemplateBytecodeCache(template_cache_dir) # type: Optional[jj.BytecodeCache]
+        else:
+            bytecode_cache = None
+
         self.jj_env = jj.Environment(
             loader=loader,
             autoescape=jj.select_autoescape(['html']),
-            undefined=jj.StrictUndefined
+            undefined=jj.StrictUndefined,
+            bytecode_cache=bytecode_cache,
         )
 
         self.gmtu = GitMeTheURL(gmtu_translators)
+        self.source_links = SourceLinkResolver(self.gmtu)
+
+        self.desc_cache = DescriptionCache(desc_cache_size, desc_cache_dir)
+        self.def_memo = DefinitionMemo(self.extra_properties)
 
         self.indexer = None # type: SearchIndexer
+        self.snippets = None # type: Optional[SnippetStore]
+        self.content_pack = None # type: Optional[ContentPack]
 
 
-    def export(self, nodes: 'Union[Node, List[Node]]', output_dir: str, **kwargs: 'Dict[str, Any]') -> None:
+    def export(self, nodes: 'Union[Node, List[Node]]', output_dir: 'Union[str, OutputSink]', **kwargs: 'Dict[str, Any]') -> None:
         """
         Perform the export!
 
@@ -126,8 +309,11 @@ class HTMLExporter:
             Top-level node to export. Can be the top-level `RootNode` or any
             internal `AddrmapNode`. Can also be a list of `RootNode` and any
             internal `AddrmapNode`.
-        output_dir: str
-            HTML output directory.
+        output_dir: str | OutputSink
+            HTML output directory, or an :class:`OutputSink` that the output
+            is written to instead, such as a :class:`ZipSink`, :class:`TarSink`
+            or :class:`MemorySink`. The sink is closed once the export is
+            complete.
         footer: str
             (optional) Override footer text.
         title: str
@@ -138,6 +324,21 @@ class HTMLExporter:
         skip_not_present: bool
             (optional) Control whether nodes with ispresent=false are generated.
             Default is True
+        jobs: int
+            (optional) Number of parallel workers used to render content pages.
+            If 0 or None, uses the number of CPUs available.
+            Default is 1 (render pages serially)
+        incremental: bool
+            (optional) If True, keep a manifest of content hashes in the output
+            directory and only re-write files whose contents changed since the
+            previous export. Stale files from the previous export are removed.
+            Default is False
+        precompress: bool
+            (optional) If True, files in the data, search and content
+            directories also get gzip (.gz) compressed copies, as well as
+            brotli (.br) copies if the ``brotli`` module is installed.
+            Web servers can serve these directly to clients that accept them.
+            Default is False
         """
 
         # if not a list
@@ -153,62 +354,177 @@ class HTMLExporter:
         self.title = kwargs.pop("title", "%s Reference" % nodes[0].get_property("name")) # type: ignore
         self.home_url = kwargs.pop("home_url", None) # type: ignore
         self.skip_not_present = kwargs.pop("skip_not_present", True) # type: ignore
+        jobs = cast('Optional[int]', kwargs.pop("jobs", 1))
+        incremental = cast(bool, kwargs.pop("incremental", False))
+        precompress = cast(bool, kwargs.pop("precompress", False))
 
         # Check for stray kwargs
         if kwargs:
             raise TypeError("got an unexpected keyword argument '%s'" % list(kwargs.keys())[0])
 
+        if not jobs:
+            jobs = os.cpu_count() or 1
+
+        self.stats = ExportStats()
         self.output_dir = output_dir
+        self.output = OutputDirectory(output_dir, incremental, precompress)
+        self.assets = AssetRegistry(self.output, "content", self.image_link_mode)
+        # Cached descriptions may refer to images that were copied into a
+        # previous output directory.
+        self.desc_cache.clear()
         self.RALData = []
         self.current_id = -1
-        self.indexer = SearchIndexer()
-
-        # Copy static files
-        static_dir = os.path.join(os.path.dirname(__file__), "static")
-        copy_recursive(static_dir, self.output_dir)
-        if self.user_static_dir:
-            copy_recursive(self.user_static_dir, self.output_dir)
+        self.jobs = jobs
+        self.pending_pages = []
+        self.def_memo.clear()
+        # The state of source repositories may have changed since the
+        # previous export
+        self.source_links.clear()
+        self.indexer = SearchIndexer(
+            self.def_memo,
+            memory_budget=self.search_index_memory_budget,
+            compact=(self.search_index_format == "compact"),
+            stop_word_ratio=self.search_stop_word_ratio,
+        )
+        if self.search_snippets:
+            self.snippets = SnippetStore(
+                self.output, "search",
+                self.get_node_html_desc, self.get_enum_html_desc
+            )
+        else:
+            self.snippets = None
+        if self.pack_content:
+            self.content_pack = ContentPack(self.output, "content")
+        else:
+            self.content_pack = None
+        if self.streaming:
+            self.ral_stream = RALDataStream(
+                self.output, self.N_RAL_NODES_PER_FILE,
+                PeakRDLJSEncoder(separators=(',', ':'))
+            )
+        else:
+            self.ral_stream = None
+        self.load_page_templates()
 
-        # Make sure output directory structure exists
-        os.makedirs(self.output_dir, exist_ok=True)
-        os.makedirs(os.path.join(self.output_dir, "content"), exist_ok=True)
-        os.makedirs(os.path.join(self.output_dir, "search"), exist_ok=True)
-        os.makedirs(os.path.join(self.output_dir, "data"), exist_ok=True)
+        with self.stats.phase("static_files"):
+            self.static_url_prefix = self.write_static_files()
 
         # Traverse trees
-        for node in nodes:
-            self.current_top_node = node
-            if node.get_property('bridge'):
-                node.env.msg.warning(
-                    "HTML generator does not have proper support for bridge addmaps yet. The 'bridge' property will be ignored.",
-                    node.property_src_ref.get('bridge', node.inst_src_ref)
-                )
-            self.visit_addressable_node(node)
+        with self.stats.phase("traverse"):
+            self._report_progress("traverse", 0, None)
+            for node in nodes:
+                self.current_top_node = node
+                if node.get_property('bridge'):
+                    node.env.msg.warning(
+                        "HTML generator does not have proper support for bridge addmaps yet. The 'bridge' property will be ignored.",
+                        node.property_src_ref.get('bridge', node.inst_src_ref)
+                    )
+                self.visit_addressable_node(node)
+
+        # Render any pages that were deferred for parallel rendering
+        if self.pending_pages:
+            with self.stats.phase("render"):
+                self.write_pending_pages()
+        if self.content_pack is not None:
+            with self.stats.phase("content_pack"):
+                self.content_pack.finalize()
 
         # Write out RALData and other data
-        self.write_ral_data()
+        with self.stats.phase("ral_data"):
+            self._report_progress("ral_data", 0, 1)
+            self.write_ral_data()
+            self._report_progress("ral_data", 1, 1)
 
         # Write main index.html
-        self.write_index_page()
+        with self.stats.phase("index_page"):
+            self._report_progress("index_page", 0, 1)
+            self.write_index_page()
+            self._report_progress("index_page", 1, 1)
 
         # Write search index
-        self.indexer.write_index_js(os.path.join(output_dir, "search"))
+        with self.stats.phase("search_index"):
+            self._report_progress("search_index", 0, 1)
+            self.indexer.write_index_js(self.output, "search")
+            if self.snippets is not None:
+                self.snippets.finalize()
+            self._report_progress("search_index", 1, 1)
+
+        with self.stats.phase("finalize"):
+            self._report_progress("finalize", 0, 1)
+            self.output.finalize()
+            self._report_progress("finalize", 1, 1)
+
+        # Include files written by this process. Files written by page
+        # rendering worker processes were already counted by the workers
+        self.stats.files_written += self.output.files_written
+        self.stats.bytes_written += self.output.bytes_written
+
+
+    def _report_progress(self, phase: str, completed: int, total: 'Optional[int]') -> None:
+        if self.progress_callback is not None:
+            self.progress_callback(phase, completed, total)
 
 
     def visit_addressable_node(self, node: AddressableNode, parent_id: 'Optional[int]'=None) -> int:
+        """
+        Visit node and all of its descendants in depth-first order.
+
+        Node ids are assigned in pre-order. Each node's page is generated once
+        all of its children were visited. An explicit stack is used rather
+        than recursion so that deep hierarchies are not limited by Python's
+        recursion limit.
+
+        Returns the id of node.
+        """
+        top_id, top_entry = self.enter_node(node, parent_id)
+        stack = [(
+            node, top_id, top_entry, OrderedDict(),
+            iter(node.children(skip_not_present=self.skip_not_present))
+        )] # type: List[Tuple[AddressableNode, int, Dict[str, Any], Dict[int, Node], Iterator[Node]]]
+
+        while stack:
+            this_node, this_id, ral_entry, children, child_iter = stack[-1]
+            for child in child_iter:
+                if not isinstance(child, AddressableNode):
+                    continue
+                child_id, child_entry = self.enter_node(child, this_id)
+                ral_entry['children'].append(child_id)
+                children[child_id] = child
+                stack.append((
+                    child, child_id, child_entry, OrderedDict(),
+                    iter(child.children(skip_not_present=self.skip_not_present))
+                ))
+                break
+            else:
+                # All children were visited
+                stack.pop()
+                self.leave_node(this_node, this_id, ral_entry, children)
+
+        return top_id
+
+
+    def enter_node(self, node: AddressableNode, parent_id: 'Optional[int]') -> 'Tuple[int, Dict[str, Any]]':
+        """
+        Assign the node's id and start its RAL data entry.
+        Returns the id and RAL data entry
+        """
         self.current_id += 1
         this_id = self.current_id
-        child_ids = [] # type: List[int]
+
+        self.stats.nodes_visited += 1
+        self._report_progress("traverse", self.stats.nodes_visited, None)
 
         self.indexer.add_node(node, this_id)
+        if self.snippets is not None:
+            self.snippets.add_node(node, this_id)
 
         ral_entry = {
             'parent'    : parent_id,
-            'children'  : child_ids,
+            'children'  : [],
             'name'      : node.inst_name,
             'offset'    : BigInt(node.raw_address_offset),
             'size'      : BigInt(node.size),
-        }
+        } # type: Dict[str, Any]
         if node.array_dimensions:
             assert node.array_stride is not None
             ral_entry['dims'] = node.array_dimensions
@@ -219,6 +535,8 @@ class HTMLExporter:
             ral_fields = []
             for i, field in enumerate(node.fields(skip_not_present=self.skip_not_present)):
                 self.indexer.add_node(field, this_id, i)
+                if self.snippets is not None:
+                    self.snippets.add_node(field, this_id, i)
 
                 field_reset = field.get_property("reset", default=0)
                 if isinstance(field_reset, Node):
@@ -243,56 +561,290 @@ class HTMLExporter:
 
             ral_entry['fields'] = ral_fields
 
-        # Insert entry now to ensure proper position in list
-        self.RALData.append(ral_entry)
+        if self.ral_stream is None:
+            # Insert entry now to ensure proper position in list
+            self.RALData.append(ral_entry)
 
         # Insert root nodes to list
         if parent_id is None:
             self.RootNodeIds.append(this_id)
 
-        # Recurse to children
-        children = OrderedDict()
-        for child in node.children(skip_not_present=self.skip_not_present):
-            if not isinstance(child, AddressableNode):
-                continue
-            child_id = self.visit_addressable_node(child, this_id)
-            child_ids.append(child_id)
-            children[child_id] = child
+        return this_id, ral_entry
+
+
+    def leave_node(self, node: AddressableNode, this_id: int, ral_entry: 'Dict[str, Any]', children: 'Dict[int, Node]') -> None:
+        """
+        Complete the node once all of its children were visited
+        """
+        if self.ral_stream is not None:
+            self.ral_stream.add(this_id, ral_entry)
 
         # Generate page for this node
-        self.write_page(this_id, node, children)
+        if self.jobs > 1:
+            # Defer rendering so that pages can be distributed to workers
+            self.pending_pages.append((this_id, node, children, self.current_top_node))
+            if self.streaming and len(self.pending_pages) >= self.PENDING_PAGES_BATCH_SIZE:
+                self.write_pending_pages()
+        else:
+            self.write_page(this_id, node, children)
 
-        return this_id
 
+    def write_pending_pages(self) -> None:
+        """
+        Render all pages that were deferred during traversal using a pool of
+        workers.
 
-    def write_ral_data(self) -> None:
-        N_RAL_NODES_PER_FILE = 16384
-        n_files = math.ceil(len(self.RALData)/N_RAL_NODES_PER_FILE)
+        A process pool is used if the platform is able to fork, since worker
+        processes inherit the elaborated register model without having to
+        pickle it. Otherwise falls back to a thread pool.
+        """
+        if not self.pending_pages:
+            return
+        assert self.output is not None
+
+        global _worker_exporter # pylint: disable=global-statement
+        _worker_exporter = self
+
+        jobs = min(self.jobs, len(self.pending_pages))
+        chunksize = max(1, len(self.pending_pages) // (jobs * 16))
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            pool = ProcessPoolExecutor(
+                jobs,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_page_worker,
+                initargs=(True,),
+            ) # type: Executor
+        else:
+            pool = ThreadPoolExecutor(
+                jobs,
+                initializer=_init_page_worker,
+                initargs=(False,),
+            )
 
-        # Write data index
-        PageInfo = {
-            "title" : self.title
-        }
-        path = os.path.join(self.output_dir, "data/data_index.js")
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write("var N_RAL_FILES = %d;\n" % n_files)
-            f.write("var N_RAL_NODES_PER_FILE = %d;\n" % N_RAL_NODES_PER_FILE)
+        # Resolve source links of all pages up front, so that workers inherit
+        # them rather than each resolving the same files
+        if self.generate_source_links:
+            self.source_links.resolve_files(
+                loc[0] for loc in (
+                    self.get_source_location(node)
+                    for _, node, _, _ in self.pending_pages
+                ) if loc is not None
+            )
+
+        n_pages = len(self.pending_pages)
+        self._report_progress("render", 0, n_pages)
+        try:
+            with pool:
+                results = pool.map(_write_page_job, range(n_pages), chunksize=chunksize)
+                for i, (manifest_entries, deferred_writes, packed_page, job_stats) in enumerate(results):
+                    self.output.merge(manifest_entries)
+                    self.output.replay(deferred_writes)
+                    self.stats.merge(job_stats)
+                    if packed_page is not None:
+                        # Packs are only written by the parent
+                        assert self.content_pack is not None
+                        self.content_pack.add(*packed_page)
+                    self._report_progress("render", i + 1, n_pages)
+        finally:
+            _worker_exporter = None
+            self.pending_pages = []
+
+
+    def get_markdown_inst(self) -> markdown.Markdown:
+        """
+        Returns the Markdown processor instance to use in the current worker.
+
+        Markdown instances are stateful, so each page rendering worker is given
+        its own copy.
+        """
+        return getattr(self._thread_local, "markdown_inst", self.markdown_inst)
+
+
+    def get_stats(self) -> ExportStats:
+        """
+        Returns the stats object that the current worker's counters are
+        collected in.
+
+        Each page rendering job collects its own stats, which are merged into
+        the export's stats by the parent.
+        """
+        return getattr(self._thread_local, "stats", self.stats)
 
-            f.write("var RootNodeIds = ")
-            f.write(PeakRDLJSEncoder(separators=(',', ':')).encode(self.RootNodeIds))
-            f.write(";\n")
 
-            f.write("var PageInfo = ")
-            f.write(PeakRDLJSEncoder(separators=(',', ':')).encode(PageInfo))
-            f.write(";\n")
+    def write_ral_data(self) -> None:
+        assert self.output is not None
+        if self.ral_stream is not None:
+            # Data files were already written during traversal
+            n_files = self.ral_stream.finalize()
+            self.write_ral_data_index(n_files, "json", nodes_per_file=self.N_RAL_NODES_PER_FILE)
+            return
+
+        skeleton = None # type: Optional[Tuple[Dict[int, Any], Dict[int, Any]]]
+        if self.lazy_ral_data:
+            start_ids, skeleton = self.partition_ral_data_by_subtree()
+        elif self.ral_data_format == "binary":
+            start_ids = self.partition_ral_data_by_size()
+        else:
+            start_ids = None
+
+        if self.ral_data_format == "binary":
+            # Binary data is always partitioned
+            assert start_ids is not None
+            try:
+                chunks = [
+                    ral_binary.encode_chunk(self.RALData[start:end], start)
+                    for start, end in zip(start_ids, start_ids[1:] + [len(self.RALData)])
+                ]
+            except OverflowError:
+                self.current_top_node.env.msg.warning(
+                    "Design contains address values that exceed 64 bits. Falling back to JSON RAL data format."
+                )
+            else:
+                self.write_ral_data_index(len(chunks), "binary", start_ids=start_ids, skeleton=skeleton)
+                for file_idx, data in enumerate(chunks):
+                    self.output.write_file("data/ral-data-%d.bin" % file_idx, data)
+                return
+
+        if start_ids is None:
+            n_files = math.ceil(len(self.RALData)/self.N_RAL_NODES_PER_FILE)
+            self.write_ral_data_index(n_files, "json", nodes_per_file=self.N_RAL_NODES_PER_FILE)
+            start_ids = [file_idx * self.N_RAL_NODES_PER_FILE for file_idx in range(n_files)]
+        else:
+            self.write_ral_data_index(len(start_ids), "json", start_ids=start_ids, skeleton=skeleton)
 
         # Write RALData files
-        for file_idx in range(n_files):
-            start = file_idx * N_RAL_NODES_PER_FILE
-            end = min((file_idx + 1) * N_RAL_NODES_PER_FILE, len(self.RALData))
-            path = os.path.join(self.output_dir, "data/ral-data-%d.json" % file_idx)
-            with open(path, 'w', encoding='utf-8') as f:
-                f.write(PeakRDLJSEncoder(separators=(',', ':')).encode(self.RALData[start:end]))
+        for file_idx, (start, end) in enumerate(zip(start_ids, start_ids[1:] + [len(self.RALData)])):
+            s = PeakRDLJSEncoder(separators=(',', ':')).encode(self.RALData[start:end])
+            self.output.write_file("data/ral-data-%d.json" % file_idx, s.encode('utf-8'))
+
+
+    def partition_ral_data_by_size(self) -> 'List[int]':
+        """
+        Split RALData into chunks of roughly RAL_BINARY_BYTES_PER_FILE.
+        Returns a list of the first node id of each chunk
+        """
+        RAL_BINARY_BYTES_PER_FILE = 1 << 20
+        start_ids = [0]
+        chunk_size = 0
+        for i, entry in enumerate(self.RALData):
+            entry_size = ral_binary.estimate_entry_size(entry)
+            if chunk_size and (chunk_size + entry_size > RAL_BINARY_BYTES_PER_FILE):
+                start_ids.append(i)
+                chunk_size = 0
+            chunk_size += entry_size
+        return start_ids
+
+
+    def partition_ral_data_by_subtree(self) -> 'Tuple[List[int], Tuple[Dict[int, Any], Dict[int, Any]]]':
+        """
+        Split RALData into chunks such that any subtree that is smaller than
+        RAL_LAZY_BYTES_PER_FILE is stored entirely within one chunk.
+        Nodes whose subtree is too large to fit in a chunk are "split". These
+        are also stored in a skeleton that the viewer loads up-front, along
+        with a short summary of each of their children.
+
+        Since node ids are assigned in depth-first order, each subtree occupies
+        a contiguous range of ids, and chunks remain contiguous ranges.
+        Loading the chunk that contains a node therefore also loads all of its
+        ancestors that are not part of the skeleton.
+
+        Returns a list of the first node id of each chunk, and the skeleton.
+        """
+        RAL_LAZY_BYTES_PER_FILE = 1 << 17
+        n_nodes = len(self.RALData)
+
+        # Determine the extent and weight of every subtree.
+        # Children always have larger ids than their parent, so a reverse pass
+        # visits all children first.
+        weights = [ral_binary.estimate_entry_size(entry) for entry in self.RALData]
+        subtree_ends = list(range(1, n_nodes + 1))
+        subtree_weights = list(weights)
+        for i in range(n_nodes - 1, -1, -1):
+            entry = self.RALData[i]
+            if entry['children']:
+                subtree_ends[i] = subtree_ends[entry['children'][-1]]
+            if entry['parent'] is not None:
+                subtree_weights[entry['parent']] += subtree_weights[i]
+
+        start_ids = [0]
+        chunk_weight = 0
+        split_ids = []
+        i = 0
+        while i < n_nodes:
+            if subtree_weights[i] <= RAL_LAZY_BYTES_PER_FILE:
+                # Entire subtree goes into a chunk
+                weight = subtree_weights[i]
+                end = subtree_ends[i]
+            else:
+                # Subtree is too large. Descend into its children
+                split_ids.append(i)
+                weight = weights[i]
+                end = i + 1
+
+            if chunk_weight and (chunk_weight + weight > RAL_LAZY_BYTES_PER_FILE):
+                start_ids.append(i)
+                chunk_weight = 0
+            chunk_weight += weight
+            i = end
+
+        skeleton_nodes = {}
+        skeleton_stubs = {}
+        for i in split_ids:
+            entry = self.RALData[i]
+            skeleton_nodes[i] = entry
+            for child_id in entry['children']:
+                child = self.RALData[child_id]
+                skeleton_stubs[child_id] = [
+                    i, child['name'], len(child.get('dims', [])), len(child['children'])
+                ]
+        for i in split_ids:
+            skeleton_stubs.pop(i, None)
+
+        return start_ids, (skeleton_nodes, skeleton_stubs)
+
+
+    def write_ral_data_index(
+        self, n_files: int, data_format: str, nodes_per_file: int=0,
+        start_ids: 'Optional[List[int]]'=None,
+        skeleton: 'Optional[Tuple[Dict[int, Any], Dict[int, Any]]]'=None
+    ) -> None:
+        PageInfo = {
+            "title" : self.title
+        }
+        s = "var N_RAL_FILES = %d;\n" % n_files
+        if start_ids is None:
+            s += "var N_RAL_NODES_PER_FILE = %d;\n" % nodes_per_file
+        else:
+            s += "var RAL_DATA_FORMAT = \"%s\";\n" % data_format
+            s += "var N_RAL_NODES = %d;\n" % len(self.RALData)
+            s += "var RAL_FILE_START_IDS = "
+            s += PeakRDLJSEncoder(separators=(',', ':')).encode(start_ids)
+            s += ";\n"
+
+        if skeleton is not None:
+            skeleton_nodes, skeleton_stubs = skeleton
+            s += "var RAL_SKELETON = "
+            s += PeakRDLJSEncoder(separators=(',', ':')).encode(skeleton_nodes)
+            s += ";\n"
+            s += "var RAL_SKELETON_STUBS = "
+            s += PeakRDLJSEncoder(separators=(',', ':')).encode(skeleton_stubs)
+            s += ";\n"
+
+        if self.content_filenames == "id":
+            s += "var CONTENT_FILENAMES = \"id\";\n"
+        if self.content_pack is not None:
+            s += "var CONTENT_PACK_PAGES_PER_INDEX = %d;\n" % self.content_pack.PAGES_PER_INDEX_FILE
+
+        s += "var RootNodeIds = "
+        s += PeakRDLJSEncoder(separators=(',', ':')).encode(self.RootNodeIds)
+        s += ";\n"
+
+        s += "var PageInfo = "
+        s += PeakRDLJSEncoder(separators=(',', ':')).encode(PageInfo)
+        s += ";\n"
+        assert self.output is not None
+        self.output.write_file("data/data_index.js", s.encode('utf-8'))
 
 
     _template_map = {
@@ -303,28 +855,76 @@ class HTMLExporter:
     }
 
     def write_page(self, this_id: int, node: Node, children: 'Dict[int, Node]') -> None:
+        data = self.render_page(this_id, node, children)
+        if self.content_pack is not None:
+            self.content_pack.add(this_id, data)
+            return
+
+        if self.content_filenames == "id":
+            uid = str(this_id)
+        else:
+            uid = self.get_node_uid(node)
+        assert self.output is not None
+        self.output.write_file("content/%s.html" % uid, data)
+
 
+    def render_page(self, this_id: int, node: Node, children: 'Dict[int, Node]') -> bytes:
+        start = time.perf_counter()
+        data = self._render_page(this_id, node, children)
+        elapsed = time.perf_counter() - start
+
+        stats = self.get_stats()
+        if stats.is_slow_page(elapsed):
+            stats.add_page(node.get_path(), elapsed)
+        else:
+            # Skip building the path of pages that are not kept
+            stats.add_page("", elapsed)
+        return data
+
+
+    def _render_page(self, this_id: int, node: Node, children: 'Dict[int, Node]') -> bytes:
+        view_source_url, view_source_filename = self.get_view_source_info(node)
+        context = {
+            'this_id': this_id,
+            'node' : node,
+            'children' : children,
+            'view_source_url': view_source_url,
+            'view_source_filename': view_source_filename,
+        }
+
+        template = self.page_templates[type(node)]
+        html = template.render(context)
+        return html.encode('utf-8')
+
+
+    def load_page_templates(self) -> None:
+        """
+        Load the content page templates, along with the part of their
+        rendering context that is the same for every page.
+
+        This is done once per export so that rendering each page only needs to
+        provide the page's own variables. It also ensures templates are
+        compiled before page rendering workers are forked.
+        """
         def field_order(x):
             if not self.reverse_fields:
                 return reversed(x)
             else:
                 return x
 
-        view_source_url, view_source_filename= self.get_view_source_info(node)
-        context = {
-            'this_id': this_id,
-            'node' : node,
-            'children' : children,
-            'has_description' : has_description,
+        page_globals = {
+            'has_description' : self.def_memo.has_description,
             'friendly_access' : friendly_access,
-            'has_enum_encoding' : has_enum_encoding,
+            'has_enum_encoding' : self.def_memo.has_enum_encoding,
             'get_enum_desc': self.get_enum_html_desc,
             'get_node_desc': self.get_node_html_desc,
             'get_child_addr_digits': self.get_child_addr_digits,
             'show_signals': self.show_signals,
-            'has_extra_property_doc': self.has_extra_property_doc,
+            'has_extra_property_doc': self.def_memo.has_extra_property_doc,
             'extra_properties': self.extra_properties,
             'stringify_rdl_value': stringify_rdl_value,
+            'stringify_property': self.def_memo.stringify_property,
+            'list_properties': self.def_memo.list_properties,
             'SignalNode' : SignalNode,
             'FieldNode': FieldNode,
             'AddressableNode': AddressableNode,
@@ -332,20 +932,60 @@ class HTMLExporter:
             'reversed': field_order,
             'isinstance': isinstance,
             'list': list,
-            'view_source_url': view_source_url,
-            'view_source_filename': view_source_filename,
-            'reg_fields_are_low_to_high': reg_fields_are_low_to_high,
+            'reg_fields_are_low_to_high': self.def_memo.reg_fields_are_low_to_high,
             'skip_not_present': self.skip_not_present,
             'highest_fields_first': not self.reverse_fields
+        } # type: Dict[str, Any]
+        page_globals.update(self.user_context)
+
+        # Templates are cached by the environment. Loading an already cached
+        # template updates its globals
+        self.page_templates = {
+            node_type: self.jj_env.get_template(name, globals=page_globals)
+            for node_type, name in self._template_map.items()
         }
-        context.update(self.user_context)
 
-        uid = self.get_node_uid(node)
 
-        template = self.jj_env.get_template(self._template_map[type(node)])
-        stream = template.stream(context)
-        output_path = os.path.join(self.output_dir, "content", "%s.html" % uid)
-        stream.dump(output_path)
+    def write_static_files(self) -> str:
+        """
+        Copy static files to the output, or share them using the static asset
+        store.
+        Returns the URL prefix that the viewer's static files are loaded from,
+        relative to index.html
+        """
+        assert self.output is not None
+
+        # User static files replace built-in ones
+        static_dirs = [os.path.join(os.path.dirname(__file__), "static")]
+        if self.user_static_dir:
+            static_dirs.append(self.user_static_dir)
+
+        if self.static_store is None and self.static_url is None:
+            self.output.copy_trees(static_dirs)
+            return ""
+
+        # Files that are not part of the viewer, such as the launchers, are
+        # always placed in the output
+        shared = {} # type: Dict[str, str]
+        for relpath, src in list_trees(static_dirs).items():
+            if relpath.startswith(self.SHARED_STATIC_PREFIXES):
+                shared[relpath] = src
+            else:
+                self.output.copy_file(src, relpath)
+
+        digest = get_bundle_digest(shared)
+        if self.static_store is not None:
+            bundle_dir = self.static_store.add(shared, digest)
+            if self.static_url is None:
+                for relpath in shared:
+                    self.output.link_file(os.path.join(bundle_dir, relpath), relpath, "hardlink")
+                return ""
+
+        assert self.static_url is not None
+        url = self.static_url.replace("{digest}", digest)
+        if not url.endswith("/"):
+            url += "/"
+        return url
 
 
     def write_index_page(self) -> None:
@@ -356,13 +996,17 @@ class HTMLExporter:
             # propagate build timestamp to some URLs to force cache invalidation when rebuilt
             'build_ts': int(time.time()),
             'version': __version__,
+            'search_in_worker': self.search_in_worker,
+            'virtual_sidebar': self.virtual_sidebar,
+            'search_snippets': self.search_snippets,
+            'static_url': self.static_url_prefix,
         }
         context.update(self.user_context)
 
         template = self.jj_env.get_template("index.html")
-        stream = template.stream(context)
-        output_path = os.path.join(self.output_dir, "index.html")
-        stream.dump(output_path)
+        html = template.render(context)
+        assert self.output is not None
+        self.output.write_file("index.html", html.encode('utf-8'))
 
 
     def get_child_addr_digits(self, node: AddressableNode) -> int:
@@ -378,11 +1022,47 @@ class HTMLExporter:
         output:
         - Increment any heading tags
         - Transform img paths that point to local files. Copy referenced image to output
+
+        Rendered descriptions are cached since the same description text is
+        typically shared by many instances of the same component type.
         """
+        desc_text = node.get_property('desc')
+        if desc_text is None:
+            return None
 
-        desc = node.get_html_desc(self.markdown_inst)
+        src_ref = node.def_src_ref
+        if isinstance(src_ref, FileSourceRef):
+            src_dir = os.path.dirname(src_ref.path) # type: Optional[str]
+        else:
+            src_dir = None
+        node_ctx = get_node_context(node, desc_text)
+
+        key = ("node", desc_text, increment_heading, src_dir, node_ctx)
+        stats = self.get_stats()
+        desc = self.desc_cache.lookup(key)
         if desc is None:
-            return desc
+            stats.desc_cache_misses += 1
+            desc = self._render_node_html_desc(node, increment_heading, node_ctx)
+            self.desc_cache.store(key, desc)
+        else:
+            stats.desc_cache_hits += 1
+        return desc
+
+
+    def _render_node_html_desc(self, node: Node, increment_heading: int, node_ctx: 'Any') -> str:
+        md = self.get_markdown_inst()
+        persistent_key = ("node", node.get_property('desc'), node_ctx)
+        stats = self.get_stats()
+        desc = self.desc_cache.lookup_persistent(md, persistent_key)
+        if desc is None:
+            start = time.perf_counter()
+            desc = node.get_html_desc(md)
+            stats.markdown_time += time.perf_counter() - start
+            stats.markdown_calls += 1
+            assert desc is not None
+            self.desc_cache.store_persistent(md, persistent_key, desc)
+        else:
+            stats.persistent_cache_hits += 1
 
         # Keep HTML semantically correct by promoting heading tags if desc ends
         # up as a child of existing headings.
@@ -416,18 +1096,10 @@ class HTMLExporter:
                     if path is not None:
                         img_src = path
 
-                if os.path.exists(img_src):
-                    with open(img_src, 'rb') as f:
-                        md5 = hashlib.md5(f.read()).hexdigest()
-                    new_path = os.path.join(
-                        self.output_dir, "content",
-                        "%s_%s" % (md5[0:8], os.path.basename(img_src))
-                    )
-                    shutil.copyfile(img_src, new_path)
-                    dom.childNodes[0].attributes["src"].value = os.path.join(
-                        "content",
-                        "%s_%s" % (md5[0:8], os.path.basename(img_src))
-                    )
+                assert self.assets is not None
+                relpath = self.assets.add(img_src)
+                if relpath is not None:
+                    dom.childNodes[0].attributes["src"].value = relpath
                     return dom.childNodes[0].toxml()
 
                 return m.group(0)
@@ -437,12 +1109,30 @@ class HTMLExporter:
 
 
     def get_enum_html_desc(self, enum_member) -> str: # type: ignore
-        s = enum_member.get_html_desc(self.markdown_inst)
-        if s:
-            return s
-        else:
+        desc_text = enum_member.rdl_desc
+        if desc_text is None:
             return ""
 
+        key = ("enum", desc_text)
+        stats = self.get_stats()
+        s = self.desc_cache.lookup(key)
+        if s is None:
+            stats.desc_cache_misses += 1
+            md = self.get_markdown_inst()
+            s = self.desc_cache.lookup_persistent(md, key)
+            if s is None:
+                start = time.perf_counter()
+                s = enum_member.get_html_desc(md) or ""
+                stats.markdown_time += time.perf_counter() - start
+                stats.markdown_calls += 1
+                self.desc_cache.store_persistent(md, key, s)
+            else:
+                stats.persistent_cache_hits += 1
+            self.desc_cache.store(key, s)
+        else:
+            stats.desc_cache_hits += 1
+        return s
+
 
     def try_resolve_rel_path(self, src_ref: 'Optional[SourceRefBase]', relpath: str) -> 'Optional[str]':
         """
@@ -466,10 +1156,20 @@ class HTMLExporter:
         Returns True if node has a property set that is to be explicitly
         documented.
         """
-        for prop in self.extra_properties:
-            if prop in node.list_properties():
-                return True
-        return False
+        return self.def_memo.has_extra_property_doc(node)
+
+    def get_source_location(self, node: Node) -> 'Optional[Tuple[str, Optional[int]]]':
+        """
+        Returns the path and line, if known, of the node's definition.
+        Returns None if it was not defined in a file
+        """
+        src_ref = node.def_src_ref or node.inst_src_ref
+        if isinstance(src_ref, DetailedFileSourceRef):
+            return src_ref.path, src_ref.line
+        elif isinstance(src_ref, FileSourceRef):
+            return src_ref.path, None
+        return None
+
 
     def get_view_source_info(self, node: Node) -> 'Tuple[Optional[str], Optional[str]]':
         """
@@ -481,38 +1181,71 @@ class HTMLExporter:
         if not self.generate_source_links:
             return None, None
 
-        src_ref = node.def_src_ref or node.inst_src_ref
-        if isinstance(src_ref, DetailedFileSourceRef):
-            path = src_ref.path
-            line = src_ref.line
-        elif isinstance(src_ref, FileSourceRef):
-            path = src_ref.path
-            line = None
-        else:
-            return None, None
-
-        # resolve any symlinks to ensure true git path
-        path = os.path.realpath(path)
-
-        try:
-            return (self.gmtu.get_source_url(path, line), os.path.basename(path))
-        except Exception: # pylint: disable=broad-except
+        loc = self.get_source_location(node)
+        if loc is None:
             return None, None
+        return self.source_links.get_source_url(*loc)
 
     def get_node_uid(self, node: Node) -> str:
         """
         Returns the node's UID string
         """
-        node_path = node.get_rel_path(self.current_top_node.parent, array_suffix="", empty_array_suffix="")
+        top_node = getattr(self._thread_local, "current_top_node", self.current_top_node)
+        node_path = node.get_rel_path(top_node.parent, array_suffix="", empty_array_suffix="")
         path_hash = hashlib.sha1(node_path.encode('utf-8')).hexdigest()
         return path_hash
 
 
-def has_description(node: Node) -> bool:
+# Exporter that is being served by the page rendering workers.
+# Forked worker processes inherit this reference from the parent process
+_worker_exporter = None # type: Optional[HTMLExporter]
+
+# Whether the page rendering workers are separate processes
+_worker_is_process = False
+
+def _init_page_worker(is_process: bool) -> None:
     """
-    Test if node has a description defined
+    Page rendering worker initializer.
+    Give each worker its own Markdown processor instance
     """
-    return "desc" in node.list_properties()
+    global _worker_is_process # pylint: disable=global-statement
+    _worker_is_process = is_process
+    assert _worker_exporter is not None
+    _worker_exporter._thread_local.markdown_inst = copy.deepcopy(_worker_exporter.markdown_inst) # pylint: disable=protected-access
+    output = _worker_exporter.output
+    assert output is not None
+    if is_process and not output.sink.process_safe:
+        # Hand written files back to the parent instead
+        output.defer_writes()
+
+def _write_page_job(idx: int) -> 'Tuple[Dict[str, str], List[Tuple[str, bytes]], Optional[Tuple[int, bytes]], ExportStats]':
+    assert _worker_exporter is not None
+    this_id, node, children, top_node = _worker_exporter.pending_pages[idx]
+    # Page UIDs are relative to the top node that was being exported at the time
+    _worker_exporter._thread_local.current_top_node = top_node # pylint: disable=protected-access
+    job_stats = ExportStats()
+    _worker_exporter._thread_local.stats = job_stats # pylint: disable=protected-access
+    output = _worker_exporter.output
+    assert output is not None
+    files_written = output.files_written
+    bytes_written = output.bytes_written
+
+    if _worker_exporter.content_pack is not None:
+        # Hand the page back to the parent so it can be packed
+        packed_page = (this_id, _worker_exporter.render_page(this_id, node, children)) # type: Optional[Tuple[int, bytes]]
+    else:
+        _worker_exporter.write_page(this_id, node, children)
+        packed_page = None
+
+    if _worker_is_process:
+        # Files written by a worker thread are already counted by the parent's
+        # output directory
+        job_stats.files_written = output.files_written - files_written
+        job_stats.bytes_written = output.bytes_written - bytes_written
+
+    # Hand back files written by this worker so they are known to the parent
+    return output.take_recent(), output.take_deferred(), packed_page, job_stats
+
 
 def friendly_access(obj: 'Any') -> str:
     """
@@ -538,38 +1271,9 @@ def friendly_access(obj: 'Any') -> str:
     }
     return lut.get(obj, "")
 
-
-def has_enum_encoding(field: FieldNode) -> bool:
-    """
-    Test if field is encoded with an enum
-    """
-    return "encode" in field.list_properties()
-
-
-def reg_fields_are_low_to_high(node: RegNode) -> bool:
-    for field in node.fields():
-        if field.msb < field.lsb:
-            return True
-    return False
-
-def copy_recursive(src: str, dst: str) -> None:
-    """
-    distutils.dir_util.copy_tree is deprecated, and shutil.copytree does not have
-    the dirs_exist_ok option until py3.8.
-    Implement an equivalent
-    """
-    os.makedirs(dst, exist_ok=True)
-
-    for entry in os.listdir(src):
-        spath = os.path.join(src, entry)
-        dpath = os.path.join(dst, entry)
-        if os.path.isdir(spath):
-            copy_recursive(spath, dpath)
-        else:
-            shutil.copyfile(spath, dpath)
-
-
 class BigInt:
+    __slots__ = ("v",)
+
     def __init__(self, v: int):
         self.v = v
 
@@ -0,0 +1,321 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+from typing import TYPE_CHECKING
+
+from .output_sink import OutputSink, DirectorySink
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+if TYPE_CHECKING:
+    from typing import Dict, Tuple, List, Union, Optional
+
+class OutputDirectory:
+    """
+    Funnels all writes into the export's output, which is stored by an
+    OutputSink. A path is shorthand for a DirectorySink.
+
+    If incremental mode is enabled, a manifest of content hashes is kept in the
+    output directory. Files whose contents did not change since the previous
+    export are not re-written, which keeps their modification times stable.
+    Files that were produced by the previous export but not by the current one
+    are removed.
+
+    If precompress is enabled, files within PRECOMPRESS_DIRS also get gzip
+    (.gz) and, if the brotli module is available, brotli (.br) compressed
+    siblings so that they can be served as-is by a web server.
+    """
+    MANIFEST_FILENAME = ".peakrdl-html-manifest.json"
+
+    # Subdirectories and file types that are precompressed
+    PRECOMPRESS_DIRS = ("data/", "search/", "content/")
+    PRECOMPRESS_EXTENSIONS = (".html", ".js", ".json", ".bin")
+    PRECOMPRESS_ENCODINGS = (".gz", ".br")
+
+    # Files smaller than this are not worth compressing
+    PRECOMPRESS_MIN_SIZE = 256
+
+    def __init__(self, sink: 'Union[str, OutputSink]', incremental: bool=False, precompress: bool=False) -> None:
+        if isinstance(sink, str):
+            sink = DirectorySink(sink)
+        self.sink = sink
+        self.incremental = incremental
+        self.precompress = precompress
+
+        # Manifest from the previous export
+        #   relpath: sha1 hexdigest
+        self.prev_manifest = {} # type: Dict[str, str]
+
+        # Manifest of files produced by the current export
+        self.manifest = {} # type: Dict[str, str]
+
+        # Manifest entries recorded since the last call to take_recent()
+        self._recent = {} # type: Dict[str, str]
+        self._lock = threading.Lock()
+
+        # Number of files and bytes actually written by this instance
+        self.files_written = 0
+        self.bytes_written = 0
+
+        # If set, writes are collected rather than passed to the sink.
+        # Used by worker processes that cannot write to the sink themselves
+        self._deferred = None # type: Optional[List[Tuple[str, bytes]]]
+
+        if self.incremental:
+            self.prev_manifest = self._load_manifest()
+
+
+    def _load_manifest(self) -> 'Dict[str, str]':
+        data = self.sink.read_file(self.MANIFEST_FILENAME)
+        if data is None:
+            return {}
+        try:
+            manifest = json.loads(data.decode('utf-8'))
+        except ValueError:
+            return {}
+        if not isinstance(manifest, dict):
+            return {}
+        return manifest
+
+
+    def _record(self, relpath: str, digest: str) -> None:
+        with self._lock:
+            self.manifest[relpath] = digest
+            self._recent[relpath] = digest
+
+
+    def take_recent(self) -> 'Dict[str, str]':
+        """
+        Returns manifest entries recorded since the previous call.
+        Used to collect entries that were recorded by worker processes.
+        """
+        with self._lock:
+            recent = self._recent
+            self._recent = {}
+        return recent
+
+
+    def merge(self, entries: 'Dict[str, str]') -> None:
+        with self._lock:
+            self.manifest.update(entries)
+
+
+    def defer_writes(self) -> None:
+        """
+        Collect subsequent writes rather than passing them to the sink, until
+        they are taken using take_deferred()
+        """
+        self._deferred = []
+
+
+    def take_deferred(self) -> 'List[Tuple[str, bytes]]':
+        """
+        Returns writes that were deferred since the previous call
+        """
+        if self._deferred is None:
+            return []
+        with self._lock:
+            deferred = self._deferred
+            self._deferred = []
+        return deferred
+
+
+    def replay(self, writes: 'List[Tuple[str, bytes]]') -> None:
+        """
+        Pass writes that were deferred by a worker to the sink.
+        These were already counted by the worker
+        """
+        for relpath, data in writes:
+            self.sink.write_file(relpath, data)
+
+
+    def _sink_write(self, relpath: str, data: bytes) -> None:
+        with self._lock:
+            self.files_written += 1
+            self.bytes_written += len(data)
+            if self._deferred is not None:
+                self._deferred.append((relpath, data))
+                return
+        self.sink.write_file(relpath, data)
+
+
+    def write_file(self, relpath: str, data: bytes) -> None:
+        """
+        Write data to the file at relpath within the output directory
+        """
+        if self.incremental:
+            digest = hashlib.sha1(data).hexdigest()
+            self._record(relpath, digest)
+            if self.prev_manifest.get(relpath) == digest and self.sink.exists(relpath):
+                # Unchanged. Skip
+                if self._is_precompressed(relpath):
+                    self._keep_compressed(relpath, data)
+                return
+
+        self._sink_write(relpath, data)
+
+        if self._is_precompressed(relpath):
+            self._write_compressed(relpath, data)
+
+
+    def _is_precompressed(self, relpath: str) -> bool:
+        return (
+            self.precompress
+            and relpath.startswith(self.PRECOMPRESS_DIRS)
+            and relpath.endswith(self.PRECOMPRESS_EXTENSIONS)
+        )
+
+
+    def _write_compressed(self, relpath: str, data: bytes) -> None:
+        """
+        Write the compressed siblings of a file.
+        Compressed files are only kept if they are smaller than the original
+        """
+        compressed = [] # type: List[Tuple[str, bytes]]
+        for ext in self._get_encodings(data):
+            if ext == ".gz":
+                # Omit the timestamp so that output is reproducible
+                compressed.append((ext, gzip.compress(data, compresslevel=9, mtime=0)))
+            else:
+                compressed.append((ext, brotli.compress(data)))
+
+        for ext, cdata in compressed:
+            if len(cdata) < len(data):
+                self.write_file(relpath + ext, cdata)
+            else:
+                self._remove_stale(relpath + ext)
+        if brotli is None:
+            self._remove_stale(relpath + ".br")
+
+
+    def _get_encodings(self, data: bytes) -> 'List[str]':
+        """
+        Returns the compressed siblings that are attempted for a file
+        """
+        if len(data) < self.PRECOMPRESS_MIN_SIZE:
+            return []
+        if brotli is None:
+            return [".gz"]
+        return [".gz", ".br"]
+
+
+    def _keep_compressed(self, relpath: str, data: bytes) -> None:
+        """
+        Keep the compressed siblings of an unchanged file from the previous
+        export.
+        If a sibling is missing, such as when precompress was only enabled
+        now, or brotli was installed since, the siblings are regenerated.
+        """
+        encodings = self._get_encodings(data)
+        missing = False
+        for ext in self.PRECOMPRESS_ENCODINGS:
+            crelpath = relpath + ext
+            digest = self.prev_manifest.get(crelpath)
+            if digest is not None and self.sink.exists(crelpath):
+                self._record(crelpath, digest)
+            elif ext in encodings:
+                missing = True
+
+        if missing:
+            self._write_compressed(relpath, data)
+
+
+    def _remove_stale(self, relpath: str) -> None:
+        """
+        Remove a compressed sibling that would no longer match its original
+        """
+        self.sink.remove(relpath)
+
+
+    def copy_file(self, src: str, relpath: str) -> None:
+        """
+        Copy the file src to relpath within the output directory
+        """
+        if self.incremental or self._deferred is not None:
+            with open(src, 'rb') as f:
+                self.write_file(relpath, f.read())
+        else:
+            n_bytes = self.sink.copy_file(src, relpath)
+            with self._lock:
+                self.files_written += 1
+                self.bytes_written += n_bytes
+
+
+    def link_file(self, src: str, relpath: str, mode: str="copy") -> None:
+        """
+        Place the file src at relpath within the output directory.
+        If mode is "hardlink" or "reflink", the file is linked rather than
+        copied if the sink supports it.
+        """
+        if mode == "copy" or self._deferred is not None:
+            self.copy_file(src, relpath)
+            return
+
+        if self.incremental:
+            with open(src, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self._record(relpath, digest)
+            if self.prev_manifest.get(relpath) == digest and self.sink.exists(relpath):
+                # Unchanged. Skip
+                return
+
+        n_bytes = self.sink.link_file(src, relpath, mode)
+        with self._lock:
+            self.files_written += 1
+            self.bytes_written += n_bytes
+
+
+    def copy_trees(self, srcs: 'List[str]') -> None:
+        """
+        Recursively copy the contents of each directory in srcs into the
+        output directory.
+        If a file exists in more than one directory, the one from the last
+        directory is used. Each file is only copied once.
+        """
+        for relpath, spath in list_trees(srcs).items():
+            self.copy_file(spath, relpath)
+
+
+    def finalize(self) -> None:
+        """
+        Remove stale files left over from the previous export, save the
+        manifest, and close the sink.
+        """
+        if self.incremental:
+            for relpath in self.prev_manifest.keys() - self.manifest.keys():
+                self.sink.remove(relpath)
+
+            s = json.dumps(self.manifest, sort_keys=True, separators=(',', ':'))
+            self.sink.write_file(self.MANIFEST_FILENAME, s.encode('utf-8'))
+
+        self.sink.close()
+
+
+def list_trees(srcs: 'List[str]') -> 'Dict[str, str]':
+    """
+    Returns the files within each directory in srcs, as relpath: source path.
+    If a file exists in more than one directory, the one from the last
+    directory is used.
+    """
+    files = {} # type: Dict[str, str]
+    for src in srcs:
+        _list_tree(src, "", files)
+    return files
+
+
+def _list_tree(src: str, relpath: str, files: 'Dict[str, str]') -> None:
+    """
+    Add the files within directory src to files, as relpath: source path
+    """
+    for entry in os.listdir(src):
+        spath = os.path.join(src, entry)
+        drelpath = relpath + "/" + entry if relpath else entry
+        if os.path.isdir(spath):
+            _list_tree(spath, drelpath, files)
+        else:
+            files[drelpath] = spath
@@ -0,0 +1,304 @@
+import os
+import io
+import time
+import shutil
+import tarfile
+import zipfile
+import threading
+from typing import TYPE_CHECKING, cast
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None # type: ignore
+
+# Linux ioctl that clones a file's extents (copy-on-write)
+FICLONE = 0x40049409
+
+if TYPE_CHECKING:
+    from typing import Optional, Union, BinaryIO, Dict, Set, Any
+
+class OutputSink:
+    """
+    Base class of the storage backends that an export's output is written to.
+
+    Paths are relative to the root of the output, and always use '/' as the
+    separator.
+
+    Sinks may be written to by multiple threads.
+    """
+    #: Whether forked page rendering worker processes may write to the sink
+    #: directly. If not, files written by worker processes are handed back to
+    #: the parent process, which writes them.
+    process_safe = False
+
+    def write_file(self, relpath: str, data: bytes) -> None:
+        """
+        Write data to the file at relpath
+        """
+        raise NotImplementedError
+
+
+    def copy_file(self, src: str, relpath: str) -> int:
+        """
+        Copy the file src to relpath.
+        Returns the number of bytes written
+        """
+        with open(src, 'rb') as f:
+            data = f.read()
+        self.write_file(relpath, data)
+        return len(data)
+
+
+    def link_file(self, src: str, relpath: str, mode: str) -> int:
+        """
+        Place the file src at relpath by linking to it rather than copying it.
+        mode is "hardlink" or "reflink". Sinks that do not support linking
+        copy the file instead.
+        Returns the number of bytes placed
+        """
+        return self.copy_file(src, relpath)
+
+
+    def read_file(self, relpath: str) -> 'Optional[bytes]':
+        """
+        Returns the contents of an existing file, or None if it does not exist
+        or the sink cannot be read from
+        """
+        return None
+
+
+    def exists(self, relpath: str) -> bool:
+        return False
+
+
+    def remove(self, relpath: str) -> None:
+        """
+        Remove relpath, if it exists
+        """
+
+
+    def close(self) -> None:
+        """
+        Called once the export is complete
+        """
+
+
+class DirectorySink(OutputSink):
+    """
+    Writes output to a directory on the filesystem
+    """
+    process_safe = True
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(self.path, exist_ok=True)
+
+
+    def write_file(self, relpath: str, data: bytes) -> None:
+        path = os.path.join(self.path, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+    def copy_file(self, src: str, relpath: str) -> int:
+        path = os.path.join(self.path, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(src, path)
+        return os.path.getsize(path)
+
+
+    def link_file(self, src: str, relpath: str, mode: str) -> int:
+        path = os.path.join(self.path, relpath)
+        try:
+            if os.path.samefile(src, path):
+                # Already linked
+                return os.path.getsize(path)
+        except OSError:
+            pass
+
+        # Worker processes may place the same file concurrently, so it is
+        # placed under a unique temporary name, and then atomically moved
+        # into place
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = "%s.tmp-%d-%d" % (path, os.getpid(), threading.get_ident())
+        try:
+            try:
+                if mode == "hardlink":
+                    os.link(src, tmp_path)
+                elif mode == "reflink" and fcntl is not None:
+                    with open(src, 'rb') as fsrc, open(tmp_path, 'wb') as fdst:
+                        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                else:
+                    shutil.copyfile(src, tmp_path)
+            except OSError:
+                # Not supported by the filesystem, or the source is on a
+                # different device
+                shutil.copyfile(src, tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            # If another worker already linked the same file into place,
+            # replacing it is a no-op that leaves the temporary name behind
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+        return size
+
+
+    def read_file(self, relpath: str) -> 'Optional[bytes]':
+        try:
+            with open(os.path.join(self.path, relpath), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+    def exists(self, relpath: str) -> bool:
+        return os.path.exists(os.path.join(self.path, relpath))
+
+
+    def remove(self, relpath: str) -> None:
+        path = os.path.join(self.path, relpath)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+class MemorySink(OutputSink):
+    """
+    Keeps the output in memory.
+
+    Once the export is complete, ``files`` maps each file's path to its
+    contents.
+    """
+    def __init__(self) -> None:
+        self.files = {} # type: Dict[str, bytes]
+        self._lock = threading.Lock()
+
+
+    def write_file(self, relpath: str, data: bytes) -> None:
+        with self._lock:
+            self.files[relpath] = data
+
+
+    def read_file(self, relpath: str) -> 'Optional[bytes]':
+        with self._lock:
+            return self.files.get(relpath, None)
+
+
+    def exists(self, relpath: str) -> bool:
+        with self._lock:
+            return relpath in self.files
+
+
+    def remove(self, relpath: str) -> None:
+        with self._lock:
+            self.files.pop(relpath, None)
+
+
+class _ArchiveSink(OutputSink):
+    """
+    Base class of sinks that stream files into an archive.
+
+    Archive members cannot be replaced once written, so each path is only
+    stored once. Later writes to the same path are ignored.
+    """
+    def __init__(self) -> None:
+        self._names = set() # type: Set[str]
+        self._lock = threading.Lock()
+
+        # Modification time given to all archive members
+        self.mtime = time.time()
+
+
+    def write_file(self, relpath: str, data: bytes) -> None:
+        with self._lock:
+            if relpath in self._names:
+                return
+            self._names.add(relpath)
+            self._add_member(relpath, data)
+
+
+    def exists(self, relpath: str) -> bool:
+        with self._lock:
+            return relpath in self._names
+
+
+    def _add_member(self, relpath: str, data: bytes) -> None:
+        raise NotImplementedError
+
+
+class ZipSink(_ArchiveSink):
+    """
+    Streams output into a zip archive.
+
+    Parameters
+    ----------
+    file: str | file object
+        Path of the zip file to create, or a binary file object to write it
+        to. The file object does not need to be seekable.
+    compression: int
+        Compression method, as used by :class:`zipfile.ZipFile`.
+        Default is ``zipfile.ZIP_DEFLATED``
+    compresslevel: int
+        (optional) Compression level, as used by :class:`zipfile.ZipFile`
+    """
+    def __init__(self, file: 'Union[str, BinaryIO]', compression: int=zipfile.ZIP_DEFLATED, compresslevel: 'Optional[int]'=None) -> None:
+        super().__init__()
+        self.compression = compression
+        self.compresslevel = compresslevel
+        # The archive stays open until close() is called once the export is
+        # complete
+        self.zf = zipfile.ZipFile( # pylint: disable=consider-using-with
+            file, "w", compression=compression, compresslevel=compresslevel
+        )
+        self._date_time = time.localtime(self.mtime)[:6]
+
+
+    def _add_member(self, relpath: str, data: bytes) -> None:
+        info = zipfile.ZipInfo(relpath, date_time=self._date_time)
+        info.compress_type = self.compression
+        info.external_attr = 0o644 << 16
+        self.zf.writestr(info, data, compresslevel=self.compresslevel)
+
+
+    def close(self) -> None:
+        self.zf.close()
+
+
+class TarSink(_ArchiveSink):
+    """
+    Streams output into a tar archive.
+
+    Parameters
+    ----------
+    file: str | file object
+        Path of the tar file to create, or a binary file object to write it
+        to.
+    mode: str
+        Mode that the archive is opened with, as used by :func:`tarfile.open`.
+        Use a stream mode such as ``"w|gz"`` to write to a file object that is
+        not seekable. Default is ``"w:gz"``
+    """
+    def __init__(self, file: 'Union[str, BinaryIO]', mode: str="w:gz") -> None:
+        super().__init__()
+        # The archive stays open until close() is called once the export is
+        # complete.
+        # Any mode that tarfile supports may be passed, so do not narrow it to
+        # the literal modes that its type stubs overload on
+        if isinstance(file, str):
+            self.tf = tarfile.open(file, cast('Any', mode)) # pylint: disable=consider-using-with
+        else:
+            self.tf = tarfile.open(fileobj=file, mode=cast('Any', mode)) # pylint: disable=consider-using-with
+
+
+    def _add_member(self, relpath: str, data: bytes) -> None:
+        info = tarfile.TarInfo(relpath)
+        info.size = len(data)
+        info.mtime = int(self.mtime)
+        info.mode = 0o644
+        self.tf.addfile(info, io.BytesIO(data))
+
+
+    def close(self) -> None:
+        self.tf.close()
@@ -0,0 +1,157 @@
+import sys
+import json
+import struct
+from array import array
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import List, Dict, Any, Tuple
+
+# Binary RAL data chunk format
+# All values are little-endian. Sections are stored as contiguous columns so
+# that the viewer can access them directly via typed array views:
+#
+#   Header: 16x u32
+#       [0] Magic "PRDL"
+#       [1] Format version
+#       [2] ID of the first node in this chunk
+#       [3] Number of nodes (N)
+#       [4] Number of entries in the children table
+#       [5] Number of entries in the array dimensions table
+#       [6] Number of field layouts
+#       [7] Number of entries in the field table
+#       [8] Length of the string table in bytes
+#   u64 columns (N entries each): offset, size, stride
+#   i32 columns (N entries each): parent (-1 if none), layout (-1 if not a register)
+#   u32 columns (N entries each): name, children_start, n_children, dims_start, n_dims
+#   u32 children table: child node IDs
+#   u32 dims table: array dimensions
+#   u32 layout columns: field_start, n_fields
+#   u32 field table: 5 words per field: name, lsb, msb, reset, flags
+#       flags[0]: field is encoded with an enum
+#   String table: UTF-8 encoded JSON array of strings.
+#       Field reset values are stored as hex strings.
+#
+# Registers that share an identical field layout share one layout table entry.
+
+MAGIC = b"PRDL"
+VERSION = 1
+HEADER_WORDS = 16
+
+FIELD_FLAG_ENCODE = 0x1
+
+
+def estimate_entry_size(entry: 'Dict[str, Any]') -> int:
+    """
+    Estimate how many bytes the RAL entry will occupy in a binary chunk.
+    """
+    size = 3*8 + 7*4
+    size += 4 * len(entry['children'])
+    size += 4 * len(entry.get('dims', []))
+    size += len(entry['name']) + 3
+    for field in entry.get('fields', []):
+        # Over-estimates since layouts are usually shared
+        size += 5*4 + len(field['name']) + 3
+    return size
+
+
+def encode_chunk(entries: 'List[Dict[str, Any]]', first_id: int) -> bytes:
+    """
+    Encode a contiguous range of RAL entries into a binary chunk.
+
+    Raises OverflowError if an address value does not fit in 64 bits.
+    """
+    strings = [] # type: List[str]
+    string_idxs = {} # type: Dict[str, int]
+    def _str(s: str) -> int:
+        idx = string_idxs.get(s, None)
+        if idx is None:
+            idx = len(strings)
+            string_idxs[s] = idx
+            strings.append(s)
+        return idx
+
+    offset_col = array('Q')
+    size_col = array('Q')
+    stride_col = array('Q')
+    parent_col = array('i')
+    layout_col = array('i')
+    name_col = array('I')
+    children_start_col = array('I')
+    n_children_col = array('I')
+    dims_start_col = array('I')
+    n_dims_col = array('I')
+    children_table = array('I')
+    dims_table = array('I')
+    layout_field_start_col = array('I')
+    layout_n_fields_col = array('I')
+    field_table = array('I')
+
+    layout_idxs = {} # type: Dict[Tuple[Tuple[str, int, int, int, bool], ...], int]
+
+    for entry in entries:
+        offset_col.append(entry['offset'].v)
+        size_col.append(entry['size'].v)
+        parent_col.append(-1 if entry['parent'] is None else entry['parent'])
+        name_col.append(_str(entry['name']))
+
+        children_start_col.append(len(children_table))
+        n_children_col.append(len(entry['children']))
+        children_table.extend(entry['children'])
+
+        if 'dims' in entry:
+            stride_col.append(entry['stride'].v)
+            dims_start_col.append(len(dims_table))
+            n_dims_col.append(len(entry['dims']))
+            dims_table.extend(entry['dims'])
+        else:
+            stride_col.append(0)
+            dims_start_col.append(0)
+            n_dims_col.append(0)
+
+        if 'fields' in entry:
+            layout_key = tuple(
+                (f['name'], f['lsb'], f['msb'], f['reset'].v, 'encode' in f)
+                for f in entry['fields']
+            )
+            layout_idx = layout_idxs.get(layout_key, None)
+            if layout_idx is None:
+                layout_idx = len(layout_field_start_col)
+                layout_idxs[layout_key] = layout_idx
+                layout_field_start_col.append(len(field_table) // 5)
+                layout_n_fields_col.append(len(layout_key))
+                for name, lsb, msb, reset, is_encoded in layout_key:
+                    field_table.extend((
+                        _str(name), lsb, msb, _str("%x" % reset),
+                        FIELD_FLAG_ENCODE if is_encoded else 0,
+                    ))
+            layout_col.append(layout_idx)
+        else:
+            layout_col.append(-1)
+
+    string_table = json.dumps(strings, separators=(',', ':')).encode('utf-8')
+
+    header = struct.pack(
+        "<4s%dI" % (HEADER_WORDS - 1),
+        MAGIC, VERSION, first_id, len(entries),
+        len(children_table), len(dims_table),
+        len(layout_field_start_col), len(field_table) // 5,
+        len(string_table),
+        *([0] * (HEADER_WORDS - 9))
+    )
+
+    columns = [
+        offset_col, size_col, stride_col,
+        parent_col, layout_col,
+        name_col, children_start_col, n_children_col, dims_start_col, n_dims_col,
+        children_table, dims_table,
+        layout_field_start_col, layout_n_fields_col,
+        field_table,
+    ]
+    segments = [header]
+    for col in columns:
+        if sys.byteorder != "little":
+            col.byteswap()
+        segments.append(col.tobytes())
+    segments.append(string_table)
+    return b"".join(segments)
@@ -0,0 +1,73 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import json
+    from typing import Dict, List, Optional, Any
+    from .output import OutputDirectory
+
+class RALDataStream:
+    """
+    Writes JSON RAL data files as soon as all of their entries are complete,
+    rather than keeping the entire register model's data in memory until the
+    end of the export.
+
+    Each file covers a fixed range of nodes_per_file consecutive node ids.
+    An entry is complete once all of its node's children were visited, which
+    happens in post-order. A file can therefore be written as soon as its last
+    entry completes, regardless of the order files complete in. Only files
+    that contain an ancestor of the node currently being visited remain in
+    memory, which is at most one per level of hierarchy.
+
+    Completed entries are held as their encoded JSON text.
+    """
+    def __init__(self, output: 'OutputDirectory', nodes_per_file: int, encoder: 'json.JSONEncoder') -> None:
+        self.output = output
+        self.nodes_per_file = nodes_per_file
+        self.encoder = encoder
+
+        # Files that are not written yet
+        #   file index: encoded entries
+        self.files = {} # type: Dict[int, List[Optional[str]]]
+        #   file index: number of completed entries
+        self.n_completed = {} # type: Dict[int, int]
+
+        self.n_nodes = 0
+
+
+    def add(self, node_id: int, entry: 'Dict[str, Any]') -> None:
+        """
+        Add a completed entry
+        """
+        file_idx, idx = divmod(node_id, self.nodes_per_file)
+        entries = self.files.get(file_idx, None)
+        if entries is None:
+            entries = [None] * self.nodes_per_file
+            self.files[file_idx] = entries
+            self.n_completed[file_idx] = 0
+        entries[idx] = self.encoder.encode(entry)
+        self.n_completed[file_idx] += 1
+        self.n_nodes = max(self.n_nodes, node_id + 1)
+
+        if self.n_completed[file_idx] == self.nodes_per_file:
+            self._write_file(file_idx, entries)
+
+
+    def _write_file(self, file_idx: int, entries: 'List[Optional[str]]') -> None:
+        s = "[" + ",".join(entries) + "]" # type: ignore
+        self.output.write_file("data/ral-data-%d.json" % file_idx, s.encode('utf-8'))
+        del self.files[file_idx]
+        del self.n_completed[file_idx]
+
+
+    def finalize(self) -> int:
+        """
+        Writes out the remaining, partially filled, file.
+        All entries shall be complete.
+        Returns the number of files.
+        """
+        n_files = (self.n_nodes + self.nodes_per_file - 1) // self.nodes_per_file
+        for file_idx in sorted(self.files.keys()):
+            n_entries = min(self.nodes_per_file, self.n_nodes - file_idx * self.nodes_per_file)
+            assert self.n_completed[file_idx] == n_entries
+            self._write_file(file_idx, self.files[file_idx][:n_entries])
+        return n_files
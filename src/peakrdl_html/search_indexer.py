@@ -1,48 +1,150 @@
-from typing import Dict, List, Tuple, Set, Union
+from typing import Dict, List, Tuple, Union, Optional, Iterator, BinaryIO, TYPE_CHECKING
 from collections import defaultdict, OrderedDict
+from array import array
 import re
+import heapq
+import struct
+import base64
 import hashlib
+import tempfile
 import json
-import os
 
 from systemrdl.node import Node, FieldNode
 
+if TYPE_CHECKING:
+    from .output import OutputDirectory
+    from .def_memo import DefinitionMemo
+
 class SearchIndexer:
     # Rough limit of how many words each index file should have.
     # Intent is to reduce amount of data the client has to fetch per query
     WORDS_PER_FILE_THRESHOLD = 500
 
-    def __init__(self) -> None:
+    # If the index is compact, files are instead split once they reach
+    # roughly this many bytes
+    BYTES_PER_FILE_THRESHOLD = 64 * 1024
+
+    # Approximate size of each posting in memory, in bytes
+    POSTING_SIZE = 8
+
+    # Approximate memory overhead of each word that has pending postings, in
+    # bytes, aside from the word's characters. Covers the word's string, its
+    # dict entry, and its postings array object
+    WORD_OVERHEAD = 192
+
+    # Once this many spilled runs accumulate at the same level, they are
+    # merged into a single run at the next level. Limits the number of
+    # temporary files that are open at once
+    MAX_RUNS_PER_LEVEL = 16
+
+    # Limit of how many distinct texts to remember the tokenization of
+    TOKEN_CACHE_SIZE = 16384
+
+    def __init__(
+        self, memo: 'Optional[DefinitionMemo]'=None,
+        memory_budget: 'Optional[int]'=None,
+        compact: bool=False,
+        stop_word_ratio: 'Optional[float]'=None,
+    ) -> None:
+
+        # Postings of each word that were added since the last spill.
+        # Each posting is a (page_id, loc_code) pair packed into one integer.
+        # See pack_posting()
+        #   word: postings
+        self.postings = {} # type: Dict[str, array]
+
+        # Approximate memory occupied by postings, in bytes
+        self.postings_size = 0
+
+        # If set, postings are spilled to temporary files as sorted runs once
+        # they exceed this many bytes
+        self.memory_budget = memory_budget
 
-        # Flat index of mappings
-        #   word: {(page_id, loc_code), ...}
-        self.index = defaultdict(set) # type: Dict[str, Set[Tuple[int, int]]]
+        # Spilled runs, by merge level.
+        # Runs at level N each combine MAX_RUNS_PER_LEVEL runs of level N-1
+        self.runs = [] # type: List[List[BinaryIO]]
+
+        # If set, word locations are stored as delta-encoded varints, and
+        # bucket files are split by size
+        self.compact = compact
+
+        # If set, words that appear in more than this fraction of pages are
+        # not indexed, and are listed as stop words instead
+        self.stop_word_ratio = stop_word_ratio
+        self.n_pages = 0
+
+        # If provided, tokenized words are memoized per component definition
+        self.memo = memo
+
+        # Recently tokenized text
+        #   text: words
+        self._token_cache = {} # type: Dict[str, List[str]]
 
 
     def add_node(self, node: Node, page_id: int, field_idx:int=0) -> None:
+        if self.memo is not None:
+            node_words = self.memo.memoize(node, "search_words", lambda: self.get_node_words(node))
+        else:
+            node_words = self.get_node_words(node)
+
+        if page_id >= self.n_pages:
+            self.n_pages = page_id + 1
+
+        for loc_code, words in node_words:
+            loc_code |= (field_idx << 3)
+            posting = pack_posting(page_id, loc_code)
+            for word in words:
+                self._add_posting(word, posting)
+
+
+    def _add_posting(self, word: str, posting: int) -> None:
+        postings = self.postings.get(word, None)
+        if postings is None:
+            postings = array('Q')
+            self.postings[word] = postings
+            self.postings_size += self.WORD_OVERHEAD + len(word)
+        elif postings[-1] == posting:
+            # Skip repeated occurrence of a word in the same location
+            return
+        postings.append(posting)
+        self.postings_size += self.POSTING_SIZE
+
+        if (self.memory_budget is not None) and (self.postings_size > self.memory_budget):
+            self._spill()
+
+
+    def get_node_words(self, node: Node) -> List[Tuple[int, List[str]]]:
+        """
+        Get the words to index for this node.
+        Returns a list of (location code, words) pairs. The field index of the
+        location code is left as 0
+        """
         is_field = isinstance(node, FieldNode)
+        node_words = []
 
         text = node.get_property('desc')
         if text:
-            loc = self.get_location_code(is_field=is_field, field_idx=field_idx)
-            self.add_text(text, page_id, loc)
+            loc = self.get_location_code(is_field=is_field)
+            node_words.append((loc, self.tokenize(text)))
 
         text = node.get_property('name', default=None)
         if text:
-            loc = self.get_location_code(is_name=True, is_field=is_field, field_idx=field_idx)
-            self.add_text(text, page_id, loc)
+            loc = self.get_location_code(is_name=True, is_field=is_field)
+            node_words.append((loc, self.tokenize(text)))
 
         if is_field:
             encode = node.get_property('encode')
             if encode:
                 for member in encode:
-                    loc = self.get_location_code(is_field=True, is_name=True, is_enum=True, field_idx=field_idx)
-                    self.add_text(member.name, page_id, loc)
+                    loc = self.get_location_code(is_field=True, is_name=True, is_enum=True)
+                    node_words.append((loc, self.tokenize(member.name)))
                     if member.rdl_name:
-                        self.add_text(member.rdl_name, page_id, loc)
+                        node_words.append((loc, self.tokenize(member.rdl_name)))
                     if member.rdl_desc:
-                        loc = self.get_location_code(is_field=True, is_enum=True, field_idx=field_idx)
-                        self.add_text(member.rdl_desc, page_id, loc)
+                        loc = self.get_location_code(is_field=True, is_enum=True)
+                        node_words.append((loc, self.tokenize(member.rdl_desc)))
+
+        return node_words
 
 
     def get_location_code(self, is_name:bool=False, is_field:bool=False, is_enum:bool=False, field_idx:int=0) -> int:
@@ -64,17 +166,38 @@ class SearchIndexer:
 
 
     def add_text(self, text: str, page_id: int, loc_code:int) -> None:
-        text = self.normalize_text(text)
-
         # Submit words into index
-        for word in text.split():
-            self.add_word(word, page_id, loc_code)
+        posting = pack_posting(page_id, loc_code)
+        for word in self.tokenize(text):
+            self._add_posting(word, posting)
+
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Split text into the list of words that shall be indexed
+
+        The same text tends to be repeated many times throughout a design,
+        so results are cached. The returned list shall not be modified.
+        """
+        words = self._token_cache.get(text, None)
+        if words is not None:
+            return words
+
+        words = []
+        for word in self.normalize_text(text).split():
+            if len(word) >= 3 and word not in SKIP_WORDS:
+                words.append(word)
 
             # If a word contains underscores, submit the individual segments too
-            subwords = word.split("_")
-            if len(subwords) >= 2:
-                for w in subwords:
-                    self.add_word(w, page_id, loc_code)
+            if "_" in word:
+                for w in word.split("_"):
+                    if len(w) >= 3 and w not in SKIP_WORDS:
+                        words.append(w)
+
+        if len(self._token_cache) >= self.TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[text] = words
+        return words
 
 
     def normalize_text(self, text: str) -> str:
@@ -82,23 +205,126 @@ class SearchIndexer:
         text = text.lower()
 
         # Delete anything that looks like a URL
-        # regex from: https://daringfireball.net/2010/07/improved_regex_for_matching_urls
-        text = re.sub(r"\b((?:[a-z][\w-]+:(?:/{1,3}|[a-z0-9%])|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))", " ", text)
+        # Every URL the regex can match contains at least one of these
+        # substrings. Most text does not, so skip the expensive regex
+        if (":" in text) or ("/" in text) or ("www" in text):
+            text = URL_RE.sub(" ", text)
 
         # Replace non-word characters with spaces
-        text = re.sub(r"[^\w]", " ", text)
+        text = NON_WORD_RE.sub(" ", text)
 
         return text
 
 
     def add_word(self, word: str, page_id: int, loc_code:int) -> None:
-        # Discard small, or 'low value' words
-        if len(word) < 3:
-            return
-        if word in SKIP_WORDS:
+        if not is_indexable_word(word):
             return
 
-        self.index[word].add((page_id, loc_code))
+        self._add_posting(word, pack_posting(page_id, loc_code))
+
+
+    def get_sort_key(self, word: str) -> Tuple[int, str, str]:
+        """
+        Order in which words are stored in the bucket files
+        """
+        prefix = word[:3]
+        return (self.get_shorthash(prefix), prefix, word)
+
+
+    def _iter_memory(self) -> 'Iterator[Tuple[Tuple[int, str, str], str, array]]':
+        """
+        Yields (sort key, word, postings) for words that are currently in memory,
+        in sorted order. Postings are sorted and unique
+        """
+        entries = [(self.get_sort_key(word), word) for word in self.postings]
+        entries.sort()
+        for key, word in entries:
+            yield key, word, array('Q', sorted(set(self.postings[word])))
+
+
+    def _spill(self) -> None:
+        """
+        Write all postings that are currently in memory to a temporary file as
+        a sorted run, and release them.
+        """
+        f = _write_run(self._iter_memory())
+        self.postings = {}
+        self.postings_size = 0
+        self._add_run(f, 0)
+
+
+    def _add_run(self, f: BinaryIO, level: int) -> None:
+        """
+        Add a spilled run at the given merge level.
+        Once the level is full, its runs are merged into a run of the next
+        level
+        """
+        if level == len(self.runs):
+            self.runs.append([])
+        runs = self.runs[level]
+        runs.append(f)
+        if len(runs) >= self.MAX_RUNS_PER_LEVEL:
+            self.runs[level] = []
+            self._add_run(_write_run(self._merge_runs(runs)), level + 1)
+
+
+    def _merge_runs(self, runs: 'List[BinaryIO]') -> 'Iterator[Tuple[Tuple[int, str, str], str, array]]':
+        """
+        Merge sorted runs. Yields (sort key, word, postings) in sorted order,
+        with the postings of each word combined. This consumes the runs.
+        """
+        merged = heapq.merge(
+            *[self._iter_run(f) for f in runs],
+            key=lambda entry: entry[0]
+        ) # type: Iterator[Tuple[Tuple[int, str, str], str, array]]
+
+        current_key = None # type: Optional[Tuple[int, str, str]]
+        current_postings = [] # type: List[array]
+        for key, _, postings in merged:
+            if key != current_key:
+                if current_key is not None:
+                    yield current_key, current_key[2], _union_postings(current_postings)
+                current_key = key
+                current_postings = []
+            current_postings.append(postings)
+        if current_key is not None:
+            yield current_key, current_key[2], _union_postings(current_postings)
+
+
+    def _iter_run(self, f: BinaryIO) -> 'Iterator[Tuple[Tuple[int, str, str], str, array]]':
+        header_size = struct.calcsize("=II")
+        while True:
+            header = f.read(header_size)
+            if not header:
+                break
+            word_len, n_postings = struct.unpack("=II", header)
+            word = f.read(word_len).decode('utf-8')
+            postings = array('Q')
+            postings.fromfile(f, n_postings)
+            yield self.get_sort_key(word), word, postings
+        f.close()
+
+
+    def iter_index(self) -> 'Iterator[Tuple[str, List[Tuple[int, int]]]]':
+        """
+        Yields (word, locations) for all indexed words, in the order they are
+        stored in the bucket files.
+        Locations are a sorted list of (page_id, loc_code)
+
+        If postings were spilled to disk, runs are merged here. This consumes
+        the index.
+        """
+        if self.runs:
+            self._spill()
+            # At most MAX_RUNS_PER_LEVEL - 1 runs remain per level
+            runs = [f for level_runs in self.runs for f in level_runs]
+            self.runs = []
+            merged = self._merge_runs(runs)
+        else:
+            merged = self._iter_memory()
+
+        for _, word, postings in merged:
+            yield word, [(posting >> 32, posting & 0xFFFFFFFF) for posting in postings]
 
 
     def get_shorthash(self, prefix:str) -> int:
@@ -109,9 +335,9 @@ class SearchIndexer:
         return shorthash
 
 
-    def write_index_js(self, output_dir: str) -> None:
+    def write_index_js(self, output: 'OutputDirectory', subdir: str) -> None:
         """
-        Writes out js files
+        Writes out js files into subdir of the output directory
 
         One or more bucket files (bkt-#.json):
             {
@@ -129,93 +355,104 @@ class SearchIndexer:
                 ...
             }
 
+        If the index is compact, each word's list of locations is instead a
+        string. See encode_locations()
+
         A bucket index file (bkt_index.js):
             List of short hashes (see get_shorthash()) of the last prefix bucket
             stored in each bucket file.
             This will be used by the search to determine which bucket file to fetch
-        """
-        # Sort all words alphabetically
-        words = sorted(self.index.keys())
 
-        # Group word entries into buckets based on the word prefix
+            If any words were demoted to stop words, the list of them is
+            also stored here so that the search knows to ignore them.
+        """
+        # Words are visited in order of the hash of their prefix, then by
+        # prefix, then alphabetically. Hashing the prefix is a mechanism to
+        # evenly split the buckets across multiple files.
+        # Words are grouped into buckets based on the word prefix
         # This is intentional so that each bucket may contain multiple words
         # with the same prefix, allowing easy linear search of similar words
-        buckets = defaultdict(list)
-        for word in words:
-            locations = self.index[word]
+        bucket_file_idx = 0 # current bucket file index
+        last_hash_list = [] # List of last bucket hash inserted into each bucket file
+        word_count = 0 # Number of words in current bucket file
+        byte_count = 0 # Approximate size of current bucket file
+        bucket_file_dict = OrderedDict() # type: Dict[str, List[List[Union[str, List[Tuple[int, int]]]]]]
+        current_shorthash = None # type: Optional[int]
+        stop_words = [] # type: List[str]
 
-            prefix = word[:3]
+        if self.stop_word_ratio is not None:
+            max_pages = self.stop_word_ratio * self.n_pages
+        else:
+            max_pages = None
 
-            entry = [
-                word,
-                list(locations),
-            ]
-            buckets[prefix].append(entry)
+        def _write_bucket_file() -> None:
+            s = json.dumps(bucket_file_dict, separators=(',', ':'))
+            output.write_file("%s/bkt-%d.json" % (subdir, bucket_file_idx), s.encode('utf-8'))
 
+        for word, locations in self.iter_index():
+            if (max_pages is not None) and (count_pages(locations) > max_pages):
+                stop_words.append(word)
+                continue
 
-        # Generate hashes of each prefix. This will be used as a mechanism to
-        # evenly split the buckets across multiple files
-        shorthash_map = defaultdict(list)
-        for prefix in buckets.keys():
+            prefix = word[:3]
             shorthash = self.get_shorthash(prefix)
 
-            # Store prefix in list in case there is a hash collision
-            shorthash_map[shorthash].append(prefix)
-
-        # Write out JSON files
-        bucket_file_idx = 0 # current bucket file index
-        last_hash_list = [] # List of last bucket hash inserted into each bucket file
-        word_count = 0 # Number of words in current bucket file
-        bucket_file_dict = OrderedDict() # type: Dict[str, List[Union[str, List[Tuple[int, int]]]]]
-        shorthashes = sorted(shorthash_map.keys())
-
-        def _write_bucket_file() -> None:
-            path = os.path.join(output_dir, "bkt-%d.json" % bucket_file_idx)
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(bucket_file_dict, f, separators=(',', ':'))
-
-        for shorthash in shorthashes:
-            # Load buckets
-            for prefix in shorthash_map[shorthash]:
-                bucket = buckets[prefix]
-                word_count += len(bucket)
-                bucket_file_dict[prefix] = bucket
-
-            # Split to a new file once word threshold is exceeded
-            if word_count >= self.WORDS_PER_FILE_THRESHOLD:
-                # Write out json
-                _write_bucket_file()
-                last_hash_list.append(shorthash)
-
-                # reset for new file
-                bucket_file_idx += 1
-                word_count = 0
-                bucket_file_dict = OrderedDict()
+            if shorthash != current_shorthash:
+                # Split to a new file once word or byte threshold is exceeded
+                if self.compact:
+                    is_full = byte_count >= self.BYTES_PER_FILE_THRESHOLD
+                else:
+                    is_full = word_count >= self.WORDS_PER_FILE_THRESHOLD
+                if is_full:
+                    # Write out json
+                    _write_bucket_file()
+                    last_hash_list.append(current_shorthash)
+
+                    # reset for new file
+                    bucket_file_idx += 1
+                    word_count = 0
+                    byte_count = 0
+                    bucket_file_dict = OrderedDict()
+                current_shorthash = shorthash
+
+            if prefix not in bucket_file_dict:
+                bucket_file_dict[prefix] = []
+                byte_count += len(prefix) + 6
+            if self.compact:
+                encoded = encode_locations(locations)
+                bucket_file_dict[prefix].append([word, encoded])
+                byte_count += len(word) + len(encoded) + 8
+            else:
+                bucket_file_dict[prefix].append([word, locations])
+            word_count += 1
 
         # Write out remainder file
         if bucket_file_dict:
             _write_bucket_file()
-            last_hash_list.append(shorthash)
+            last_hash_list.append(current_shorthash)
 
         # Write out bucket file hash list
-        path = os.path.join(output_dir, "bkt_index.js")
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write("var SearchBucketIndex = ")
-            json.dump(last_hash_list, f, separators=(',', ':'))
-            f.write(";")
-
-        #self._debug_print_stats(buckets)
+        s = "var SearchBucketIndex = "
+        s += json.dumps(last_hash_list, separators=(',', ':'))
+        s += ";"
+        if stop_words:
+            s += "\nvar SearchStopWords = "
+            s += json.dumps(stop_words, separators=(',', ':'))
+            s += ";"
+        output.write_file("%s/bkt_index.js" % subdir, s.encode('utf-8'))
 
 
-    def _debug_print_stats(self, buckets: dict) -> None:
+    def _debug_print_stats(self) -> None:
         word_counts = []
-        for word, locations in self.index.items():
+        buckets = defaultdict(int) # type: Dict[str, int]
+        for word, locations in self.iter_index():
             word_counts.append((len(locations), word))
+            buckets[word[:3]] += 1
         word_counts.sort(reverse=True)
 
         bucket_counts = []
-        for prefix, words in buckets.items():
-            bucket_counts.append((len(words), prefix))
+        for prefix, count in buckets.items():
+            bucket_counts.append((count, prefix))
         bucket_counts.sort(reverse=True)
 
         print("Unique words:", len(word_counts))
@@ -229,6 +466,87 @@ class SearchIndexer:
             print("\t%d: %s" % (count, prefix))
 
 
+def pack_posting(page_id: int, loc_code: int) -> int:
+    """
+    Pack a word location into a single 64-bit integer.
+    Sorting packed postings orders them by page_id, then loc_code
+    """
+    return (page_id << 32) | loc_code
+
+
+def _union_postings(postings_list: 'List[array]') -> array:
+    """
+    Merge sorted packed postings into a single sorted, unique array
+    """
+    if len(postings_list) == 1:
+        return postings_list[0]
+    return array('Q', sorted(set().union(*postings_list)))
+
+
+def _write_run(entries: 'Iterator[Tuple[Tuple[int, str, str], str, array]]') -> BinaryIO:
+    """
+    Write sorted (sort key, word, postings) entries to a temporary file.
+    Returns the file, rewound so that it can be read back
+    """
+    f = tempfile.TemporaryFile()
+    for _, word, postings in entries:
+        word_bytes = word.encode('utf-8')
+        f.write(struct.pack("=II", len(word_bytes), len(postings)))
+        f.write(word_bytes)
+        postings.tofile(f)
+    f.seek(0)
+    return f
+
+
+# regex from: https://daringfireball.net/2010/07/improved_regex_for_matching_urls
+URL_RE = re.compile(r"\b((?:[a-z][\w-]+:(?:/{1,3}|[a-z0-9%])|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:'\".,<>?«»“”‘’]))")
+
+NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def count_pages(locations: 'List[Tuple[int, int]]') -> int:
+    """
+    Count the number of distinct pages in a sorted list of locations
+    """
+    count = 0
+    prev_page_id = -1
+    for page_id, _ in locations:
+        if page_id != prev_page_id:
+            count += 1
+            prev_page_id = page_id
+    return count
+
+
+def encode_locations(locations: 'List[Tuple[int, int]]') -> str:
+    """
+    Encode a sorted list of (page_id, loc_code) locations into a compact
+    string.
+
+    Each location is stored as a pair of unsigned LEB128 varints: the
+    difference between its page_id and the previous location's page_id,
+    followed by its loc_code. The resulting bytes are base64 encoded.
+    """
+    buf = bytearray()
+    prev_page_id = 0
+    for page_id, loc_code in locations:
+        for value in (page_id - prev_page_id, loc_code):
+            while value >= 0x80:
+                buf.append((value & 0x7F) | 0x80)
+                value >>= 7
+            buf.append(value)
+        prev_page_id = page_id
+    return base64.b64encode(bytes(buf)).decode('ascii')
+
+
+def is_indexable_word(word: str) -> bool:
+    # Discard small, or 'low value' words
+    if len(word) < 3:
+        return False
+    if word in SKIP_WORDS:
+        return False
+    return True
+
+
 # set of "low value" words that should not be indexed.
 # In the context of register space description text, these words are not considered
 # to be meaningful enough to ever be indexed, and are common enough that they could bloat it
@@ -0,0 +1,267 @@
+"""
+Serve a PeakRDL-html output directory over HTTP
+
+    python -m peakrdl_html.serve path/to/output
+
+Files that have precompressed siblings (see the exporter's ``precompress``
+option) are served compressed to clients that accept it.
+"""
+import os
+import sys
+import argparse
+import functools
+import urllib.parse
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Optional, List, Tuple, BinaryIO, Any
+
+class RequestHandler(SimpleHTTPRequestHandler):
+    """
+    Static file request handler that adds:
+
+    - Content negotiation of precompressed (.br, .gz) siblings
+    - Single byte range requests, as used to retrieve packed content pages
+    - ETag and If-None-Match validation
+    - Cache headers. URLs that carry a version or build timestamp query
+      (``?v=`` or ``?ts=``) never change, and can be cached indefinitely.
+      Everything else is revalidated on each use.
+    """
+    # Sibling extension: Content-Encoding, in order of preference
+    ENCODINGS = [
+        (".br", "br"),
+        (".gz", "gzip"),
+    ]
+
+    IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+    DEFAULT_CACHE_CONTROL = "no-cache"
+
+    # Number of bytes of the requested range that remain to be sent, or None
+    # if the entire file is sent
+    _remaining = None # type: Optional[int]
+
+    def send_head(self) -> 'Optional[BinaryIO]':
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and urllib.parse.urlsplit(self.path).path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not os.path.isfile(path):
+            # Let the base class handle directory redirects, index pages and
+            # errors
+            return super().send_head()
+
+        ctype = self.guess_type(path)
+        if "Range" in self.headers:
+            # Ranges refer to the uncompressed file
+            send_path, encoding = path, None # type: Tuple[str, Optional[str]]
+        else:
+            send_path, encoding = self._select_encoding(path)
+
+        try:
+            f = open(send_path, 'rb') # pylint: disable=consider-using-with
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            etag = '"%x-%x%s"' % (
+                fs.st_mtime_ns, fs.st_size,
+                ("-" + encoding) if encoding else ""
+            )
+
+            if self._etag_matches(etag):
+                f.close()
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self._send_cache_headers(etag)
+                self.end_headers()
+                return None
+
+            byte_range = self._get_range(fs.st_size)
+            if byte_range is None:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Length", str(fs.st_size))
+                self._remaining = None
+            else:
+                start, end = byte_range
+                if start >= fs.st_size:
+                    f.close()
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", "bytes */%d" % fs.st_size)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return None
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end - 1, fs.st_size))
+                self.send_header("Content-Length", str(end - start))
+                f.seek(start)
+                self._remaining = end - start
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Type", ctype)
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Last-Modified", self.date_time_string(int(fs.st_mtime)))
+            self._send_cache_headers(etag)
+            self.end_headers()
+            return f
+        except:
+            f.close()
+            raise
+
+
+    def copyfile(self, source: 'Any', outputfile: 'Any') -> None:
+        remaining = self._remaining
+        if remaining is None:
+            super().copyfile(source, outputfile)
+            return
+
+        # Only send the requested range
+        while remaining > 0:
+            buf = source.read(min(remaining, 64 * 1024))
+            if not buf:
+                break
+            outputfile.write(buf)
+            remaining -= len(buf)
+
+
+    def _get_range(self, size: int) -> 'Optional[Tuple[int, int]]':
+        """
+        Parse the request's Range header.
+        Returns the [start, end) byte range, or None to send the entire file.
+        Only single ranges are supported.
+        """
+        header = self.headers.get("Range")
+        if header is None:
+            return None
+        unit, _, spec = header.strip().partition("=")
+        if unit.strip() != "bytes" or "," in spec:
+            return None
+        first, _, last = spec.strip().partition("-")
+        try:
+            if first == "":
+                # Suffix range
+                length = int(last)
+                if length <= 0:
+                    return None
+                return max(size - length, 0), size
+            start = int(first)
+            if last == "":
+                end = size
+            else:
+                end = min(int(last) + 1, size)
+        except ValueError:
+            return None
+        if end <= start < size:
+            # Invalid range. Ignore it
+            return None
+        # A start beyond the end of the file is not satisfiable
+        return start, end
+
+
+    def _select_encoding(self, path: str) -> 'Tuple[str, Optional[str]]':
+        """
+        Returns the path of the file to send, and its content encoding
+        """
+        accepted = self._get_accepted_encodings()
+        for ext, encoding in self.ENCODINGS:
+            if encoding not in accepted:
+                continue
+            sibling = path + ext
+            try:
+                is_fresh = os.stat(sibling).st_mtime_ns >= os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            # Ignore stale siblings left behind by a previous export
+            if is_fresh:
+                return sibling, encoding
+        return path, None
+
+
+    def _get_accepted_encodings(self) -> 'List[str]':
+        accepted = []
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            segments = item.strip().split(";")
+            coding = segments[0].strip().lower()
+            q = 1.0
+            for param in segments[1:]:
+                name, _, value = param.strip().partition("=")
+                if name == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        pass
+            if coding and q > 0:
+                accepted.append(coding)
+        return accepted
+
+
+    def _etag_matches(self, etag: str) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is None:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag in (etag, "*"):
+                return True
+        return False
+
+
+    def _send_cache_headers(self, etag: str) -> None:
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        if ("ts" in query) or ("v" in query):
+            self.send_header("Cache-Control", self.IMMUTABLE_CACHE_CONTROL)
+        else:
+            self.send_header("Cache-Control", self.DEFAULT_CACHE_CONTROL)
+
+
+def main(argv: 'Optional[List[str]]'=None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="peakrdl-html-serve",
+        description="Serve PeakRDL-html output over HTTP",
+    )
+    parser.add_argument(
+        "directory",
+        nargs="?",
+        default=".",
+        help="Output directory to serve (default: current directory)"
+    )
+    parser.add_argument(
+        "-b", "--bind",
+        dest="bind",
+        default="127.0.0.1",
+        metavar="ADDRESS",
+        help="Address to listen on (default: %(default)s)"
+    )
+    parser.add_argument(
+        "-p", "--port",
+        dest="port",
+        type=int,
+        default=8000,
+        help="Port to listen on (default: %(default)s)"
+    )
+    options = parser.parse_args(argv)
+
+    if not os.path.isfile(os.path.join(options.directory, "index.html")):
+        parser.error("'%s' does not look like a PeakRDL-html output directory" % options.directory)
+
+    handler = functools.partial(RequestHandler, directory=options.directory)
+    with ThreadingHTTPServer((options.bind, options.port), handler) as httpd:
+        host, port = httpd.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        print("Serving %s at http://%s:%d/" % (os.path.abspath(options.directory), host, port))
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("")
+            sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import re
+import html
+import json
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from systemrdl.node import Node, FieldNode
+
+if TYPE_CHECKING:
+    from typing import Optional, List, Dict, Any, Callable
+    from .output import OutputDirectory
+
+class SnippetStore:
+    """
+    Collects the plain text that content search results show as a preview.
+
+    Each snippet corresponds to one of the page elements a search match can
+    point to, and is keyed by the page_id and a snippet code that is derived
+    from the match's location code:
+        [N:3]: field index
+        [1]: is field node
+        [0]: is name (otherwise description)
+
+    Pages are visited in increasing page_id order, so snippets are written out
+    in shards that each cover a contiguous range of pages as soon as they
+    reach the size threshold.
+    """
+    # Rough limit of how many bytes each snippet file should have
+    BYTES_PER_FILE_THRESHOLD = 32 * 1024
+
+    def __init__(
+        self, output: 'OutputDirectory', subdir: str,
+        get_node_desc: 'Callable[[Node, int], Optional[str]]',
+        get_enum_desc: 'Callable[[Any], str]',
+    ) -> None:
+        self.output = output
+        self.subdir = subdir
+
+        # Callbacks that return the rendered HTML description of a node or
+        # enum member
+        self.get_node_desc = get_node_desc
+        self.get_enum_desc = get_enum_desc
+
+        # ID of the first page in each snippet file
+        self.file_start_ids = [] # type: List[int]
+
+        # Contents of the current snippet file.
+        # Identical text is only stored once per file
+        self.texts = [] # type: List[str]
+        self.text_idxs = {} # type: Dict[str, int]
+        self.locs = OrderedDict() # type: Dict[str, int]
+        self.byte_count = 0
+
+
+    def add_node(self, node: Node, page_id: int, field_idx: int=0) -> None:
+        """
+        Add the snippets of a page's node, or one of its fields.
+        Fields shall be added after the page's node
+        """
+        if isinstance(node, FieldNode):
+            code = (field_idx << 3) | 0x2
+
+            name = node.get_property('name', default=None)
+            if name:
+                self._add(page_id, code | 0x1, "%s - %s" % (node.inst_name, name))
+            else:
+                self._add(page_id, code | 0x1, node.inst_name)
+
+            segments = []
+            desc = self.get_node_desc(node, 3)
+            if desc:
+                segments.append(html_to_text(desc))
+            encode = node.get_property('encode')
+            if encode:
+                for member in encode:
+                    segments.append(member.name)
+                    if member.rdl_name:
+                        segments.append(member.rdl_name)
+                    if member.rdl_desc:
+                        segments.append(html_to_text(self.get_enum_desc(member)))
+            if segments:
+                self._add(page_id, code, " ".join(segments))
+        else:
+            # Only split files between pages
+            if self.byte_count >= self.BYTES_PER_FILE_THRESHOLD:
+                self._write_snippet_file()
+
+            name = node.get_property('name', default=None)
+            if name:
+                self._add(page_id, 0x1, name)
+
+            desc = self.get_node_desc(node, 2)
+            if desc:
+                self._add(page_id, 0x0, html_to_text(desc))
+
+
+    def _add(self, page_id: int, code: int, text: str) -> None:
+        if not self.locs:
+            self.file_start_ids.append(page_id)
+
+        text_idx = self.text_idxs.get(text, None)
+        if text_idx is None:
+            text_idx = len(self.texts)
+            self.text_idxs[text] = text_idx
+            self.texts.append(text)
+            self.byte_count += len(text) + 3
+
+        key = "%d:%d" % (page_id, code)
+        self.locs[key] = text_idx
+        self.byte_count += len(key) + 8
+
+
+    def _write_snippet_file(self) -> None:
+        """
+        Writes out the current snippet file (snp-#.json):
+            {
+                "texts": ["text", ...],
+                "locs": {
+                    "page_id:code": text index,
+                    ...
+                }
+            }
+        """
+        data = OrderedDict([
+            ("texts", self.texts),
+            ("locs", self.locs),
+        ])
+        s = json.dumps(data, separators=(',', ':'))
+        file_idx = len(self.file_start_ids) - 1
+        self.output.write_file("%s/snp-%d.json" % (self.subdir, file_idx), s.encode('utf-8'))
+
+        self.texts = []
+        self.text_idxs = {}
+        self.locs = OrderedDict()
+        self.byte_count = 0
+
+
+    def finalize(self) -> None:
+        """
+        Writes out the remaining snippet file, and the snippet file index
+        (snp_index.js), which lists the ID of the first page in each file.
+        """
+        if self.locs:
+            self._write_snippet_file()
+
+        s = "var SnippetFileStartIds = "
+        s += json.dumps(self.file_start_ids, separators=(',', ':'))
+        s += ";"
+        self.output.write_file("%s/snp_index.js" % self.subdir, s.encode('utf-8'))
+
+
+# Tags that separate blocks of text when rendered
+BLOCK_TAG_RE = re.compile(r"<(?:/?(?:p|div|br|li|tr|td|th|h\d|pre|table|ul|ol|dd|dt)\b)[^>]*>", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]*>")
+WHITESPACE_RE = re.compile(r"\s+")
+
+def html_to_text(s: str) -> str:
+    """
+    Reduce an HTML fragment to plain text, similar to its textContent
+    """
+    s = BLOCK_TAG_RE.sub(" ", s)
+    s = TAG_RE.sub("", s)
+    s = html.unescape(s)
+    return WHITESPACE_RE.sub(" ", s).strip()
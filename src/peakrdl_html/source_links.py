@@ -0,0 +1,114 @@
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Tuple, Iterable
+    from gitmetheurl import GitMeTheURL
+
+class _FileLinks:
+    """
+    Resolved source links of a single file
+    """
+    __slots__ = ("filename", "url", "url_parts")
+
+    def __init__(self, filename: str, url: str, url_parts: 'Optional[List[str]]') -> None:
+        self.filename = filename
+
+        # URL to the file, without a line number
+        self.url = url
+
+        # URL to a line of the file, split at each occurrence of the line
+        # number. None if line URLs could not be templated, in which case
+        # GitMeTheURL is consulted for each line.
+        self.url_parts = url_parts
+
+
+class SourceLinkResolver:
+    """
+    Resolves the URLs of source files using GitMeTheURL.
+
+    Resolving a file's URL involves discovering its repository, and
+    translating the repository's remote. The result only differs by line
+    number for all nodes defined in the same file, so each file is resolved
+    once, and its URL is kept as a template that the line number is
+    substituted into.
+    Files that cannot be resolved are also remembered, rather than retrying
+    for every node.
+    """
+    # Line numbers used to derive a file's URL template
+    TEMPLATE_LINES = (918273645, 546372819)
+
+    def __init__(self, gmtu: 'GitMeTheURL') -> None:
+        self.gmtu = gmtu
+
+        # Path as referenced by the source: resolved links, or None if the
+        # file's URL cannot be resolved
+        self._files = {} # type: Dict[str, Optional[_FileLinks]]
+        self._lock = threading.Lock()
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._files.clear()
+
+
+    def resolve_files(self, paths: 'Iterable[str]') -> None:
+        """
+        Resolve all files in paths that were not resolved already
+        """
+        for path in set(paths):
+            self._get_file(path)
+
+
+    def get_source_url(self, path: str, line: 'Optional[int]') -> 'Tuple[Optional[str], Optional[str]]':
+        """
+        Returns the URL of a line within the source file, along with the
+        file's name.
+        Returns None, None if the file's URL cannot be resolved
+        """
+        links = self._get_file(path)
+        if links is None:
+            return None, None
+
+        if line is None:
+            return links.url, links.filename
+        if links.url_parts is None:
+            try:
+                return self.gmtu.get_source_url(os.path.realpath(path), line), links.filename
+            except Exception: # pylint: disable=broad-except
+                return None, None
+        return str(line).join(links.url_parts), links.filename
+
+
+    def _get_file(self, path: str) -> 'Optional[_FileLinks]':
+        with self._lock:
+            if path in self._files:
+                return self._files[path]
+
+        links = self._resolve_file(path)
+        with self._lock:
+            self._files[path] = links
+        return links
+
+
+    def _resolve_file(self, path: str) -> 'Optional[_FileLinks]':
+        # resolve any symlinks to ensure true git path
+        realpath = os.path.realpath(path)
+        try:
+            url = self.gmtu.get_source_url(realpath)
+            line_urls = [
+                self.gmtu.get_source_url(realpath, line)
+                for line in self.TEMPLATE_LINES
+            ]
+        except Exception: # pylint: disable=broad-except
+            return None
+
+        # Derive the template from one line number, and only use it if it
+        # reproduces the URL of the other
+        url_parts = line_urls[0].split(str(self.TEMPLATE_LINES[0])) # type: Optional[List[str]]
+        assert url_parts is not None
+        if str(self.TEMPLATE_LINES[1]).join(url_parts) != line_urls[1]:
+            url_parts = None
+
+        return _FileLinks(os.path.basename(realpath), url, url_parts)
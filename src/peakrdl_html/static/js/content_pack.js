@@ -0,0 +1,106 @@
+// This file is part of PeakRDL-html <https://github.com/SystemRDL/PeakRDL-html>.
+// and can be redistributed under the terms of GNU LGPLv3 <https://www.gnu.org/licenses/>.
+
+// Retrieves content pages that were packed into segment files
+// See content_pack.py for the format
+class ContentPack {
+    static #index_files = new Map();
+    static #segments = new Map();
+
+    // Whether the server honors Range requests. Unknown until the first fetch
+    static #range_supported = null;
+
+    static is_enabled(){
+        return (typeof CONTENT_PACK_PAGES_PER_INDEX !== "undefined");
+    }
+
+    static async fetch_page(id){
+        var entry = await this.#get_index_entry(id);
+        var segment_idx = entry[0];
+        var start = entry[1];
+        var end = entry[1] + entry[2];
+
+        var bytes;
+        if(this.#range_supported === false || this.#segments.has(segment_idx)){
+            bytes = (await this.#fetch_segment(segment_idx)).slice(start, end);
+        } else {
+            bytes = await this.#fetch_range(segment_idx, start, end);
+        }
+        return new TextDecoder().decode(bytes);
+    }
+
+    static async #get_index_entry(id){
+        var file_idx = Math.floor(id / CONTENT_PACK_PAGES_PER_INDEX);
+        if(!this.#index_files.has(file_idx)){
+            var path = "content/pack-index-" + file_idx + ".bin?ts=" + BUILD_TS;
+            var awaitable = fetch(path)
+                .then(response => {
+                    if(!response.ok){
+                        throw new Error("page index fetch failed");
+                    }
+                    return response.arrayBuffer();
+                })
+                .then(buf => {
+                    return new DataView(buf);
+                });
+            this.#index_files.set(file_idx, awaitable);
+            awaitable.catch(e => {
+                this.#index_files.delete(file_idx);
+            });
+        }
+        var view = await this.#index_files.get(file_idx);
+        var offset = (id % CONTENT_PACK_PAGES_PER_INDEX) * 12;
+        return [
+            view.getUint32(offset, true),
+            view.getUint32(offset + 4, true),
+            view.getUint32(offset + 8, true),
+        ];
+    }
+
+    static #get_segment_path(segment_idx){
+        return "content/pack-" + segment_idx + ".bin?ts=" + BUILD_TS;
+    }
+
+    static async #fetch_range(segment_idx, start, end){
+        if(start == end) return new Uint8Array(0);
+        var response = await fetch(this.#get_segment_path(segment_idx), {
+            headers: {"Range": "bytes=" + start + "-" + (end - 1)}
+        });
+        if(!response.ok){
+            throw new Error("page fetch failed");
+        }
+        if(response.status == 206){
+            this.#range_supported = true;
+            return new Uint8Array(await response.arrayBuffer());
+        }
+
+        // Server ignored the range and returned the entire segment.
+        // Keep it, and load entire segments from now on
+        this.#range_supported = false;
+        var awaitable = response.arrayBuffer().then(buf => {
+            return new Uint8Array(buf);
+        });
+        this.#segments.set(segment_idx, awaitable);
+        return (await awaitable).slice(start, end);
+    }
+
+    static async #fetch_segment(segment_idx){
+        if(!this.#segments.has(segment_idx)){
+            var awaitable = fetch(this.#get_segment_path(segment_idx))
+                .then(response => {
+                    if(!response.ok){
+                        throw new Error("page fetch failed");
+                    }
+                    return response.arrayBuffer();
+                })
+                .then(buf => {
+                    return new Uint8Array(buf);
+                });
+            this.#segments.set(segment_idx, awaitable);
+            awaitable.catch(e => {
+                this.#segments.delete(segment_idx);
+            });
+        }
+        return this.#segments.get(segment_idx);
+    }
+}
@@ -6,8 +6,18 @@ class ContentSearch {
     static #ITER_BREAK_INTERVAL = 1000;
     static #PREVIEW_MAX_RUN_LENGTH = 200;
     static #bucket_files = new Array(SearchBucketIndex.length).fill(null);
+    static #stop_words = new Set((typeof SearchStopWords === "undefined") ? [] : SearchStopWords);
+    static #snippet_files = new Map();
 
     static async start(query, abortSignal){
+        var matches = await this.find_matches(query, abortSignal);
+        if(abortSignal.aborted) return;
+        await this.show_matches(matches, abortSignal);
+    }
+
+
+    static async find_matches(query, abortSignal){
+        // Returns the top matches for the query
         var keywords = this.#get_query_words(query);
 
         // determine which bucket files need to be fetched, if any
@@ -24,7 +34,7 @@ class ContentSearch {
             filtered_keywords.push(keywords[i]);
             if(this.#bucket_files[bidx] == null) bidxs_to_fetch.add(bidx);
         }
-        if(filtered_keywords.length == 0) return;
+        if(filtered_keywords.length == 0) return [];
         bidxs_to_fetch = Array.from(bidxs_to_fetch);
 
         // Launch all fetches in parallel and wait for them to return
@@ -33,11 +43,16 @@ class ContentSearch {
             fetches.push(this.#fetch_bucket_file(bidxs_to_fetch[i]));
         }
         await Promise.all(fetches);
-        if(abortSignal.aborted) return;
+        if(abortSignal.aborted) return [];
 
         var matches = await this.#get_matches(filtered_keywords, abortSignal);
-        if(abortSignal.aborted) return;
+        if(abortSignal.aborted) return [];
 
+        return matches.slice(0, this.#MAX_RESULTS);
+    }
+
+
+    static async show_matches(matches, abortSignal){
         // Fetch preview text for top matches
         var preview_text_fetches = [];
         for(var i=0; i<matches.length && i<this.#MAX_RESULTS; i++) {
@@ -91,13 +106,14 @@ class ContentSearch {
         var keywords = new Set();
         for(var i=0; i<words.length; i++){
             if(words[i].length < 3) continue;
-            keywords.add(words[i]);
+            if(!this.#stop_words.has(words[i])) keywords.add(words[i]);
 
             // If a word contains underscores, submit the individual segments too
             var subwords = words[i].split("_");
             if(subwords.length >= 2){
                 for(var j=0; j<subwords.length; j++){
                     if(subwords[j].length < 3) continue;
+                    if(this.#stop_words.has(subwords[j])) continue;
                     keywords.add(subwords[j]);
                 }
             }
@@ -129,11 +145,51 @@ class ContentSearch {
                 return response.json();
             })
             .then(data => {
+                // Compact index stores each word's locations as a string
+                for(const prefix in data){
+                    var words = data[prefix];
+                    for(var widx=0; widx<words.length; widx++){
+                        if(typeof words[widx][1] == "string"){
+                            words[widx][1] = this.#decode_locations(words[widx][1]);
+                        }
+                    }
+                }
                 this.#bucket_files[bidx] = data;
             });
         return awaitable;
     }
 
+    static #decode_locations(encoded){
+        // Locations are stored as base64 encoded pairs of unsigned LEB128
+        // varints: page_id delta, followed by loc_code
+        var bytes = atob(encoded);
+        var locations = [];
+        var page_id = 0;
+        var pair = [0, 0];
+        var n_values = 0;
+        var value = 0;
+        var scale = 1;
+        for(var i=0; i<bytes.length; i++){
+            var b = bytes.charCodeAt(i);
+            value += (b & 0x7F) * scale;
+            if(b & 0x80){
+                scale *= 128;
+                continue;
+            }
+            if(n_values % 2 == 0){
+                page_id += value;
+                pair = [page_id, 0];
+            } else {
+                pair[1] = value;
+                locations.push(pair);
+            }
+            n_values++;
+            value = 0;
+            scale = 1;
+        }
+        return locations;
+    }
+
 
     static async #get_matches(keywords, abortSignal){
 
@@ -223,6 +279,60 @@ class ContentSearch {
 
 
     static async #fetch_match_preview_text(match){
+        var text = await this.#fetch_snippet_text(match);
+        if(text == null) text = await this.#fetch_page_text(match);
+
+        // Reduce excess whitespace
+        text = text.replace(/\s+/g, " ");
+
+        return this.#mark_preview_text(text, match);
+    }
+
+    static async #fetch_snippet_text(match){
+        // Look up the match's preview text in the snippet store.
+        // Returns null if it is not available
+        if(typeof SnippetFileStartIds === "undefined") return null;
+        if(SnippetFileStartIds.length == 0 || match.page_id < SnippetFileStartIds[0]) return null;
+
+        // Find the file that covers the page
+        var lo = 0;
+        var hi = SnippetFileStartIds.length - 1;
+        while(lo < hi){
+            var mid = (lo + hi + 1) >> 1;
+            if(SnippetFileStartIds[mid] <= match.page_id){
+                lo = mid;
+            } else {
+                hi = mid - 1;
+            }
+        }
+
+        if(!this.#snippet_files.has(lo)){
+            var path = "search/snp-" + lo + ".json?ts=" + BUILD_TS;
+            this.#snippet_files.set(lo, fetch(path).then(response => {
+                if(!response.ok){
+                    throw new Error("fetch failed");
+                }
+                return response.json();
+            }));
+        }
+
+        var data;
+        try {
+            data = await this.#snippet_files.get(lo);
+        } catch(e) {
+            this.#snippet_files.delete(lo);
+            return null;
+        }
+
+        var code = match.is_name ? 0x1 : 0x0;
+        if(match.is_field) code |= (match.field_idx << 3) | 0x2;
+        var text_idx = data.locs[match.page_id + ":" + code];
+        if(text_idx === undefined) return null;
+        return data.texts[text_idx];
+    }
+
+    static async #fetch_page_text(match){
+        // Fetch the match's content page and extract its preview text
         return fetch_page_content(match.page_id).then(text => {
             var dp = new DOMParser();
             var doc = dp.parseFromString(text, "text/html");
@@ -251,55 +361,54 @@ class ContentSearch {
             var el = doc.getElementById(el_id);
 
             // strip HTML tags
-            text = el.textContent;
-
-            // Reduce excess whitespace
-            text = text.replace(/\s+/g, " ");
-
-            // Mark all keywords in content
-            var keywords = Array.from(new Set([...match.full_match_keywords, ...match.partial_match_keywords]));
-            var regex = new RegExp("(?:\\b|_)(" + keywords.join("|") + ")", "ig");
-            var marked_text = "";
-            var prev_idx = 0;
-            for (const m of text.matchAll(regex)) {
-                var m_idx = m.index;
-
-                // advance match past underscore if it is in match
-                if(text[m_idx] == "_") m_idx += 1;
-
-                // Pass through prior segment
-                if(prev_idx < m_idx) {
-                    var unmarked_segment = text.slice(prev_idx, m_idx);
-                    if(unmarked_segment.length > this.#PREVIEW_MAX_RUN_LENGTH) {
-                        // shorten the segment
-                        if(marked_text == ""){
-                            // is first
-                            unmarked_segment = this.#shorten_text_first(unmarked_segment);
-                        } else {
-                            // is middle
-                            unmarked_segment = this.#shorten_text_middle(unmarked_segment);
-                        }
-                    }
-                    marked_text += unmarked_segment;
-                }
-
-                // highlight segment
-                marked_text += "<mark>" + m[1] + "</mark>";
-                prev_idx = m_idx + m[1].length;
-            }
+            return el.textContent;
+        });
+    }
 
-            if(prev_idx < text.length){
-                // pass through last unmarked segment
-                var unmarked_segment = text.slice(prev_idx, text.index);
+    static #mark_preview_text(text, match){
+        // Mark all keywords in content
+        var keywords = Array.from(new Set([...match.full_match_keywords, ...match.partial_match_keywords]));
+        var regex = new RegExp("(?:\\b|_)(" + keywords.join("|") + ")", "ig");
+        var marked_text = "";
+        var prev_idx = 0;
+        for (const m of text.matchAll(regex)) {
+            var m_idx = m.index;
+
+            // advance match past underscore if it is in match
+            if(text[m_idx] == "_") m_idx += 1;
+
+            // Pass through prior segment
+            if(prev_idx < m_idx) {
+                var unmarked_segment = text.slice(prev_idx, m_idx);
                 if(unmarked_segment.length > this.#PREVIEW_MAX_RUN_LENGTH) {
                     // shorten the segment
-                    unmarked_segment = this.#shorten_text_last(unmarked_segment);
+                    if(marked_text == ""){
+                        // is first
+                        unmarked_segment = this.#shorten_text_first(unmarked_segment);
+                    } else {
+                        // is middle
+                        unmarked_segment = this.#shorten_text_middle(unmarked_segment);
+                    }
                 }
                 marked_text += unmarked_segment;
             }
 
-            return marked_text;
-        });
+            // highlight segment
+            marked_text += "<mark>" + m[1] + "</mark>";
+            prev_idx = m_idx + m[1].length;
+        }
+
+        if(prev_idx < text.length){
+            // pass through last unmarked segment
+            var unmarked_segment = text.slice(prev_idx, text.index);
+            if(unmarked_segment.length > this.#PREVIEW_MAX_RUN_LENGTH) {
+                // shorten the segment
+                unmarked_segment = this.#shorten_text_last(unmarked_segment);
+            }
+            marked_text += unmarked_segment;
+        }
+
+        return marked_text;
     }
 
     static #shorten_text_first(text){
@@ -330,9 +439,10 @@ class ContentSearchMatch {
         this.is_enum = Boolean(location_code & 0x4);
         this.is_field = Boolean(location_code & 0x2);
         if(this.is_field){
-            var field_idx = (location_code >> 3);
-            this.field_name = RAL.get_node(this.page_id).fields[field_idx].name;
+            this.field_idx = (location_code >> 3);
+            this.field_name = RAL.get_node(this.page_id).fields[this.field_idx].name;
         } else {
+            this.field_idx = null;
             this.field_name = null;
         }
     }
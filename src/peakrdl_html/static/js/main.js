@@ -51,10 +51,11 @@ function onPageLoad() {
     window.onpopstate = onPopState;
     window.onkeydown = onKeyDownMain;
 
-    RAL.load_ral_data().then(() => {
+    RAL.load_ral_data().then(async () => {
         // Determine what page id will be loaded
         var url = new URL(window.location.href);
         var path = url.searchParams.get("p", path);
+        await RAL.ensure_path_loaded(path);
         var parsed_path = RAL.parse_path(path);
         var id;
         if(parsed_path == null) {
@@ -68,6 +69,8 @@ function onPageLoad() {
         load_page_via_url();
         init_index_edit();
         userHooks.onPageLoad();
+
+        if(RAL.is_lazy()) RAL.load_remaining_in_background();
     })
     .catch(e => {
         // Page load failed
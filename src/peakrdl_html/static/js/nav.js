@@ -2,6 +2,7 @@
 // and can be redistributed under the terms of GNU LGPLv3 <https://www.gnu.org/licenses/>.
 
 async function load_page(id) {
+    await RAL.ensure_loaded(id);
     var awaitable = fetch_page_content(id);
     awaitable.then(text => {
         // Page loaded successfully
@@ -24,6 +25,8 @@ async function load_page(id) {
 }
 
 async function fetch_page_content(id){
+    if(ContentPack.is_enabled()) return ContentPack.fetch_page(id);
+
     var path = "content/" + RAL.get_node_uid(id) + ".html?ts=" + BUILD_TS;
     var awaitable = fetch(path)
         .then(response => {
@@ -41,6 +44,7 @@ async function load_page_via_url(){
 
     var url = new URL(window.location.href);
     var path = url.searchParams.get("p", path);
+    await RAL.ensure_path_loaded(path);
     var parsed_path = RAL.parse_path(path);
     var new_path;
     if(parsed_path == null) {
@@ -78,8 +82,9 @@ async function load_page_via_url(){
     }
 }
 
-function load_page_via_path(path, url_hash){
+async function load_page_via_path(path, url_hash){
     if(typeof url_hash === "undefined") url_hash = "";
+    await RAL.ensure_path_loaded(path);
     var prev_path = RAL.get_path(CurrentID);
     var prev_url_hash = window.location.hash;
     var parsed_path = RAL.parse_path(path);
@@ -121,8 +126,10 @@ function onClickNodeLink(ev) {
     var id = parseInt(el.dataset.id);
     if(id == CurrentID) return(false);
 
-    RAL.reset_indexes_to_next(id);
-    load_page(id).then(() => {
+    RAL.ensure_loaded(id).then(() => {
+        RAL.reset_indexes_to_next(id);
+        return load_page(id);
+    }).then(() => {
         Sidebar.expand_to_id(id);
         Sidebar.select_node(id);
         Sidebar.scroll_into_view(id);
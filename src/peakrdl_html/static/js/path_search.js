@@ -4,6 +4,11 @@
 class PathSearch {
     static #MAX_RESULTS = 100;
     static #SEARCH_CHOMP_SIZE = 100;
+    static #INDEX_CHOMP_SIZE = 10000;
+
+    // Index of node and field names. Built once on first search
+    static #index = null;
+    static #index_promise = null;
 
     static async start(query, abortSignal){
         if(query.length < 2) return;
@@ -16,41 +21,180 @@ class PathSearch {
             keywords.push(sp_query[i]);
         }
 
+        await this.#build_index();
+        if(abortSignal.aborted) return;
+
+        var ranges = this.#get_candidate_ranges(keywords);
+
         var match_count = 0;
-        for(var id=0; id<RAL.number_of_ids(); id++){
-            var path = RAL.get_path(id, null, false);
+        var n_tested = 0;
+        for(var r=0; r<ranges.length; r++){
+            for(var id=ranges[r][0]; id<ranges[r][1]; id++){
+                var path = RAL.get_path(id, null, false);
 
-            if(id % this.#SEARCH_CHOMP_SIZE == (this.#SEARCH_CHOMP_SIZE-1)){
-                // Occasionally insert break to allow other events to continue
+                n_tested++;
+                if(n_tested % this.#SEARCH_CHOMP_SIZE == 0){
+                    // Occasionally insert break to allow other events to continue
+                    await take_a_break();
+                    if(abortSignal.aborted) return;
+                }
+
+                // Search regular path
+                var text_segments = this.#test_path(path, keywords);
+                if(text_segments != null){
+                    // direct node path matched
+                    add_search_result(text_segments, id);
+                    match_count++;
+                } else {
+                    // No match yet. If this node has fields, add them to the path and try that
+                    if(RAL.is_register(id)){
+                        var node = RAL.get_node(id);
+                        for(var i=0; i<node.fields.length; i++){
+                            var path_with_field = path + "." + node.fields[i].name;
+                            text_segments = this.#test_path(path_with_field, keywords);
+                            if(text_segments != null){
+                                add_search_result(text_segments, id, null, node.fields[i].name);
+                                match_count++;
+                            }
+                        }
+                    }
+                }
+
+                if(match_count >= this.#MAX_RESULTS) {
+                    return;
+                }
+            }
+        }
+    }
+
+    static #build_index(){
+        if(this.#index_promise == null){
+            this.#index_promise = this.#do_build_index();
+        }
+        return this.#index_promise;
+    }
+
+    static async #do_build_index(){
+        // Collect all unique names, which nodes use each name as their own,
+        // and which registers contain a field with each name.
+        // Also find the extent of each node's subtree. Node ids are assigned in
+        // depth-first order, so a subtree is a contiguous range of ids
+        var n_ids = RAL.number_of_ids();
+        var index = {
+            names_lc: [],
+            node_ids_by_name: [],
+            reg_ids_by_field_name: [],
+            subtree_ends: new Uint32Array(n_ids),
+        };
+        var name_idxs = new Map();
+        function get_name_idx(name){
+            var name_idx = name_idxs.get(name);
+            if(name_idx === undefined){
+                name_idx = index.names_lc.length;
+                name_idxs.set(name, name_idx);
+                index.names_lc.push(name.toLowerCase());
+                index.node_ids_by_name.push([]);
+                index.reg_ids_by_field_name.push([]);
+            }
+            return name_idx;
+        }
+
+        for(var id=0; id<n_ids; id++){
+            if(id % this.#INDEX_CHOMP_SIZE == (this.#INDEX_CHOMP_SIZE-1)){
                 await take_a_break();
-                if(abortSignal.aborted) return;
             }
 
-            // Search regular path
-            var text_segments = this.#test_path(path, keywords);
-            if(text_segments != null){
-                // direct node path matched
-                add_search_result(text_segments, id);
-                match_count++;
+            var node = RAL.get_node(id);
+            index.node_ids_by_name[get_name_idx(node.name)].push(id);
+            if(RAL.is_register_node(node)){
+                for(var i=0; i<node.fields.length; i++){
+                    var reg_ids = index.reg_ids_by_field_name[get_name_idx(node.fields[i].name)];
+                    if(reg_ids[reg_ids.length - 1] !== id) reg_ids.push(id);
+                }
+            }
+        }
+
+        // Children always have larger ids than their parent
+        for(var id=n_ids-1; id>=0; id--){
+            var children = RAL.get_node(id).children;
+            if(children.length){
+                index.subtree_ends[id] = index.subtree_ends[children[children.length - 1]];
             } else {
-                // No match yet. If this node has fields, add them to the path and try that
-                if(RAL.is_register(id)){
-                    var node = RAL.get_node(id);
-                    for(var i=0; i<node.fields.length; i++){
-                        var path_with_field = path + "." + node.fields[i].name;
-                        text_segments = this.#test_path(path_with_field, keywords);
-                        if(text_segments != null){
-                            add_search_result(text_segments, id, null, node.fields[i].name);
-                            match_count++;
-                        }
+                index.subtree_ends[id] = id + 1;
+            }
+        }
+
+        this.#index = index;
+    }
+
+    static #get_candidate_ranges(keywords){
+        // Keywords are matched against the path in order, but since names
+        // never contain a '.', every '.'-separated piece of a keyword has to
+        // be contained in the name of the node, one of its ancestors, or one
+        // of its fields.
+        // Returns a sorted list of [start, end) id ranges that satisfy this for
+        // all pieces. Only these nodes need to be tested.
+        var index = this.#index;
+        var ranges = [[0, RAL.number_of_ids()]];
+        for(var k=0; k<keywords.length; k++){
+            var pieces = keywords[k].split(".");
+            for(var p=0; p<pieces.length; p++){
+                if(pieces[p] == "") continue;
+
+                var piece_ranges = [];
+                for(var name_idx=0; name_idx<index.names_lc.length; name_idx++){
+                    if(!index.names_lc[name_idx].includes(pieces[p])) continue;
+
+                    // Any node in the subtree of a matching node is a candidate
+                    var node_ids = index.node_ids_by_name[name_idx];
+                    for(var i=0; i<node_ids.length; i++){
+                        piece_ranges.push([node_ids[i], index.subtree_ends[node_ids[i]]]);
+                    }
+
+                    // ... as well as registers with a matching field
+                    var reg_ids = index.reg_ids_by_field_name[name_idx];
+                    for(var i=0; i<reg_ids.length; i++){
+                        piece_ranges.push([reg_ids[i], reg_ids[i] + 1]);
                     }
                 }
+                ranges = this.#intersect_ranges(ranges, this.#merge_ranges(piece_ranges));
+                if(ranges.length == 0) return(ranges);
+            }
+        }
+        return(ranges);
+    }
+
+    static #merge_ranges(ranges){
+        // Sort and merge overlapping ranges
+        ranges.sort((a, b) => a[0] - b[0]);
+        var merged = [];
+        for(var i=0; i<ranges.length; i++){
+            var last = merged[merged.length - 1];
+            if((last !== undefined) && (ranges[i][0] <= last[1])){
+                if(ranges[i][1] > last[1]) last[1] = ranges[i][1];
+            } else {
+                merged.push([ranges[i][0], ranges[i][1]]);
             }
+        }
+        return(merged);
+    }
 
-            if(match_count >= this.#MAX_RESULTS) {
-                break;
+    static #intersect_ranges(a, b){
+        // Intersect two sorted lists of disjoint ranges
+        var result = [];
+        var i = 0;
+        var j = 0;
+        while((i < a.length) && (j < b.length)){
+            var start = Math.max(a[i][0], b[j][0]);
+            var end = Math.min(a[i][1], b[j][1]);
+            if(start < end) result.push([start, end]);
+            if(a[i][1] < b[j][1]){
+                i++;
+            } else {
+                j++;
             }
         }
+        return(result);
     }
 
     static #test_path(path, keywords){
@@ -4,10 +4,34 @@
 class RAL {
     static #ral_data_files = new Array(N_RAL_FILES).fill(null);
 
+    // Layout of the RAL data files, as described by data_index.js
+    static #is_binary = (typeof RAL_DATA_FORMAT !== "undefined") && (RAL_DATA_FORMAT == "binary");
+    static #file_start_ids = (typeof RAL_FILE_START_IDS !== "undefined") ? RAL_FILE_START_IDS : null;
+    static #skeleton = (typeof RAL_SKELETON !== "undefined") ? new Map(
+        Object.entries(RAL_SKELETON).map(([id, node]) => [Number(id), node])
+    ) : null;
+
+    static #pending_loads = new Array(N_RAL_FILES).fill(null);
+
     static async load_ral_data(){
+        if(this.is_lazy()){
+            // Only load what is needed to display the root node(s).
+            // Everything else is loaded on demand
+            var fetches = [];
+            for(var i=0; i<RootNodeIds.length; i++){
+                fetches.push(this.ensure_loaded(RootNodeIds[i]));
+            }
+            await Promise.all(fetches);
+            return;
+        }
+
         this.#init_progressbar();
 
         // Dispatch all JSON fetch requests in parallel
+        await this.load_all();
+    }
+
+    static async load_all(){
         var fetches = [];
         for(var i=0; i<N_RAL_FILES; i++){
             var awaitable = this.#load_ral_file(i);
@@ -16,26 +40,180 @@ class RAL {
         await Promise.all(fetches);
     }
 
-    static async #load_ral_file(idx){
-        var path = "data/ral-data-" + idx + ".json?ts=" + BUILD_TS;
+    static async load_remaining_in_background(){
+        // Gradually load any chunks that have not been requested yet
+        for(var i=0; i<N_RAL_FILES; i++){
+            if(this.#pending_loads[i] != null) continue;
+            await this.#load_ral_file(i).catch(e => {});
+            await take_a_break();
+        }
+    }
+
+    static #load_ral_file(idx){
+        // Each file is only fetched once
+        if(this.#pending_loads[idx] == null){
+            this.#pending_loads[idx] = this.#fetch_ral_file(idx);
+        }
+        return this.#pending_loads[idx];
+    }
+
+    static async #fetch_ral_file(idx){
+        var is_binary = this.#is_binary;
+        var path = "data/ral-data-" + idx + (is_binary ? ".bin" : ".json") + "?ts=" + BUILD_TS;
         var awaitable = fetch(path)
             .then(response => {
                 if(!response.ok){
                     throw new Error("fetch failed");
                 }
+                if(is_binary) return response.arrayBuffer();
                 return response.json();
             })
             .then(data => {
                 this.#increment_progressbar();
+                if(is_binary) data = this.#decode_binary_ral_file(data);
                 this.#ral_data_files[idx] = data;
             })
             .catch(e => {
                 this.#destroy_progressbar();
+                this.#pending_loads[idx] = null;
                 throw new Error("fetch failed");
             });
         return awaitable;
     }
 
+    static is_lazy(){
+        return(this.#skeleton !== null);
+    }
+
+    static is_loaded(id){
+        if((this.#skeleton !== null) && this.#skeleton.has(id)) return(true);
+        return(this.#ral_data_files[this.#get_file_idx(id)] !== null);
+    }
+
+    static async ensure_loaded(id){
+        // Make sure the node's data, as well as the data of all its ancestors
+        // and descendants is loaded.
+        // Chunks are grouped by subtree, so the chunk that contains the node
+        // also contains all ancestors that are not part of the skeleton.
+        if(this.is_loaded(id)) return;
+        await this.#load_ral_file(this.#get_file_idx(id));
+    }
+
+    static async ensure_path_loaded(path){
+        // Load the nodes along a hierarchical path, as used by parse_path()
+        if(path == null) return;
+        var names = path.split(".");
+        for(var i=0; i<names.length; i++){
+            names[i] = names[i].split("[")[0];
+        }
+
+        var id = null;
+        for(var i=0; i<RootNodeIds.length; i++){
+            await this.ensure_loaded(RootNodeIds[i]);
+            if(names[0] == this.get_node(RootNodeIds[i]).name) {
+                id = RootNodeIds[i];
+                break;
+            }
+        }
+
+        for(var i=1; i<names.length; i++){
+            if(id == null) return;
+            id = this.get_child_by_name(id, names[i]);
+            if(id != null) await this.ensure_loaded(id);
+        }
+    }
+
+    static #decode_binary_ral_file(buf){
+        // See ral_binary.py for a description of the format
+        var header = new Uint32Array(buf, 0, 16);
+        if(String.fromCharCode(...new Uint8Array(buf, 0, 4)) != "PRDL" || header[1] != 1){
+            throw new Error("Unsupported RAL data file");
+        }
+        var n_nodes = header[3];
+        var pos = 64;
+        function u64(n){
+            var a = new BigUint64Array(buf, pos, n);
+            pos += 8*n;
+            return a;
+        }
+        function i32(n){
+            var a = new Int32Array(buf, pos, n);
+            pos += 4*n;
+            return a;
+        }
+        function u32(n){
+            var a = new Uint32Array(buf, pos, n);
+            pos += 4*n;
+            return a;
+        }
+        var file = {
+            n_nodes: n_nodes,
+            offset: u64(n_nodes),
+            size: u64(n_nodes),
+            stride: u64(n_nodes),
+            parent: i32(n_nodes),
+            layout: i32(n_nodes),
+            name: u32(n_nodes),
+            children_start: u32(n_nodes),
+            n_children: u32(n_nodes),
+            dims_start: u32(n_nodes),
+            n_dims: u32(n_nodes),
+            children: u32(header[4]),
+            dims: u32(header[5]),
+            layout_field_start: u32(header[6]),
+            layout_n_fields: u32(header[6]),
+            fields: u32(5 * header[7]),
+            strings: null,
+            // Nodes are materialized into objects on first access
+            nodes: new Array(n_nodes).fill(null),
+        };
+        file.strings = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, pos, header[8])));
+        return file;
+    }
+
+    static #materialize_binary_node(file, idx){
+        var cs = file.children_start[idx];
+        var node = {
+            parent: (file.parent[idx] < 0) ? null : file.parent[idx],
+            children: Array.from(file.children.subarray(cs, cs + file.n_children[idx])),
+            name: file.strings[file.name[idx]],
+            offset: file.offset[idx],
+            size: file.size[idx],
+        };
+
+        var n_dims = file.n_dims[idx];
+        if(n_dims){
+            var ds = file.dims_start[idx];
+            node.dims = Array.from(file.dims.subarray(ds, ds + n_dims));
+            node.stride = file.stride[idx];
+            node.idxs = new Array(n_dims).fill(0);
+        }
+
+        var layout = file.layout[idx];
+        if(layout >= 0){
+            // Each register gets its own field objects since their display
+            // state is modified by the viewer
+            node.fields = [];
+            var fs = file.layout_field_start[layout];
+            var n_fields = file.layout_n_fields[layout];
+            for(var i=fs; i<fs+n_fields; i++){
+                var field = {
+                    name: file.strings[file.fields[5*i]],
+                    lsb: file.fields[5*i + 1],
+                    msb: file.fields[5*i + 2],
+                    reset: BigInt("0x" + file.strings[file.fields[5*i + 3]]),
+                    disp: "H",
+                };
+                if(file.fields[5*i + 4] & 0x1){
+                    field.encode = true;
+                    field.disp = "E";
+                }
+                node.fields.push(field);
+            }
+        }
+        return node;
+    }
+
     static #progress_points = 0;
     static #progressbar = null;
     static #init_progressbar(){
@@ -53,6 +231,7 @@ class RAL {
         }
     }
     static #increment_progressbar(){
+        if(this.#progressbar == null) return;
         this.#progress_points++;
         this.#progressbar.set(this.#progress_points / N_RAL_FILES);
         if(this.#progress_points == N_RAL_FILES) {
@@ -61,18 +240,100 @@ class RAL {
     }
 
     static #destroy_progressbar(){
+        if(this.#progressbar == null) return;
         this.#progressbar.destroy();
         this.#progressbar = null;
     }
 
     static get_node(id){
-        var file_idx = Math.floor(id / N_RAL_NODES_PER_FILE);
-        var idx = id % N_RAL_NODES_PER_FILE;
-        var node = this.#ral_data_files[file_idx][idx];
+        if(this.#skeleton !== null){
+            var node = this.#skeleton.get(id);
+            if(node !== undefined){
+                this.#expand_bigint(node);
+                return node;
+            }
+        }
+
+        var file_idx, idx;
+        if(this.#file_start_ids === null){
+            file_idx = Math.floor(id / N_RAL_NODES_PER_FILE);
+            idx = id % N_RAL_NODES_PER_FILE;
+        } else {
+            file_idx = this.#get_file_idx(id);
+            idx = id - this.#file_start_ids[file_idx];
+        }
+        var file = this.#ral_data_files[file_idx];
+        if(file === null){
+            throw new Error("RAL data for node " + id + " is not loaded");
+        }
+
+        if(this.#is_binary){
+            var node = file.nodes[idx];
+            if(node === null){
+                node = this.#materialize_binary_node(file, idx);
+                file.nodes[idx] = node;
+            }
+            return node;
+        }
+
+        var node = file[idx];
         this.#expand_bigint(node);
         return node;
     }
 
+    static #get_partial_node(id){
+        // Returns the node if it is loaded.
+        // Otherwise returns a stub that only contains its parent and name
+        if((this.#skeleton === null) || this.is_loaded(id)) return(this.get_node(id));
+        var stub = RAL_SKELETON_STUBS[id];
+        return {
+            parent: stub[0],
+            name: stub[1],
+        };
+    }
+
+    static get_node_summary(id){
+        // Get basic information about a node.
+        // Unlike get_node(), this also works for the children of skeleton
+        // nodes that have not been loaded yet
+        if(this.is_lazy() && !this.is_loaded(id)){
+            var stub = RAL_SKELETON_STUBS[id];
+            return {
+                parent: stub[0],
+                name: stub[1],
+                n_dims: stub[2],
+                n_children: stub[3],
+            };
+        }
+        var node = this.get_node(id);
+        return {
+            parent: node.parent,
+            name: node.name,
+            n_dims: ("dims" in node) ? node.dims.length : 0,
+            n_children: node.children.length,
+        };
+    }
+
+    static #get_file_idx(id){
+        var start_ids = this.#file_start_ids;
+        if(start_ids === null){
+            return Math.floor(id / N_RAL_NODES_PER_FILE);
+        }
+
+        // Binary search for the last file that starts at or before id
+        var lo = 0;
+        var hi = start_ids.length - 1;
+        while(lo < hi){
+            var mid = (lo + hi + 1) >> 1;
+            if(start_ids[mid] <= id){
+                lo = mid;
+            } else {
+                hi = mid - 1;
+            }
+        }
+        return lo;
+    }
+
     static #expand_bigint(node){
         // Check if RAL entry has been converted yet
         if(typeof node.offset !== 'string') return;
@@ -90,6 +351,7 @@ class RAL {
     }
 
     static number_of_ids(){
+        if(typeof N_RAL_NODES !== "undefined") return N_RAL_NODES;
         return (
             (this.#ral_data_files.length - 1) * N_RAL_NODES_PER_FILE
             + this.#ral_data_files[this.#ral_data_files.length - 1].length
@@ -144,7 +406,7 @@ class RAL {
         var node = this.get_node(id);
         for(var i=0; i<node.children.length; i++){
             var cid = node.children[i];
-            if(this.get_node(cid).name == name){
+            if(this.#get_partial_node(cid).name == name){
                 return(cid);
             }
         }
@@ -281,7 +543,7 @@ class RAL {
         var ids = this.get_ids_in_path(id);
         var pathparts = [];
         for(var i=0; i<ids.length; i++){
-            var segment = this.get_node(ids[i]).name;
+            var segment = this.#get_partial_node(ids[i]).name;
             if(show_idx && idx_stack[i].length){
                 for(var dim=0; dim<idx_stack[i].length; dim++){
                     segment += "[" + idx_stack[i][dim] + "]";
@@ -298,7 +560,7 @@ class RAL {
         var ids = [];
         while(id !== null) {
             ids.unshift(id);
-            id = this.get_node(id).parent;
+            id = this.#get_partial_node(id).parent;
         }
         return(ids);
     }
@@ -409,26 +671,94 @@ class RAL {
             }
 
             // Search this node's children to see which child 'addr' is in
-            var found_match = false;
-            for(var i=0; i<this.get_node(id).children.length; i++) {
-                var child = this.get_node(id).children[i];
-                if((addr >= this.get_node(child).offset) && (addr < (this.get_node(child).offset + this.get_total_size(child)))){
-                    // hit!
-                    id = child;
-                    found_match = true;
-                    break;
-                }
-            }
-            if(!found_match){
+            var child = this.#find_child_by_address(id, addr);
+            if(child == null){
                 // No further match. Current node is the result
                 return([id, idx_stack]);
             }
+            id = child;
         }
 
         // Hit iteration limit. Something is wrong :-(
         throw "Agh! iteration limit reached while looking up by address";
     }
 
+    static #addr_index_cache = new Map();
+    static #get_addr_index(id){
+        // Get the node's children sorted by address.
+        // Built on first use and cached
+        var index = this.#addr_index_cache.get(id);
+        if(index !== undefined) return(index);
+
+        var children = this.get_node(id).children;
+        var order = new Array(children.length);
+        var is_sorted = true;
+        for(var i=0; i<children.length; i++){
+            order[i] = i;
+            if(i && this.get_node(children[i]).offset < this.get_node(children[i-1]).offset){
+                is_sorted = false;
+            }
+        }
+        if(!is_sorted){
+            order.sort((a, b) => {
+                var a_offset = this.get_node(children[a]).offset;
+                var b_offset = this.get_node(children[b]).offset;
+                if(a_offset < b_offset) return(-1);
+                if(a_offset > b_offset) return(1);
+                return(a - b);
+            });
+        }
+
+        // For each position in the sorted order, also keep the largest end
+        // address seen so far. This bounds how far back overlapping children
+        // need to be searched.
+        index = {
+            order: order,
+            offsets: new Array(children.length),
+            ends: new Array(children.length),
+            max_ends: new Array(children.length),
+        };
+        var max_end = -1n;
+        for(var i=0; i<order.length; i++){
+            var cid = children[order[i]];
+            var offset = this.get_node(cid).offset;
+            var end = offset + this.get_total_size(cid);
+            if(end > max_end) max_end = end;
+            index.offsets[i] = offset;
+            index.ends[i] = end;
+            index.max_ends[i] = max_end;
+        }
+        this.#addr_index_cache.set(id, index);
+        return(index);
+    }
+
+    static #find_child_by_address(id, addr){
+        // Find the child of id whose address range contains addr.
+        // If several children overlap, the first one declared wins.
+        var index = this.#get_addr_index(id);
+
+        // Binary search for the number of children that start at or before addr
+        var lo = 0;
+        var hi = index.offsets.length;
+        while(lo < hi){
+            var mid = (lo + hi) >> 1;
+            if(index.offsets[mid] <= addr){
+                lo = mid + 1;
+            } else {
+                hi = mid;
+            }
+        }
+
+        var best = -1;
+        for(var i=lo-1; (i >= 0) && (index.max_ends[i] > addr); i--){
+            if(addr < index.ends[i]){
+                if((best < 0) || (index.order[i] < best)) best = index.order[i];
+            }
+        }
+        if(best < 0) return(null);
+        return(this.get_node(id).children[best]);
+    }
+
     static lookup_field_idx(name) {
         var node = this.get_node(CurrentID);
         for(var i=0; i<node.fields.length; i++){
@@ -439,9 +769,21 @@ class RAL {
         return(-1);
     }
 
+    static #uid_cache = new Map();
     static get_node_uid(id) {
-        var path = this.get_path(id, null, false);
-        var uid = SHA1(path);
+        if((typeof CONTENT_FILENAMES !== "undefined") && (CONTENT_FILENAMES == "id")){
+            // Content pages are named after the node's id
+            return id.toString();
+        }
+
+        // Otherwise they are named after the hash of the node's path.
+        // Paths do not include array indexes, so the result can be reused
+        var uid = this.#uid_cache.get(id);
+        if(uid === undefined){
+            var path = this.get_path(id, null, false);
+            uid = SHA1(path);
+            this.#uid_cache.set(id, uid);
+        }
         return uid;
     }
 }
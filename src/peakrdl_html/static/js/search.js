@@ -149,6 +149,17 @@ async function start_search(query) {
 
     if(query.length == 0) return;
 
+    // Searches need the entire RAL
+    await RAL.load_all();
+    if(abortSignal.aborted) return;
+
+    if(SearchWorker.is_enabled()){
+        var ok = await SearchWorker.start(query, abortSignal);
+        if(ok || abortSignal.aborted) return;
+        // Worker is unusable. Fall back to searching in the main thread
+        clear_search_results();
+    }
+
     if(query.startsWith("@")){
         AddressSearch.start(query);
     } else {
@@ -160,6 +171,108 @@ async function start_search(query) {
     }
 }
 
+class SearchWorker {
+    // Runs searches in a Web Worker so that the main thread stays responsive
+    static #worker = null;
+    static #failed = false;
+    static #query_id = 0;
+    static #current = null;
+    static #message_queue = Promise.resolve();
+
+    static is_enabled(){
+        if(this.#failed) return(false);
+        if(typeof SEARCH_IN_WORKER === "undefined" || !SEARCH_IN_WORKER) return(false);
+        if(typeof Worker === "undefined") return(false);
+        // Browsers do not allow workers to be loaded from file:// URLs
+        if(window.location.protocol == "file:") return(false);
+        return(true);
+    }
+
+    static #get_worker(){
+        if(this.#worker == null){
+            var static_url = (typeof STATIC_URL === "undefined") ? "" : STATIC_URL;
+            this.#worker = new Worker(static_url + "js/search_worker.js?ts=" + BUILD_TS);
+            this.#worker.onmessage = (ev) => {
+                // Handle messages strictly in order, since showing content
+                // matches is asynchronous
+                this.#message_queue = this.#message_queue
+                    .then(() => this.#onMessage(ev))
+                    .catch(e => console.error(e));
+            };
+            this.#worker.onerror = this.#onError.bind(this);
+            this.#worker.postMessage({
+                type: "init",
+                build_ts: BUILD_TS,
+                page_url: window.location.href,
+            });
+        }
+        return(this.#worker);
+    }
+
+    static start(query, abortSignal){
+        // Returns a promise that resolves to true once the search completed,
+        // or false if the worker failed
+        var worker;
+        try {
+            worker = this.#get_worker();
+        } catch(e) {
+            this.#failed = true;
+            return(Promise.resolve(false));
+        }
+
+        if(this.#current != null) this.#current.resolve(true);
+
+        this.#query_id++;
+        var query_id = this.#query_id;
+        return(new Promise(resolve => {
+            this.#current = {
+                query_id: query_id,
+                abortSignal: abortSignal,
+                resolve: resolve,
+            };
+            abortSignal.addEventListener("abort", () => {
+                worker.postMessage({type: "abort"});
+                if((this.#current != null) && (this.#current.query_id == query_id)){
+                    this.#current = null;
+                    resolve(true);
+                }
+            });
+            worker.postMessage({type: "search", query_id: query_id, query: query});
+        }));
+    }
+
+    static async #onMessage(ev){
+        var msg = ev.data;
+        var current = this.#current;
+        if((current == null) || (msg.query_id != current.query_id)) return; // stale
+
+        if(msg.type == "result"){
+            add_search_result(...msg.result);
+        } else if(msg.type == "content_matches"){
+            // Preview text is extracted from the page content, which requires
+            // the DOM. Do this in the main thread
+            await ContentSearch.show_matches(msg.matches, current.abortSignal);
+        } else if(msg.type == "done"){
+            this.#current = null;
+            current.resolve(true);
+        } else if(msg.type == "error"){
+            console.error("Search worker error: " + msg.message);
+            this.#current = null;
+            current.resolve(true);
+        }
+    }
+
+    static #onError(ev){
+        // Worker failed to load
+        console.error("Search worker failed. Searching in main thread instead.");
+        this.#failed = true;
+        this.#worker = null;
+        var current = this.#current;
+        this.#current = null;
+        if(current != null) current.resolve(false);
+    }
+}
+
 function add_search_result(text_segments, node_id, idx_stack=null, anchor="", content_preview=null){
     // text_segments is an array of segments that should/shouldn't be highlighted
     // All odd segments are highlighted via <mark> tag.
@@ -0,0 +1,93 @@
+// This file is part of PeakRDL-html <https://github.com/SystemRDL/PeakRDL-html>.
+// and can be redistributed under the terms of GNU LGPLv3 <https://www.gnu.org/licenses/>.
+
+// Web Worker that runs searches off of the main thread.
+// Loads its own copy of the RAL data and search index, and streams results
+// back to SearchWorker in search.js
+
+var BUILD_TS;
+var WorkerState = {};
+WorkerState.page_url = null;
+WorkerState.query_id = null;
+WorkerState.abortSignal = null;
+
+// Resolve fetches relative to the viewer's page rather than this script
+const worker_fetch = self.fetch.bind(self);
+self.fetch = function(resource, options) {
+    return worker_fetch(new URL(resource, WorkerState.page_url), options);
+};
+
+onmessage = function(ev) {
+    var msg = ev.data;
+    if(msg.type == "init"){
+        BUILD_TS = msg.build_ts;
+        WorkerState.page_url = msg.page_url;
+        importScripts(
+            new URL("data/data_index.js?ts=" + BUILD_TS, WorkerState.page_url).href,
+            new URL("search/bkt_index.js?ts=" + BUILD_TS, WorkerState.page_url).href,
+            "sha1.js?ts=" + BUILD_TS,
+            "ral.js?ts=" + BUILD_TS,
+            "address_search.js?ts=" + BUILD_TS,
+            "path_search.js?ts=" + BUILD_TS,
+            "content_search.js?ts=" + BUILD_TS
+        );
+    } else if(msg.type == "search"){
+        if(WorkerState.abortSignal) WorkerState.abortSignal.aborted = true;
+        WorkerState.abortSignal = {aborted: false};
+        run_search(msg.query_id, msg.query, WorkerState.abortSignal);
+    } else if(msg.type == "abort"){
+        if(WorkerState.abortSignal) WorkerState.abortSignal.aborted = true;
+    }
+};
+
+async function run_search(query_id, query, abortSignal) {
+    try {
+        await RAL.load_all();
+        if(abortSignal.aborted) return;
+
+        // Only one search makes progress at a time. Prior searches bail out
+        // as soon as they resume, so results are never attributed to the
+        // wrong query
+        WorkerState.query_id = query_id;
+
+        if(query.startsWith("@")){
+            AddressSearch.start(query);
+        } else {
+            await PathSearch.start(query, abortSignal);
+            if(abortSignal.aborted) return;
+
+            var matches = await ContentSearch.find_matches(query, abortSignal);
+            if(abortSignal.aborted) return;
+            postMessage({type: "content_matches", query_id: query_id, matches: matches});
+        }
+    } catch(e) {
+        postMessage({type: "error", query_id: query_id, message: String(e)});
+        return;
+    }
+    postMessage({type: "done", query_id: query_id});
+}
+
+//==============================================================================
+// Stand-ins for main thread functions used by the search classes
+//==============================================================================
+
+function add_search_result(text_segments, node_id, idx_stack=null, anchor="", content_preview=null){
+    postMessage({
+        type: "result",
+        query_id: WorkerState.query_id,
+        result: [text_segments, node_id, idx_stack, anchor],
+    });
+}
+
+async function take_a_break(){
+    // Yield so that newer messages (such as aborts) get processed
+    await new Promise(r => setTimeout(r, 0));
+}
+
+function difference(setA, setB) {
+    const _difference = new Set(setA);
+    for (const elem of setB) {
+        _difference.delete(elem);
+    }
+    return _difference;
+}
@@ -3,6 +3,7 @@
 
 class Sidebar {
     static #selected_node_id = null;
+    static #virtual = false;
     static #resizer_old_width = 0;
     static #resizer_start_x = 0;
 
@@ -21,9 +22,17 @@ class Sidebar {
 
         // create the root node(s). Do not recurse
         el = document.getElementById("_SBTree");
-        for(var i=0; i<RootNodeIds.length; i++){
-            this.#create_node(el, RootNodeIds[i]);
-        };
+        this.#virtual = (typeof VIRTUAL_SIDEBAR !== "undefined") && VIRTUAL_SIDEBAR;
+        if(this.#virtual){
+            VirtualTree.init(
+                el, document.getElementById("_SBTreeContainer"),
+                RootNodeIds, this.#create_node_el.bind(this)
+            );
+        } else {
+            for(var i=0; i<RootNodeIds.length; i++){
+                this.#create_node(el, RootNodeIds[i]);
+            };
+        }
 
         // Create and expand nodes up to the current selected ID
         this.expand_to_id(first_id);
@@ -43,6 +52,13 @@ class Sidebar {
         var id_chain = RAL.get_ancestors(id);
         id_chain.push(id);
 
+        if(this.#virtual){
+            // Expanding a node that is already open is cheap
+            for(var i=0; i<id_chain.length; i++){
+                this.expand_node(id_chain[i]);
+            }
+            return;
+        }
 
         // Find the innermost element that already exists and all the ids that
         // still need to have their children created
@@ -75,6 +91,10 @@ class Sidebar {
     }
 
     static expand_node(id){
+        if(this.#virtual){
+            VirtualTree.expand(id);
+            return;
+        }
         var el = this.#get_node_el(id);
         var node = RAL.get_node(id);
         if(node.children.length > 0){
@@ -99,9 +119,13 @@ class Sidebar {
     }
 
     static collapse_node(id){
+        if(this.#virtual){
+            VirtualTree.collapse(id);
+            return;
+        }
         var el = this.#get_node_el(id);
-        var node = RAL.get_node(id);
-        if(node.children.length > 0){
+        var node = RAL.get_node_summary(id);
+        if(node.n_children > 0){
             if(el.classList.contains("closed")){
                 return; // already closed
             }
@@ -117,6 +141,10 @@ class Sidebar {
     }
 
     static collapse_all(){
+        if(this.#virtual){
+            VirtualTree.collapse_all();
+            return;
+        }
         for(var i=0; i<RootNodeIds.length; i++){
             var id = RootNodeIds[i];
             this.collapse_node(id);
@@ -125,14 +153,28 @@ class Sidebar {
 
     static #create_node(parent_el, id){
         // Creates a single tree node element
-        var node = RAL.get_node(id);
+        var div = this.#create_node_el(id);
+        parent_el.appendChild(div);
+
+        if(RAL.get_node_summary(id).n_children > 0){
+            // has children
+            var cdiv;
+            cdiv = document.createElement("div");
+            cdiv.className = "node-children";
+            parent_el.appendChild(cdiv);
+        }
+    }
+
+    static #create_node_el(id){
+        // Creates a tree node's element, without any children
+        // The node's data may not be loaded yet, so only use its summary
+        var node = RAL.get_node_summary(id);
 
         var div;
         div = document.createElement("div");
         div.id = "_SBNode" + id;
         div.dataset.id = id;
         div.className = "node";
-        parent_el.appendChild(div);
 
         var icon;
         icon = document.createElement("div");
@@ -144,9 +186,9 @@ class Sidebar {
         link.href = "?p=" + RAL.get_path(id, null, false);
         link.className = "node-link";
         link.onclick = onClickTreeLink;
-        if(RAL.is_array(id)){
+        if(node.n_dims > 0){
             var txt = node.name;
-            for(var i=0; i<node.dims.length; i++) {
+            for(var i=0; i<node.n_dims; i++) {
                 txt += "[]";
             }
             link.innerHTML = txt;
@@ -155,23 +197,24 @@ class Sidebar {
         }
         div.appendChild(link);
 
-        if(node.children.length > 0){
+        if(node.n_children > 0){
             // has children
             div.classList.add("closed");
-
-            var cdiv;
-            cdiv = document.createElement("div");
-            cdiv.className = "node-children";
-            parent_el.appendChild(cdiv);
         } else {
             // is leaf node
             div.classList.add("leaf");
         }
+        return(div);
     }
 
     static select_node(id) {
         // Changes the selected tree node
         var el;
+        if(this.#virtual){
+            VirtualTree.select(id);
+            this.#selected_node_id = id;
+            return;
+        }
         if(this.#selected_node_id != null){
             el = this.#get_node_el(this.#selected_node_id)
             if(el != null){ // element might have already been deleted
@@ -212,6 +255,10 @@ class Sidebar {
     static show() {
         document.getElementById("_Sidebar").style.display = "flex";
         document.getElementById("_Overlay").style.display = "block";
+        if(this.#virtual){
+            // The tree's size was unknown while it was hidden
+            VirtualTree.render();
+        }
     }
 
     static hide() {
@@ -220,7 +267,12 @@ class Sidebar {
     }
 
     static scroll_into_view(id){
+        if(this.#virtual){
+            // Scroll vertically so that the node's element is materialized
+            VirtualTree.scroll_into_view(id);
+        }
         var node_el = this.#get_node_el(id);
+        if(node_el == null) return;
         var tree_el = document.getElementById("_SBTreeContainer");
 
         var node_rect = node_el.getBoundingClientRect();
@@ -240,6 +292,223 @@ class Sidebar {
     }
 }
 
+class VirtualTree {
+    // Windowed rendering of the sidebar tree.
+    // Rather than creating an element for every node that is expanded, the
+    // tree is flattened into the list of rows that are visible when scrolling
+    // through it. Only the rows within view of the scroll container are
+    // materialized, and spacers stand in for the rest. Expanding or collapsing
+    // a node splices rows in or out of the list without touching the DOM.
+
+    // Number of rows materialized beyond each edge of the view
+    static OVERSCAN = 20;
+
+    // Used until a row could be measured
+    static DEFAULT_ROW_HEIGHT = 20;
+
+    static #tree_el = null;
+    static #container_el = null;
+    static #rows_el = null;
+    static #top_spacer = null;
+    static #bottom_spacer = null;
+    static #create_node_el = null;
+
+    // Visible rows, in order: {id, depth}
+    static #rows = [];
+    static #open_ids = new Set();
+    static #selected_id = null;
+
+    static #row_height = null;
+    // Range of rows that is currently materialized: [start, end)
+    static #rendered = null;
+    static #render_pending = false;
+
+    static init(tree_el, container_el, root_ids, create_node_el){
+        this.#tree_el = tree_el;
+        this.#container_el = container_el;
+        this.#create_node_el = create_node_el;
+
+        tree_el.classList.add("virtual");
+        this.#top_spacer = document.createElement("div");
+        this.#top_spacer.className = "vtree-spacer";
+        this.#rows_el = document.createElement("div");
+        this.#rows_el.className = "vtree-rows";
+        this.#bottom_spacer = document.createElement("div");
+        this.#bottom_spacer.className = "vtree-spacer";
+        tree_el.append(this.#top_spacer, this.#rows_el, this.#bottom_spacer);
+
+        this.#rows = [];
+        for(var i=0; i<root_ids.length; i++){
+            this.#rows.push({id: root_ids[i], depth: 0});
+        }
+
+        var schedule_render = this.#schedule_render.bind(this);
+        container_el.addEventListener("scroll", schedule_render, {passive: true});
+        window.addEventListener("resize", schedule_render);
+        this.#invalidate();
+    }
+
+    static expand(id){
+        if(this.#open_ids.has(id)) return; // already open
+        var node = RAL.get_node(id);
+        if(node.children.length == 0) return;
+        this.#open_ids.add(id);
+
+        var idx = this.#index_of(id);
+        if(idx < 0) return; // Within a closed node. Rows are added once it opens
+
+        var new_rows = [];
+        this.#collect_rows(id, this.#rows[idx].depth + 1, new_rows);
+        // Avoid spreading new_rows into splice() since it can be huge
+        this.#rows = this.#rows.slice(0, idx + 1).concat(new_rows, this.#rows.slice(idx + 1));
+        this.#invalidate();
+    }
+
+    static collapse(id){
+        if(!this.#open_ids.has(id)) return; // already closed
+        this.#open_ids.delete(id);
+
+        var idx = this.#index_of(id);
+        if(idx < 0) return;
+
+        // Remove the rows of all descendants. Like in the regular tree,
+        // descendants are closed again when their ancestor is collapsed
+        var depth = this.#rows[idx].depth;
+        var end = idx + 1;
+        while((end < this.#rows.length) && (this.#rows[end].depth > depth)){
+            this.#open_ids.delete(this.#rows[end].id);
+            end++;
+        }
+        this.#rows.splice(idx + 1, end - idx - 1);
+        this.#invalidate();
+    }
+
+    static collapse_all(){
+        this.#open_ids.clear();
+        this.#rows = this.#rows.filter(row => row.depth == 0);
+        this.#invalidate();
+    }
+
+    static select(id){
+        this.#selected_id = id;
+        for(const el of this.#rows_el.children){
+            el.classList.toggle("selected", parseInt(el.dataset.id) == id);
+        }
+    }
+
+    static scroll_into_view(id){
+        // Scroll vertically so that the node's row is within view
+        var idx = this.#index_of(id);
+        if(idx < 0) return;
+
+        var row_height = this.#get_row_height();
+        var row_top = this.#get_list_offset() + idx * row_height;
+        var view_height = this.#container_el.clientHeight;
+        if(row_top < this.#container_el.scrollTop){
+            this.#container_el.scrollTop = row_top;
+        } else if(row_top + row_height > this.#container_el.scrollTop + view_height){
+            this.#container_el.scrollTop = row_top + row_height - view_height;
+        }
+        this.render();
+    }
+
+    static render(){
+        // Materialize the rows that are within view
+        this.#render_pending = false;
+        if(this.#measure_row_height()) this.#rendered = null;
+        var row_height = this.#get_row_height();
+        var view_top = this.#container_el.scrollTop - this.#get_list_offset();
+        var view_height = this.#container_el.clientHeight;
+
+        var start = Math.floor(view_top / row_height) - this.OVERSCAN;
+        var end = Math.ceil((view_top + view_height) / row_height) + this.OVERSCAN;
+        start = Math.min(Math.max(start, 0), this.#rows.length);
+        end = Math.min(Math.max(end, start), this.#rows.length);
+
+        if((this.#rendered !== null) && (this.#rendered[0] == start) && (this.#rendered[1] == end)){
+            return;
+        }
+        this.#rendered = [start, end];
+
+        var els = [];
+        for(var i=start; i<end; i++){
+            var row = this.#rows[i];
+            var el = this.#create_node_el(row.id);
+            el.style.marginLeft = row.depth + "em";
+            if(this.#open_ids.has(row.id)){
+                el.classList.add("open");
+                el.classList.remove("closed");
+            }
+            if(row.id == this.#selected_id){
+                el.classList.add("selected");
+            }
+            els.push(el);
+        }
+        this.#rows_el.replaceChildren(...els);
+        this.#top_spacer.style.height = (start * row_height) + "px";
+        this.#bottom_spacer.style.height = ((this.#rows.length - end) * row_height) + "px";
+
+        if(this.#measure_row_height()){
+            // Now that a row exists, the estimated row height can be replaced
+            this.#invalidate();
+        }
+    }
+
+    static #measure_row_height(){
+        // Measure the height of a row once one is materialized and visible.
+        // Returns true if the height became known
+        if(this.#row_height !== null) return(false);
+        var el = this.#rows_el.firstElementChild;
+        if(el === null) return(false);
+        var h = el.getBoundingClientRect().height;
+        if(h <= 0) return(false); // hidden
+        this.#row_height = h;
+        return(true);
+    }
+
+    static #invalidate(){
+        // Rows changed. Re-render immediately so that their elements exist
+        this.#rendered = null;
+        this.render();
+    }
+
+    static #schedule_render(){
+        if(this.#render_pending) return;
+        this.#render_pending = true;
+        window.requestAnimationFrame(() => this.render());
+    }
+
+    static #get_row_height(){
+        if(this.#row_height === null) return(this.DEFAULT_ROW_HEIGHT);
+        return(this.#row_height);
+    }
+
+    static #get_list_offset(){
+        // Offset of the first row from the top of the container's scrolled
+        // content
+        var spacer_rect = this.#top_spacer.getBoundingClientRect();
+        var container_rect = this.#container_el.getBoundingClientRect();
+        return(spacer_rect.top - container_rect.top + this.#container_el.scrollTop);
+    }
+
+    static #index_of(id){
+        return(this.#rows.findIndex(row => row.id == id));
+    }
+
+    static #collect_rows(id, depth, rows){
+        // Append the rows of the node's children, and of their descendants
+        // that are open
+        var children = RAL.get_node(id).children;
+        for(var i=0; i<children.length; i++){
+            var cid = children[i];
+            rows.push({id: cid, depth: depth});
+            if(this.#open_ids.has(cid)){
+                this.#collect_rows(cid, depth + 1, rows);
+            }
+        }
+    }
+}
+
 function onClickTreeFold(ev) {
     var el = ev.target.parentNode;
     var id = parseInt(el.dataset.id);
@@ -247,10 +516,12 @@ function onClickTreeFold(ev) {
 
     if(el.classList.contains("closed")){
         // Open this node
-        Sidebar.expand_node(id);
+        RAL.ensure_loaded(id).then(() => {
+            Sidebar.expand_node(id);
 
-        // may need to re-select current
-        Sidebar.select_node(CurrentID);
+            // may need to re-select current
+            Sidebar.select_node(CurrentID);
+        });
     }else{
         // Close this node
         Sidebar.collapse_node(id);
@@ -266,13 +537,14 @@ function onClickTreeLink(ev) {
 
     if(id == CurrentID) return(false);
 
-    if(!el.classList.contains("leaf")){
+    if(!el.classList.contains("leaf") && RAL.is_loaded(id)){
         Sidebar.expand_node(id);
     }
 
-    RAL.reset_indexes_to_next(id);
-
-    load_page(id).then(() => {
+    RAL.ensure_loaded(id).then(() => {
+        RAL.reset_indexes_to_next(id);
+        return load_page(id);
+    }).then(() => {
         Sidebar.expand_to_id(id);
         Sidebar.select_node(id);
         refresh_url();
@@ -0,0 +1,75 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict
+
+def get_bundle_digest(files: 'Dict[str, str]') -> str:
+    """
+    Returns a digest of a set of static files, given as relpath: source path.
+    The digest covers each file's path and contents.
+    """
+    h = hashlib.sha1()
+    for relpath in sorted(files.keys()):
+        fh = hashlib.sha1()
+        with open(files[relpath], 'rb') as f:
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    break
+                fh.update(block)
+        h.update(relpath.encode('utf-8'))
+        h.update(b"\0")
+        h.update(fh.digest())
+    return h.hexdigest()[0:16]
+
+
+class StaticAssetStore:
+    """
+    Directory of static asset bundles that is shared by multiple exports.
+
+    Each bundle is stored in a subdirectory that is named after the digest of
+    its contents. A bundle is never modified once it exists, so an export
+    whose static files are identical to those of a previous export reuses
+    its bundle rather than writing another copy. Since the files keep their
+    relative locations within the bundle, references between them, such as
+    stylesheets that refer to fonts, continue to work.
+
+    Bundles are populated in a temporary directory and then renamed into
+    place, so exports that run concurrently never observe a partial bundle.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+
+    def add(self, files: 'Dict[str, str]', digest: str) -> str:
+        """
+        Store the bundle of files, given as relpath: source path, if it is not
+        present already.
+        Returns the bundle's directory
+        """
+        bundle_dir = os.path.join(self.path, digest)
+        if os.path.isdir(bundle_dir):
+            return bundle_dir
+
+        os.makedirs(self.path, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.path)
+        try:
+            # mkdtemp() creates a private directory. Bundles are to be served
+            os.chmod(tmp_dir, 0o755)
+            for relpath, src in files.items():
+                path = os.path.join(tmp_dir, relpath)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                shutil.copyfile(src, path)
+            try:
+                os.rename(tmp_dir, bundle_dir)
+            except OSError:
+                # Another export stored the same bundle in the meantime
+                if not os.path.isdir(bundle_dir):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return bundle_dir
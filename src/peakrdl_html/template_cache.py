@@ -0,0 +1,37 @@
+import os
+from typing import TYPE_CHECKING
+
+import jinja2 as jj
+from jinja2.bccache import Bucket
+
+from .__about__ import __version__
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+class TemplateBytecodeCache(jj.FileSystemBytecodeCache):
+    """
+    On-disk cache of compiled templates, so that templates do not need to be
+    recompiled by every process that renders them.
+
+    Entries are keyed on the template's name and the checksum of its source,
+    rather than its location. A template that is overridden by a user template
+    directory, or that changes between releases, therefore gets its own entry
+    instead of reusing stale bytecode.
+    The exporter's version is also part of the key, since it determines the
+    environment's compile-time options.
+    """
+    def __init__(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory, "peakrdl-html-%s.jinja")
+
+
+    def get_bucket(
+        self, environment: jj.Environment, name: str,
+        filename: 'Optional[str]', source: str
+    ) -> Bucket:
+        checksum = self.get_source_checksum(source)
+        key = self.get_cache_key("%s|%s" % (__version__, name), checksum)
+        bucket = Bucket(environment, key, checksum)
+        self.load_bytecode(bucket)
+        return bucket
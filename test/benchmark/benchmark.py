@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Benchmark HTMLExporter.export() on synthetic designs
+
+Each scenario is run in a separate process so that its peak memory usage can
+be measured in isolation. Results are written as JSON so that they can be
+compared between releases.
+
+Examples:
+    # Run the preset scenarios
+    python3 benchmark.py -o results.json
+
+    # Run a custom design, with exporter options
+    python3 benchmark.py --depth 3 --fanout 8 --exporter-args '{"lazy_ral_data": true}'
+
+Phase times are exclusive of nested phases. For example, time spent in the
+Markdown processor while rendering a page is only counted towards "markdown".
+Time not attributed to any phase, such as traversing the register model, is
+reported as "traversal".
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import functools
+import subprocess
+from typing import Any, Dict, List, Callable, Optional
+
+import generate_design
+
+SCENARIOS = {
+    "small": dict(depth=1, fanout=4, regs_per_block=8),
+    "medium": dict(depth=2, fanout=8, array_size=4, regs_per_block=16),
+    "large": dict(depth=3, fanout=8, array_size=4, regs_per_block=32, desc_words=48),
+    "desc-heavy": dict(depth=2, fanout=6, regs_per_block=16, desc_words=200),
+    "wide-regs": dict(depth=2, fanout=4, regs_per_block=16, fields_per_reg=32, enum_size=2),
+}
+
+#-------------------------------------------------------------------------------
+# Phase timing
+#-------------------------------------------------------------------------------
+class PhaseTimer:
+    def __init__(self) -> None:
+        self.totals = {} # type: Dict[str, float]
+        self.counts = {} # type: Dict[str, int]
+        self._stack = [] # type: List[float]
+
+    def wrap(self, owner: Any, attr: str, phase: str) -> None:
+        """
+        Replace owner.attr with a wrapper that attributes its time to phase
+        """
+        fn = getattr(owner, attr)
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self._stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = self._stack.pop()
+                self.totals[phase] = self.totals.get(phase, 0.0) + elapsed - nested
+                self.counts[phase] = self.counts.get(phase, 0) + 1
+                if self._stack:
+                    self._stack[-1] += elapsed
+
+        setattr(owner, attr, wrapper)
+
+
+def install_phase_timers(timer: PhaseTimer) -> None:
+    # pylint: disable=import-outside-toplevel
+    import markdown
+    from peakrdl_html.exporter import HTMLExporter
+    from peakrdl_html.search_indexer import SearchIndexer
+    from peakrdl_html.output import OutputDirectory
+
+    timer.wrap(markdown.Markdown, "convert", "markdown")
+    timer.wrap(HTMLExporter, "render_page", "template_render")
+    timer.wrap(HTMLExporter, "write_ral_data", "ral_data_write")
+    timer.wrap(SearchIndexer, "add_node", "search_index_build")
+    timer.wrap(SearchIndexer, "write_index_js", "search_index_write")
+    timer.wrap(OutputDirectory, "write_file", "file_write")
+    timer.wrap(OutputDirectory, "copy_file", "file_write")
+
+
+#-------------------------------------------------------------------------------
+# Single scenario
+#-------------------------------------------------------------------------------
+def get_peak_rss_kb() -> Optional[int]:
+    try:
+        import resource # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # Reported in bytes rather than kilobytes
+        maxrss //= 1024
+    return maxrss
+
+
+def get_dir_stats(path: str) -> Dict[str, int]:
+    n_files = 0
+    n_bytes = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            n_files += 1
+            n_bytes += os.path.getsize(os.path.join(dirpath, filename))
+    return {"output_files": n_files, "output_bytes": n_bytes}
+
+
+def run_scenario(design: Dict[str, Any], exporter_args: Dict[str, Any], export_args: Dict[str, Any]) -> Dict[str, Any]:
+    # pylint: disable=import-outside-toplevel
+    from systemrdl import RDLCompiler
+    from peakrdl_html import HTMLExporter
+
+    timer = PhaseTimer()
+    install_phase_timers(timer)
+
+    params = generate_design.DesignParams(**design)
+    workdir = tempfile.mkdtemp(prefix="peakrdl-html-bench-")
+    try:
+        rdl_path = os.path.join(workdir, "design.rdl")
+        with open(rdl_path, "w", encoding="utf-8") as f:
+            f.write(generate_design.generate_rdl(params))
+
+        start = time.perf_counter()
+        rdlc = RDLCompiler()
+        rdlc.compile_file(rdl_path)
+        root = rdlc.elaborate()
+        compile_time = time.perf_counter() - start
+
+        output_dir = os.path.join(workdir, "output")
+        exporter = HTMLExporter(**exporter_args)
+        start = time.perf_counter()
+        exporter.export(root, output_dir, **export_args)
+        export_time = time.perf_counter() - start
+
+        phases = dict(timer.totals)
+        phases["traversal"] = export_time - sum(timer.totals.values())
+
+        result = {
+            "design": params.to_dict(),
+            "exporter_args": exporter_args,
+            "export_args": export_args,
+            "pages": params.n_pages(),
+            "compile_s": compile_time,
+            "export_s": export_time,
+            "phases_s": phases,
+            "phase_calls": timer.counts,
+            "export_stats": exporter.stats.to_dict(),
+            "peak_rss_kb": get_peak_rss_kb(),
+        }
+        result.update(get_dir_stats(output_dir))
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+#-------------------------------------------------------------------------------
+def run_in_subprocess(name: str, design: Dict[str, Any], exporter_args: Dict[str, Any], export_args: Dict[str, Any]) -> Dict[str, Any]:
+    job = json.dumps({
+        "design": design,
+        "exporter_args": exporter_args,
+        "export_args": export_args,
+    })
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-job", job],
+        stdout=subprocess.PIPE, check=True,
+    )
+    result = json.loads(proc.stdout.decode("utf-8")) # type: Dict[str, Any]
+    result["scenario"] = name
+    return result
+
+
+def get_environment() -> Dict[str, Any]:
+    # pylint: disable=import-outside-toplevel
+    import systemrdl
+    from peakrdl_html.__about__ import __version__
+
+    return {
+        "peakrdl_html": __version__,
+        "systemrdl_compiler": systemrdl.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main(argv: 'Optional[List[str]]'=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the PeakRDL-html exporter")
+    parser.add_argument(
+        "scenarios", nargs="*",
+        help="Preset scenarios to run: %s. (default: all, unless a custom design is specified)" % ", ".join(SCENARIOS)
+    )
+    custom_group = parser.add_argument_group("Custom design")
+    for action in _get_design_actions():
+        custom_group.add_argument(*action[0], **action[1])
+    parser.add_argument("--exporter-args", default="{}", help="JSON object of HTMLExporter constructor arguments")
+    parser.add_argument("--export-args", default="{}", help="JSON object of HTMLExporter.export() arguments")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of times to run each scenario (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--run-job", default=None, help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.run_job is not None:
+        # Running a single scenario in a child process
+        job = json.loads(options.run_job)
+        result = run_scenario(job["design"], job["exporter_args"], job["export_args"])
+        sys.stdout.write(json.dumps(result))
+        return
+
+    exporter_args = json.loads(options.exporter_args)
+    export_args = json.loads(options.export_args)
+
+    scenarios = {} # type: Dict[str, Dict[str, Any]]
+    custom_design = {
+        k: v for k, v in vars(options).items()
+        if k in generate_design.DesignParams().to_dict() and v is not None
+    }
+    for name in options.scenarios:
+        if name not in SCENARIOS:
+            parser.error("Unknown scenario '%s'" % name)
+        scenarios[name] = dict(SCENARIOS[name], **custom_design)
+    if not scenarios:
+        if custom_design:
+            scenarios["custom"] = custom_design
+        else:
+            scenarios = dict(SCENARIOS)
+
+    results = []
+    for name, design in scenarios.items():
+        for _ in range(options.repeat):
+            print("Running %s..." % name, file=sys.stderr)
+            result = run_in_subprocess(name, design, exporter_args, export_args)
+            print(
+                "    %d pages: export %.2fs, peak RSS %s kB, %d files" % (
+                    result["pages"], result["export_s"], result["peak_rss_kb"], result["output_files"]
+                ),
+                file=sys.stderr
+            )
+            results.append(result)
+
+    report = {
+        "environment": get_environment(),
+        "results": results,
+    }
+    s = json.dumps(report, indent=2)
+    if options.output is None:
+        print(s)
+    else:
+        with open(options.output, "w", encoding="utf-8") as f:
+            f.write(s)
+
+
+def _get_design_actions() -> 'List[Any]':
+    """
+    Design generator options, without defaults so that only explicitly
+    specified options override the preset scenarios
+    """
+    tmp_parser = argparse.ArgumentParser(add_help=False)
+    generate_design.add_arguments(tmp_parser)
+    actions = []
+    for action in tmp_parser._actions: # pylint: disable=protected-access
+        actions.append((action.option_strings, {
+            "dest": action.dest,
+            "type": action.type,
+            "default": None,
+            "help": (action.help or "").replace(" (default: %(default)s)", ""),
+        }))
+    return actions
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic SystemRDL design for benchmarking.
+
+The design is a tree of regfiles that is `depth` levels deep. Each regfile
+instantiates `fanout` child regfiles, each of which is an array of
+`array_size` elements. Regfiles at the bottom of the tree contain
+`regs_per_block` registers.
+
+Each hierarchy level uses its own component types, which are reused by every
+instance at that level, as is typical in real designs.
+
+Example:
+    python3 generate_design.py --depth 3 --fanout 4 -o design.rdl
+"""
+import sys
+import random
+import argparse
+from typing import List, Optional
+
+WORDS = [
+    "register", "interrupt", "enable", "status", "control", "buffer", "channel",
+    "transfer", "pending", "clear", "mask", "threshold", "counter", "timer",
+    "overflow", "underflow", "error", "reset", "power", "clock", "domain",
+    "bridge", "packet", "header", "payload", "length", "offset", "address",
+    "descriptor", "queue", "write", "read", "access", "value", "field",
+    "hardware", "software", "update", "latency", "priority", "arbiter",
+    "request", "response", "complete", "valid", "ready", "configure", "mode",
+    "select", "sample", "filter", "calibrate", "sensor", "voltage", "current",
+]
+
+class DesignParams:
+    def __init__(
+        self, depth: int=2, fanout: int=4, array_size: int=1,
+        regs_per_block: int=8, fields_per_reg: int=4, enum_size: int=4,
+        desc_words: int=24, seed: int=0,
+    ) -> None:
+        self.depth = depth
+        self.fanout = fanout
+        self.array_size = array_size
+        self.regs_per_block = regs_per_block
+        self.fields_per_reg = fields_per_reg
+        self.enum_size = enum_size
+        self.desc_words = desc_words
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+    def n_pages(self) -> int:
+        """
+        Number of content pages the HTML exporter will generate.
+        Arrays only get one page, regardless of their size
+        """
+        n_blocks = 1
+        total = 1
+        for _ in range(self.depth):
+            n_blocks *= self.fanout
+            total += n_blocks
+        return total + n_blocks * self.regs_per_block
+
+
+def get_desc(rng: random.Random, n_words: int) -> str:
+    """
+    Generate a description that includes some Markdown formatting
+    """
+    if n_words <= 0:
+        return ""
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    if n_words >= 8:
+        words[rng.randrange(n_words)] = "**%s**" % rng.choice(WORDS)
+        words[rng.randrange(n_words)] = "`%s`" % rng.choice(WORDS)
+    paragraphs = []
+    for i in range(0, n_words, 40):
+        paragraphs.append(" ".join(words[i:i+40]).capitalize() + ".")
+    return "\n\n".join(paragraphs)
+
+
+def generate_rdl(params: DesignParams) -> str:
+    rng = random.Random(params.seed)
+    lines = [] # type: List[str]
+
+    def desc_prop(indent: str) -> None:
+        desc = get_desc(rng, params.desc_words)
+        if desc:
+            lines.append('%sdesc = "%s";' % (indent, desc.replace('"', "'")))
+
+    # Field layout
+    field_width = max(1, 32 // max(1, params.fields_per_reg))
+    n_fields = min(params.fields_per_reg, 32)
+    enum_size = min(params.enum_size, 2 ** field_width)
+
+    if enum_size > 0:
+        lines.append("enum bench_enum_e {")
+        for i in range(enum_size):
+            lines.append('    %s_%d = %d {desc = "%s";};' % (rng.choice(WORDS), i, i, get_desc(rng, 6)))
+        lines.append("};")
+        lines.append("")
+
+    # Register type
+    lines.append("reg bench_reg_t {")
+    lines.append('    name = "%s";' % " ".join(rng.choice(WORDS) for _ in range(2)).title())
+    desc_prop("    ")
+    for i in range(n_fields):
+        lines.append("    field {")
+        lines.append('        name = "%s %d";' % (rng.choice(WORDS).title(), i))
+        desc_prop("        ")
+        lines.append("        sw = rw; hw = r;")
+        if enum_size > 0 and i % 2 == 0:
+            lines.append("        encode = bench_enum_e;")
+        lines.append("    } f%d[%d:%d] = 0;" % (i, i * field_width + field_width - 1, i * field_width))
+    lines.append("};")
+    lines.append("")
+
+    # Regfile types, from the bottom of the hierarchy up
+    for level in reversed(range(params.depth + 1)):
+        kind = "addrmap" if level == 0 else "regfile"
+        type_name = "bench_top" if level == 0 else "bench_level%d_t" % level
+        lines.append("%s %s {" % (kind, type_name))
+        lines.append('    name = "Level %d Block";' % level)
+        desc_prop("    ")
+        if level == params.depth:
+            for i in range(params.regs_per_block):
+                lines.append("    bench_reg_t reg%d;" % i)
+        else:
+            child_type = "bench_level%d_t" % (level + 1)
+            for i in range(params.fanout):
+                if params.array_size > 1:
+                    lines.append("    %s blk%d[%d];" % (child_type, i, params.array_size))
+                else:
+                    lines.append("    %s blk%d;" % (child_type, i))
+        lines.append("};")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = DesignParams()
+    parser.add_argument("--depth", type=int, default=defaults.depth, help="Number of regfile hierarchy levels (default: %(default)s)")
+    parser.add_argument("--fanout", type=int, default=defaults.fanout, help="Child blocks per block (default: %(default)s)")
+    parser.add_argument("--array-size", type=int, default=defaults.array_size, help="Array size of each child block (default: %(default)s)")
+    parser.add_argument("--regs-per-block", type=int, default=defaults.regs_per_block, help="Registers per leaf block (default: %(default)s)")
+    parser.add_argument("--fields-per-reg", type=int, default=defaults.fields_per_reg, help="Fields per register (default: %(default)s)")
+    parser.add_argument("--enum-size", type=int, default=defaults.enum_size, help="Members of the enum used by fields. 0 disables enums (default: %(default)s)")
+    parser.add_argument("--desc-words", type=int, default=defaults.desc_words, help="Words per description. 0 disables descriptions (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Random seed (default: %(default)s)")
+
+
+def params_from_args(options: argparse.Namespace) -> DesignParams:
+    return DesignParams(
+        depth=options.depth,
+        fanout=options.fanout,
+        array_size=options.array_size,
+        regs_per_block=options.regs_per_block,
+        fields_per_reg=options.fields_per_reg,
+        enum_size=options.enum_size,
+        desc_words=options.desc_words,
+        seed=options.seed,
+    )
+
+
+def main(argv: 'Optional[List[str]]'=None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic SystemRDL design")
+    add_arguments(parser)
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: stdout)")
+    options = parser.parse_args(argv)
+
+    params = params_from_args(options)
+    rdl = generate_rdl(params)
+    if options.output is None:
+        sys.stdout.write(rdl)
+    else:
+        with open(options.output, "w", encoding="utf-8") as f:
+            f.write(rdl)
+        print("%d pages" % params.n_pages(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fixed overhead of rendering content pages
+
+Measures:
+- The time to load and compile the page templates in a fresh process, with
+  and without a warm template_cache_dir.
+- The average time per page spent in HTMLExporter.render_page() when all
+  page templates are replaced by empty ones. This isolates the overhead of
+  preparing each page's rendering context and looking up its template from
+  the work done by the templates themselves.
+
+Run it against two revisions to compare them.
+
+Example:
+    python3 render_overhead.py --depth 3 --fanout 8 -o results.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import functools
+import subprocess
+from typing import Any, Dict, List, Optional
+
+import generate_design
+
+PAGE_TEMPLATES = ["addrmap.html", "regfile.html", "mem.html", "reg.html", "index.html"]
+
+def load_templates(template_cache_dir: 'Optional[str]') -> 'Optional[float]':
+    """
+    Time to load all page templates
+    """
+    # pylint: disable=import-outside-toplevel
+    from peakrdl_html import HTMLExporter
+
+    if template_cache_dir is None:
+        exporter = HTMLExporter()
+    else:
+        try:
+            exporter = HTMLExporter(template_cache_dir=template_cache_dir)
+        except TypeError:
+            # Not supported by this version
+            return None
+
+    start = time.perf_counter()
+    for name in PAGE_TEMPLATES:
+        exporter.jj_env.get_template(name)
+    return time.perf_counter() - start
+
+
+def measure_render_overhead(params: generate_design.DesignParams, repeat: int) -> Dict[str, Any]:
+    # pylint: disable=import-outside-toplevel
+    from systemrdl import RDLCompiler
+    from peakrdl_html import HTMLExporter
+
+    workdir = tempfile.mkdtemp(prefix="peakrdl-html-bench-")
+    try:
+        rdl_path = os.path.join(workdir, "design.rdl")
+        with open(rdl_path, "w", encoding="utf-8") as f:
+            f.write(generate_design.generate_rdl(params))
+        rdlc = RDLCompiler()
+        rdlc.compile_file(rdl_path)
+        root = rdlc.elaborate()
+
+        # Replace page templates with empty ones
+        template_dir = os.path.join(workdir, "templates")
+        os.makedirs(template_dir)
+        for name in PAGE_TEMPLATES[:-1]:
+            with open(os.path.join(template_dir, name), "w", encoding="utf-8") as f:
+                f.write("")
+
+        # Time spent in render_page
+        times = [] # type: List[float]
+        render_page = HTMLExporter.render_page
+
+        @functools.wraps(render_page)
+        def timed_render_page(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return render_page(*args, **kwargs)
+            finally:
+                times.append(time.perf_counter() - start)
+        HTMLExporter.render_page = timed_render_page # type: ignore
+
+        best = None # type: Optional[float]
+        for _ in range(repeat):
+            del times[:]
+            exporter = HTMLExporter(user_template_dir=template_dir, generate_source_links=False)
+            exporter.export(root, os.path.join(workdir, "output"))
+            per_page = sum(times) / len(times)
+            if best is None or per_page < best:
+                best = per_page
+
+        return {
+            "pages": len(times),
+            "render_overhead_us_per_page": best * 1e6 if best is not None else None,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_in_subprocess(job: Dict[str, Any]) -> Any:
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-job", json.dumps(job)],
+        stdout=subprocess.PIPE, check=True,
+    )
+    return json.loads(proc.stdout.decode("utf-8"))
+
+
+def main(argv: 'Optional[List[str]]'=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the per-page render overhead of the PeakRDL-html exporter")
+    generate_design.add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Number of times to run each measurement. The best is reported (default: %(default)s)")
+    parser.add_argument("-o", "--output", default=None, help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--run-job", default=None, help=argparse.SUPPRESS)
+    options = parser.parse_args(argv)
+
+    if options.run_job is not None:
+        # Running a single measurement in a child process
+        job = json.loads(options.run_job)
+        if job["kind"] == "load":
+            result = load_templates(job["template_cache_dir"]) # type: Any
+        else:
+            params = generate_design.DesignParams(**job["design"])
+            result = measure_render_overhead(params, job["repeat"])
+        sys.stdout.write(json.dumps(result))
+        return
+
+    params = generate_design.params_from_args(options)
+
+    # Template loading, each in a fresh process so that nothing is cached in
+    # memory
+    cache_dir = tempfile.mkdtemp(prefix="peakrdl-html-template-cache-")
+    try:
+        uncached = []
+        cached = []
+        # Populate the cache
+        run_in_subprocess({"kind": "load", "template_cache_dir": cache_dir})
+        for _ in range(options.repeat):
+            uncached.append(run_in_subprocess({"kind": "load", "template_cache_dir": None}))
+            cached.append(run_in_subprocess({"kind": "load", "template_cache_dir": cache_dir}))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("Measuring render overhead of %d pages..." % params.n_pages(), file=sys.stderr)
+    render = run_in_subprocess({"kind": "render", "design": params.to_dict(), "repeat": options.repeat})
+
+    report = {
+        "design": params.to_dict(),
+        "template_load_s": min(uncached),
+        "template_load_cached_s": None if None in cached else min(cached),
+    }
+    report.update(render)
+
+    print("    template load: %.1f ms" % (report["template_load_s"] * 1e3), file=sys.stderr)
+    if report["template_load_cached_s"] is not None:
+        print("    template load with cache: %.1f ms" % (report["template_load_cached_s"] * 1e3), file=sys.stderr)
+    print("    render overhead: %.1f us/page" % report["render_overhead_us_per_page"], file=sys.stderr)
+
+    s = json.dumps(report, indent=2)
+    if options.output is None:
+        print(s)
+    else:
+        with open(options.output, "w", encoding="utf-8") as f:
+            f.write(s)
+
+
+if __name__ == "__main__":
+    main()